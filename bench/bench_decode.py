@@ -0,0 +1,114 @@
+# bench/bench_decode.py
+"""
+Benchmark della decodifica di ImageCache.
+Genera una sequenza sintetica (PNG/JPEG, TIFF 16 bit, EXR) e misura i
+frame/s sostenuti consegnati da get_image() con 1..N worker, sia con i
+soli thread sia con N processi (process_decoder, slot in memoria condivisa).
+I timeout di get_image() si ritentano; una misura che non consegna tutti
+i frame entro DECODE_DEADLINE viene segnata PARZIALE.
+
+    python bench/bench_decode.py --size 2048x1080 --frames 120 --max-workers 8
+    python bench/bench_decode.py --formats tif,exr --backends thread,process
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+os.environ.setdefault("MAGA_LOG_LEVEL", "WARNING")
+os.environ.setdefault("OPENCV_IO_ENABLE_OPENEXR", "1")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from player_core import ImageCache          # noqa: E402
+from frame_pool import FramePool            # noqa: E402
+from process_decoder import ProcessDecoder  # noqa: E402
+
+DECODE_DEADLINE = 300.0                     # secondi per consegnare tutti i frame
+
+
+def make_sequence(folder, width, height, frames, ext):
+    """Scrive `frames` immagini rumorose (non comprimibili banalmente)."""
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    paths = []
+    for n in range(frames):
+        img = np.roll(base, n * 7, axis=1)
+        cv2.putText(img, f"{n:04d}", (50, 150), cv2.FONT_HERSHEY_SIMPLEX,
+                    4, (255, 255, 255), 6)
+        if ext == "exr":
+            img = img.astype(np.float32) / 255.0
+        elif ext in ("tif", "tiff"):
+            img = img.astype(np.uint16) * 257
+        path = os.path.join(folder, f"frame{n:04d}.{ext}")
+        try:
+            ok = cv2.imwrite(path, img)
+        except cv2.error:
+            ok = False
+        if not ok:
+            raise RuntimeError(f"cv2 non scrive .{ext}")
+        paths.append(path)
+    return paths
+
+
+def measure(paths, workers, cache_mb, backend="thread"):
+    decoder = ProcessDecoder(workers) if backend == "process" else None
+    if decoder is not None:
+        decoder.read(paths[0])              # avvio dei processi fuori dalla misura
+    cache = ImageCache(paths, workers=workers, max_bytes=cache_mb * 1024 * 1024,
+                       pool=FramePool(), decoder=decoder)
+    start = time.perf_counter()
+    count = 0
+    try:
+        while count < len(paths):
+            if cache.get_image() is not None:
+                count += 1
+            elif time.perf_counter() - start > DECODE_DEADLINE:
+                break                       # timeout di get_image(): si riprova fino al limite
+    finally:
+        cache.stop()
+        if decoder is not None:
+            decoder.close()
+    elapsed = time.perf_counter() - start
+    return count / elapsed if elapsed > 0 else 0.0, count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", default="2048x1080", help="WxH dei frame sintetici")
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--cache-mb", type=int, default=1024)
+    parser.add_argument("--formats", default="png,jpg")
+    parser.add_argument("--backends", default="thread,process",
+                        help="thread = worker di ImageCache, process = ProcessDecoder")
+    args = parser.parse_args(argv)
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    with tempfile.TemporaryDirectory(prefix="maga_bench_") as tmp:
+        for ext in args.formats.split(","):
+            folder = os.path.join(tmp, ext)
+            os.makedirs(folder)
+            try:
+                paths = make_sequence(folder, width, height, args.frames, ext)
+            except RuntimeError as e:
+                print(f"\n[{ext.upper()}] saltato: {e}")
+                continue
+            print(f"\n[{ext.upper()}] {width}x{height}, {len(paths)} frame")
+            for backend in args.backends.split(","):
+                baseline = None
+                for workers in range(1, args.max_workers + 1):
+                    fps, count = measure(paths, workers, args.cache_mb, backend)
+                    baseline = baseline or fps
+                    print(f"  {backend:<7} workers={workers:2d}  {fps:8.1f} fps  "
+                          f"(x{fps / baseline:.2f})"
+                          + (f"  PARZIALE {count}/{len(paths)}" if count < len(paths) else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+# bench/bench_playback.py
+"""
+Benchmark headless della pipeline di playback.
+Per ogni risoluzione (HD/2K/4K) e formato (PNG/JPEG/EXR/TIFF) genera una
+sequenza sintetica divisa in shot con il suo CSV, poi misura in un
+processo separato (picco di RSS per caso):
+  • decode_fps       frame/s sostenuti da ImageCache.get_image(); i timeout
+                     si ritentano, un caso che non consegna tutti i frame
+                     entro DECODE_DEADLINE viene segnato decode_partial
+  • decode_fps_processes  lo stesso con --decode-processes N processi di
+                     decodifica (process_decoder) al posto dei soli thread
+  • play_fps         fps reali di play_with_cache al target --fps, con i
+                     frame saltati; sink nullo, niente audio pygame
+  • first_frame_ms   dalla chiamata a play_with_cache al primo frame
+  • seek_ms          latenza comando seek → frame a schermo (p50/p95/max)
+  • trim_loop_ms     ritardo del primo frame dopo il wrap del loop in trim
+  • peak_rss_mb      picco di memoria residente del processo; per i
+                     processi di decodifica peak_rss_children_mb (il
+                     picco del figlio più grande)
+I risultati vanno in JSON (--out) per confrontare commit diversi:
+
+    python bench/bench_playback.py --frames 48 --out before.json
+    python bench/bench_playback.py --frames 48 --out after.json --compare before.json
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import random
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# prima di importare il player: solo avvisi ed errori sulla console
+os.environ.setdefault("MAGA_LOG_LEVEL", "WARNING")
+os.environ.setdefault("OPENCV_IO_ENABLE_OPENEXR", "1")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+import cv2
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, ROOT)
+from player_core import ImageCache, FrameIndex, parse_shot_list, play_with_cache   # noqa: E402
+from perf_stats import PerfStats                                                   # noqa: E402
+from process_decoder import ProcessDecoder                                         # noqa: E402
+
+RESOLUTIONS = {"hd": (1920, 1080), "2k": (2048, 1080), "4k": (4096, 2160)}
+SHOTS = 4
+DECODE_DEADLINE = 300.0                     # secondi per consegnare tutti i frame
+
+
+def make_shots(folder, width, height, frames, ext):
+    """Scrive `frames` frame rumorosi in SHOTS shot e il CSV della lista."""
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    per_shot = max(1, frames // SHOTS)
+    rows = ["shot_id,reparto,frame_path,start_frame,end_frame"]
+    for s in range(SHOTS):
+        shot_dir = os.path.join(folder, f"sh{s:03d}")
+        os.makedirs(shot_dir)
+        for n in range(1, per_shot + 1):
+            img = np.roll(base, (s * per_shot + n) * 7, axis=1)
+            cv2.putText(img, f"{s}:{n:04d}", (50, 150), cv2.FONT_HERSHEY_SIMPLEX,
+                        4, (255, 255, 255), 6)
+            if ext == "exr":
+                img = img.astype(np.float32) / 255.0
+            elif ext in ("tif", "tiff"):
+                img = img.astype(np.uint16) * 257      # TIFF 16 bit, come dal render
+            path = os.path.join(shot_dir, f"sh{s:03d}.{n:04d}.{ext}")
+            try:
+                ok = cv2.imwrite(path, img)
+            except cv2.error:
+                ok = False
+            if not ok:
+                raise RuntimeError(f"cv2 non scrive .{ext}")
+        rows.append(f"sh{s:03d},bench,{shot_dir}/sh{s:03d}.####.{ext},1,{per_shot}")
+    csv_path = os.path.join(folder, "shots.csv")
+    with open(csv_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(rows) + "\n")
+    return csv_path
+
+
+class NullSink:
+    """Al posto del VideoWidget: i frame vengono solo contati."""
+
+    def __init__(self):
+        self.frames = 0
+
+    def present(self, frame):
+        self.frames += 1
+
+
+def peak_rss_mb(who="self"):
+    """Picco di RSS del processo ("self") o dei figli già terminati ("children")."""
+    try:
+        import resource
+    except ImportError:                     # Windows
+        return None
+    target = resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN
+    peak = resource.getrusage(target).ru_maxrss
+    return peak / 1024 if sys.platform != "darwin" else peak / 2**20
+
+
+def measure_decode(shots, workers, cache_mb, processes=0):
+    index = FrameIndex(shots)
+    decoder = ProcessDecoder(processes) if processes else None
+    if decoder is not None:
+        decoder.read(index[0])              # avvio dei processi fuori dalla misura
+    cache = ImageCache(index, workers=workers, max_bytes=cache_mb * 1024 * 1024,
+                       decoder=decoder)
+    start = time.perf_counter()
+    count = 0
+    try:
+        while count < len(index):
+            if cache.get_image() is not None:
+                count += 1
+            elif time.perf_counter() - start > DECODE_DEADLINE:
+                break                       # timeout di get_image(): si riprova fino al limite
+    finally:
+        cache.stop()
+        index.close()
+        if decoder is not None:
+            decoder.close()
+    elapsed = time.perf_counter() - start
+    return count / elapsed if elapsed > 0 else 0.0, count
+
+
+def measure_play(shots, fps, workers, cache_mb):
+    shown = []
+    sink = NullSink()
+    start = time.perf_counter()
+    actual = play_with_cache(shots, sink, None, fps=fps, workers=workers,
+                             max_cache_bytes=cache_mb * 1024 * 1024,
+                             on_frame=lambda n, total, f: shown.append(time.perf_counter()))
+    total = sum(shot.frame_count for shot in shots)
+    return {
+        "play_fps": actual,
+        "frames_shown": sink.frames,
+        "dropped": total - sink.frames,
+        "first_frame_ms": (shown[0] - start) * 1000.0 if shown else None,
+    }
+
+
+def measure_interactive(shots, fps, workers, cache_mb, seeks, loops):
+    """Seek casuali durante la riproduzione, poi loop su un trim fino a `loops` wrap."""
+    total = sum(shot.frame_count for shot in shots)
+    lo, hi = total // 4, total // 4 + max(2, total // 8)
+    shown = []                              # (istante, indice)
+    wrap_delays = []
+    first = threading.Event()
+    wraps = threading.Event()
+    interval = 1000.0 / fps
+
+    def on_frame(n, _total, _fps):
+        now = time.perf_counter()
+        if shown and shown[-1][1] == hi and n - 1 == lo:
+            wrap_delays.append(max(0.0, (now - shown[-1][0]) * 1000.0 - interval))
+            if len(wrap_delays) >= loops:
+                wraps.set()
+        shown.append((now, n - 1))
+        first.set()
+
+    q = queue.Queue()
+    perf = PerfStats()
+
+    def drive():
+        first.wait(10)
+        rnd = random.Random(1)
+        for _ in range(seeks):
+            q.put(("seek", rnd.randrange(total)))
+            time.sleep(0.25)
+        q.put(("trim", (lo, hi)))
+        q.put(("loop", True))
+        wraps.wait(10 + loops * (hi - lo + 1) / fps)
+        q.put(("stop", None))
+
+    driver = threading.Thread(target=drive, daemon=True)
+    driver.start()
+    play_with_cache(shots, NullSink(), None, fps=fps, workers=workers,
+                    max_cache_bytes=cache_mb * 1024 * 1024, on_frame=on_frame,
+                    command_q=q, perf=perf)
+    driver.join(1.0)
+
+    seek = perf.snapshot()["stages"].get("seek", {})
+    return {
+        "seek_ms": {k: seek.get(k) for k in ("count", "p50", "p95", "max")},
+        "trim_loop_ms": {"wraps": len(wrap_delays),
+                         "mean": sum(wrap_delays) / len(wrap_delays) if wrap_delays else None,
+                         "max": max(wrap_delays, default=None)},
+    }
+
+
+def run_case(case):
+    """Un caso (risoluzione × formato) nel processo figlio."""
+    shots, _ = parse_shot_list(case["csv"])
+    total = sum(shot.frame_count for shot in shots)
+    fps, frames = measure_decode(shots, case["workers"], case["cache_mb"])
+    result = {"decode_fps": fps, "decode_frames": frames, "decode_partial": frames < total}
+    if case["decode_processes"]:
+        fps, frames = measure_decode(shots, case["workers"], case["cache_mb"],
+                                     case["decode_processes"])
+        result.update(decode_fps_processes=fps, decode_frames_processes=frames)
+        result["decode_partial"] |= frames < total
+    result.update(measure_play(shots, case["fps"], case["workers"], case["cache_mb"]))
+    result.update(measure_interactive(shots, case["fps"], case["workers"], case["cache_mb"],
+                                      case["seeks"], case["loops"]))
+    result["peak_rss_mb"] = peak_rss_mb()
+    result["peak_rss_children_mb"] = peak_rss_mb("children")
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current):
+    """Stampa la variazione delle metriche principali rispetto a `previous`."""
+    old = {(r["resolution"], r["format"]): r for r in previous["results"]}
+    print(f"\nconfronto con {previous.get('commit')} → {current.get('commit')}")
+    for r in current["results"]:
+        before = old.get((r["resolution"], r["format"]))
+        if not before or "skipped" in r or "skipped" in before:
+            continue
+        parts = []
+        for key in ("decode_fps", "decode_fps_processes", "play_fps", "first_frame_ms",
+                    "peak_rss_mb"):
+            if before.get(key) and r.get(key) is not None:
+                parts.append(f"{key} {r[key] / before[key] - 1:+.1%}")
+        print(f"  {r['resolution']:>3} {r['format']:<4} " + "  ".join(parts))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--resolutions", default="hd,2k,4k")
+    parser.add_argument("--formats", default="png,jpg,exr,tif")
+    parser.add_argument("--frames", type=int, default=48, help="frame per caso")
+    parser.add_argument("--fps", type=int, default=24)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--cache-mb", type=int, default=1024)
+    parser.add_argument("--decode-processes", type=int, default=0,
+                        help="misura anche la decodifica con N processi (0 = no)")
+    parser.add_argument("--seeks", type=int, default=6)
+    parser.add_argument("--loops", type=int, default=3)
+    parser.add_argument("--out", default="bench_playback.json")
+    parser.add_argument("--compare", help="JSON di un run precedente")
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": git_commit(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "cpu_count": os.cpu_count(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "results": [],
+    }
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(prefix="maga_bench_") as tmp:
+        for res in args.resolutions.split(","):
+            width, height = RESOLUTIONS[res]
+            for ext in args.formats.split(","):
+                entry = {"resolution": res, "size": [width, height], "format": ext}
+                folder = os.path.join(tmp, f"{res}_{ext}")
+                os.makedirs(folder)
+                try:
+                    csv_path = make_shots(folder, width, height, args.frames, ext)
+                except RuntimeError as e:
+                    entry["skipped"] = str(e)
+                    print(f"[{res} {ext}] saltato: {e}")
+                    report["results"].append(entry)
+                    continue
+                case = dict(csv=csv_path, fps=args.fps, workers=args.workers,
+                            cache_mb=args.cache_mb, seeks=args.seeks, loops=args.loops,
+                            decode_processes=args.decode_processes)
+                # un processo per caso: il picco di RSS non si somma tra i casi;
+                # non demone, così può avviare i processi di decodifica
+                with ProcessPoolExecutor(1, mp_context=ctx) as pool:
+                    entry.update(pool.submit(run_case, case).result())
+                report["results"].append(entry)
+                seek = entry["seek_ms"]
+                procs = (f" ({args.decode_processes} processi {entry['decode_fps_processes']:.1f})"
+                         if "decode_fps_processes" in entry else "")
+                print(f"[{res} {ext}] decode {entry['decode_fps']:.1f} fps{procs} · "
+                      f"play {entry['play_fps'] or 0:.1f}/{args.fps} fps "
+                      f"(saltati {entry['dropped']}) · primo frame "
+                      f"{entry['first_frame_ms'] or 0:.0f} ms · seek p95 "
+                      f"{seek['p95'] or 0:.1f} ms · RSS {entry['peak_rss_mb'] or 0:.0f} MB"
+                      f" (figli {entry['peak_rss_children_mb'] or 0:.0f} MB)"
+                      + (" · DECODE PARZIALE" if entry["decode_partial"] else ""))
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nrisultati in {args.out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,23 @@
 # debug_utils.py  ─────────────────────────────────────────────────────────
 """
-Logging centralizzato per il Maga Player.
+Logging centralizzato per il Maga Player.
 • Livelli      : TRACE < DEBUG < INFO < WARNING < ERROR < CRITICAL
 • Formato base : 12:34:56.789  [THREAD]  [TAG]  messaggio  key=value ...
 • Colorazione  : via colorlog (pip install colorlog) – fallback in B/W se non disponibile
 • Integrazione : importa sempre `from debug_utils import dbg, trace, log_exception`
                  e rimpiazza i print manuali con dbg("TAG", "msg", k=v)
+                 (info/warn per i messaggi che prima erano print)
+• Costo        : se il livello del tag è disabilitato dbg/trace tornano subito,
+                 senza costruire stringhe; altrimenti messaggio e key=value
+                 vengono formattati dal thread del QueueListener, quindi il
+                 thread di playback non scrive mai sulla console
+• Ambiente     : MAGA_LOG_LEVEL=DEBUG              livello di default (TRACE)
+                 MAGA_LOG_LEVELS=CACHE=INFO,SCAN=WARNING   livelli per tag
+                 MAGA_LOG_JSON=/tmp/player.jsonl   sink JSON-lines aggiuntivo
 • Override print: tutte le print() legacy diventano DEBUG.
 """
 
-import logging, sys, time, builtins
+import logging, logging.handlers, sys, os, time, json, queue, atexit, builtins
 
 TRACE_LEVEL = 5
 logging.addLevelName(TRACE_LEVEL, "TRACE")
@@ -38,20 +46,113 @@ def _make_handler():
     h.setFormatter(cfmt)
     return h
 
+# --------------------------------------------------------------------- livelli
+def _parse_level(name, default):
+    name = str(name).strip().upper()
+    if name.isdigit():
+        return int(name)
+    level = logging.getLevelName(name)
+    return level if isinstance(level, int) else default
+
+def parse_tag_levels(spec, default):
+    """"CACHE=INFO,SCAN=WARNING" → {"CACHE": 20, "SCAN": 30}"""
+    levels = {}
+    for item in (spec or "").split(","):
+        tag, sep, level = item.partition("=")
+        if sep and tag.strip():
+            levels[tag.strip().upper()] = _parse_level(level, default)
+    return levels
+
+DEFAULT_LEVEL = _parse_level(os.environ.get("MAGA_LOG_LEVEL", "TRACE"), TRACE_LEVEL)
+_tag_levels = parse_tag_levels(os.environ.get("MAGA_LOG_LEVELS"), DEFAULT_LEVEL)
+
+def set_tag_level(tag, level):
+    """Livello minimo per i messaggi di `tag` (nome o numero)."""
+    _tag_levels[tag.upper()] = _parse_level(level, DEFAULT_LEVEL)
+    _root.setLevel(min([DEFAULT_LEVEL, *_tag_levels.values()]))
+
+def enabled(tag, level=logging.DEBUG):
+    return level >= _tag_levels.get(tag, DEFAULT_LEVEL)
+
+# --------------------------------------------------------------------- coda
+class _Fields:
+    """key=value formattati solo quando il record viene scritto."""
+    __slots__ = ("kv",)
+
+    def __init__(self, kv):
+        self.kv = kv
+
+    def __str__(self):
+        return " ".join(f"{k}={v}" for k, v in self.kv.items())
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Accoda il record senza formattarlo: lo fa il thread del listener."""
+
+    def prepare(self, record):
+        if record.exc_info:
+            return super().prepare(record)      # il traceback si formatta subito
+        return record
+
+class JsonLinesHandler(logging.FileHandler):
+    """Sink compatto: un oggetto JSON per riga (t, level, thread, tag, msg, campi)."""
+
+    def __init__(self, path):
+        super().__init__(path, mode="a", encoding="utf-8", delay=True)
+
+    def format(self, record):
+        entry = {"t": round(record.created, 6), "level": record.levelname,
+                 "thread": record.threadName, "tag": getattr(record, "tag", None),
+                 "msg": getattr(record, "text", None) or record.getMessage()}
+        entry.update(getattr(record, "fields", None) or {})
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+_queue = queue.Queue(-1)
 _root = logging.getLogger("Player")
-_root.setLevel(TRACE_LEVEL)
+_root.setLevel(min([DEFAULT_LEVEL, *_tag_levels.values()]))
 _root.handlers.clear()
 _root.propagate = False
-_root.addHandler(_make_handler())
+_root.addHandler(_DeferredQueueHandler(_queue))
+
+_listener = logging.handlers.QueueListener(_queue, _make_handler(), respect_handler_level=True)
+_listener.start()
+atexit.register(_listener.stop)
+
+def add_json_sink(path):
+    """Aggiunge il sink JSON-lines `path` ai record già filtrati per livello."""
+    _listener.stop()
+    _listener.handlers = _listener.handlers + (JsonLinesHandler(path),)
+    _listener.start()
+
+def flush():
+    """Attende che il listener abbia scritto i record in coda."""
+    _queue.join()
+
+if os.environ.get("MAGA_LOG_JSON"):
+    add_json_sink(os.environ["MAGA_LOG_JSON"])
 
 # --------------------------------------------------------------------- helpers
+def _emit(level, tag, msg, kv):
+    # niente findCaller: il record nasce già pronto, formattato solo dal listener
+    record = _root.makeRecord(_root.name, level, __file__, 0, "[%s] %s %s",
+                              (tag, msg, _Fields(kv)), None,
+                              extra={"tag": tag, "text": msg, "fields": kv})
+    _root.handle(record)
+
 def dbg(tag: str, msg: str, **kv):
-    extra = " ".join(f"{k}={v}" for k, v in kv.items())
-    _root.debug(f"[{tag}] {msg} {extra}")
+    if logging.DEBUG >= _tag_levels.get(tag, DEFAULT_LEVEL):
+        _emit(logging.DEBUG, tag, msg, kv)
 
 def trace(tag: str, msg: str, **kv):
-    extra = " ".join(f"{k}={v}" for k, v in kv.items())
-    _root.trace(f"[{tag}] {msg} {extra}")
+    if TRACE_LEVEL >= _tag_levels.get(tag, DEFAULT_LEVEL):
+        _emit(TRACE_LEVEL, tag, msg, kv)
+
+def info(tag: str, msg: str, **kv):
+    if logging.INFO >= _tag_levels.get(tag, DEFAULT_LEVEL):
+        _emit(logging.INFO, tag, msg, kv)
+
+def warn(tag: str, msg: str, **kv):
+    if logging.WARNING >= _tag_levels.get(tag, DEFAULT_LEVEL):
+        _emit(logging.WARNING, tag, msg, kv)
 
 def log_exception(tag: str, exc: Exception):
     _root.exception(f"[{tag}] {exc}")
@@ -63,7 +164,7 @@ def notice(self, message, *args, **kws):
         self._log(NOTICE_LEVEL, message, args, **kws)
 logging.Logger.notice = notice          # type: ignore
 
-# --------------------------------------------------------------------- redirect print
+# --------------------------------------------------------------------- redirect print
 def _print_redirect(*args, **kwargs):
     _root.debug(" ".join(str(a) for a in args))
 # builtins.print = _print_redirect   # ← disattivato per evitare ricorsioni iniziali
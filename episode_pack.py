@@ -0,0 +1,232 @@
+# episode_pack.py
+
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import cv2
+
+from debug_utils import dbg
+from player_core import choose_proxy_scale, frame_paths_for
+
+PACK_VERSION = 1
+
+
+def pack_path_for(csv_path, reparto):
+    """Pack accanto al CSV: <nome_csv>.<reparto>.mpack"""
+    base, _ = os.path.splitext(csv_path)
+    return f"{base}.{reparto}.mpack"
+
+
+def _shot_key(shot):
+    return [shot.shot_id, shot.frame_path, shot.start_frame, shot.end_frame]
+
+
+def _shot_signature(shot):
+    """Hash di mtime e size di tutti i frame dello shot (None = mancante)."""
+    digest = hashlib.sha1()
+    for path in frame_paths_for([shot]):
+        try:
+            st = os.stat(path)
+            digest.update(f"{path}|{st.st_mtime_ns}|{st.st_size}\n".encode())
+        except OSError:
+            digest.update(f"{path}|-\n".encode())
+    return digest.hexdigest()
+
+
+class EpisodePack:
+    """
+    Episodio pre-decodificato: un unico file di frame BGR a dimensione fissa
+    (frames × H × W × 3, uint8) letto in memmap, più un indice JSON con il
+    montaggio degli shot. frame(i) è una vista numpy senza copia e senza
+    decodifica, quindi anche i seek casuali sono O(1). I frame mancanti
+    al momento del pack (`missing`) restano slot vuoti nel file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path + ".json", encoding="utf-8") as f:
+            self.index = json.load(f)
+        if self.index.get("version") != PACK_VERSION:
+            raise ValueError(f"versione pack non supportata: {path}")
+        self.width = self.index["width"]
+        self.height = self.index["height"]
+        self.frames = self.index["frames"]
+        self.missing = set(self.index.get("missing", ()))
+        self.data = np.memmap(path, dtype=np.uint8, mode="r",
+                              shape=(self.frames, self.height, self.width, 3))
+
+    def __len__(self):
+        return self.frames
+
+    def frame(self, index):
+        return self.data[index]
+
+    def reader_for(self, shot_list):
+        """
+        PackReader per `shot_list` se è una sequenza contigua di shot del
+        pack (episodio intero o singolo shot in Scena), altrimenti None.
+        """
+        keys = [_shot_key(s) for s in shot_list]
+        layout = [entry["key"] for entry in self.index["shots"]]
+        for n in range(len(layout) - len(keys) + 1):
+            if layout[n:n + len(keys)] == keys:
+                offset = self.index["shots"][n]["offset"]
+                count = sum(s.end_frame - s.start_frame + 1 for s in shot_list)
+                return PackReader(self, offset, count)
+        return None
+
+
+class PackReader:
+    """
+    Sorgente di frame per play_with_cache basata su un EpisodePack: stessa
+    interfaccia di ImageCache (get_frame/seek/set_bounds/stats/stop).
+    """
+
+    def __init__(self, pack, offset, count):
+        self.pack = pack
+        self.offset = offset
+        self.count = count
+        self.hits = 0
+        mm = getattr(pack.data, "_mmap", None)
+        self._madvise = getattr(mm, "madvise", None)
+        self._frame_bytes = pack.width * pack.height * 3
+
+    def get_frame(self, index, timeout=1.0):
+        # mancante come con ImageCache: play_with_cache trattiene l'ultimo frame
+        if not 0 <= index < self.count or self.offset + index in self.pack.missing:
+            return None
+        self.hits += 1
+        return self.pack.frame(self.offset + index)
+
+    def seek(self, index):
+        # anticipa al kernel la lettura dei prossimi secondi di frame
+        if self._madvise is not None and 0 <= index < self.count:
+            import mmap
+            start = (self.offset + index) * self._frame_bytes
+            start -= start % mmap.PAGESIZE
+            try:
+                self._madvise(mmap.MADV_WILLNEED, start, self._frame_bytes * 50)
+            except (OSError, ValueError, AttributeError):
+                pass
+
+    def set_bounds(self, lo, hi, wrap=False):
+        pass
+
+    def stats(self):
+        return {"hits": self.hits, "misses": 0, "evictions": 0, "hit_rate": 1.0,
+                "frames": self.count, "bytes": self.count * self._frame_bytes,
+                "budget": self.count * self._frame_bytes}
+
+    def stop(self):
+        pass
+
+
+def pack_episode(shots, pack_path, target_size=None, workers=4,
+                 on_progress=None, stop_event=None):
+    """
+    Scrive (o aggiorna) il pack di `shots` in `pack_path`.
+    • target_size (w, h): riduce i frame alla scala proxy per quel widget;
+      None = risoluzione del primo frame
+    • se esiste già un pack con la stessa dimensione, gli shot con la
+      stessa firma (mtime/size dei frame) vengono copiati dal vecchio pack
+      invece di essere ridecodificati
+    Ritorna il numero di shot ridecodificati.
+    """
+    frames = frame_paths_for(shots)     # FrameIndex: sequenze e filmati
+    first = next((i for i, p in enumerate(frames) if os.path.exists(p)), None)
+    probe = frames.read(first) if first is not None else None
+    if probe is None:
+        raise FileNotFoundError("nessun frame trovato per gli shot selezionati")
+    height, width = probe.shape[:2]
+    if target_size is not None:
+        scale = choose_proxy_scale(width, height, *target_size)
+        width, height = max(1, width // scale), max(1, height // scale)
+
+    old = None
+    if os.path.exists(pack_path + ".json"):
+        try:
+            old = EpisodePack(pack_path)
+            if (old.width, old.height) != (width, height):
+                old = None
+        except (OSError, ValueError, KeyError):
+            old = None
+    old_shots = {}
+    if old is not None:
+        for entry in old.index["shots"]:
+            old_shots[(tuple(entry["key"]), entry["signature"])] = entry
+
+    entries = []
+    offset = 0
+    for shot in shots:
+        count = shot.end_frame - shot.start_frame + 1
+        entries.append({"key": _shot_key(shot), "offset": offset, "frames": count,
+                        "signature": _shot_signature(shot)})
+        offset += count
+    total = offset
+
+    tmp_path = pack_path + ".tmp"
+    data = np.memmap(tmp_path, dtype=np.uint8, mode="w+",
+                     shape=(total, height, width, 3))
+    todo = []
+    carried = []                    # mancanti degli shot copiati dal vecchio pack
+    for shot, entry in zip(shots, entries):
+        reuse = old_shots.get((tuple(entry["key"]), entry["signature"]))
+        if reuse is not None:
+            src = reuse["offset"]
+            data[entry["offset"]:entry["offset"] + entry["frames"]] = \
+                old.data[src:src + entry["frames"]]
+            carried.extend(entry["offset"] + i - src for i in old.missing
+                           if src <= i < src + entry["frames"])
+        else:
+            todo.append((shot, entry))
+
+    missing = list(carried)
+    done = [0]
+    lock = threading.Lock()
+    # gli offset del pack coincidono con gli indici assoluti di `frames`;
+    # in ordine, così i filmati vengono decodificati in sequenza
+    jobs = [entry["offset"] + n
+            for shot, entry in todo
+            for n in range(entry["frames"])]
+
+    def write_one(index):
+        if stop_event is not None and stop_event.is_set():
+            return
+        img = frames.read(index)
+        if img is None:
+            with lock:
+                missing.append(index)
+        else:
+            if img.shape[:2] != (height, width):
+                img = cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+            data[index] = img
+        with lock:
+            done[0] += 1
+            if on_progress:
+                on_progress(done[0], len(jobs))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers),
+                            thread_name_prefix="pack") as pool:
+        list(pool.map(write_one, jobs))
+    frames.close()
+    data.flush()
+    del data
+    if old is not None:
+        del old                     # chiude il memmap prima di sostituire il file
+    if stop_event is not None and stop_event.is_set():
+        os.remove(tmp_path)
+        return 0
+
+    os.replace(tmp_path, pack_path)
+    index = {"version": PACK_VERSION, "width": width, "height": height,
+             "frames": total, "shots": entries, "missing": sorted(missing)}
+    with open(pack_path + ".json.tmp", "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(pack_path + ".json.tmp", pack_path + ".json")
+    dbg("PACK", "scritto", path=pack_path, frames=total, size=f"{width}x{height}",
+        rebuilt_shots=len(todo), reused_shots=len(shots) - len(todo))
+    return len(todo)
@@ -0,0 +1,240 @@
+# export_movie.py
+"""
+Export headless di un filmato di review: la timeline di un reparto di un
+CSV di shot diventa un MP4 (mp4v) o un MJPEG (.avi/.mov), con la traccia
+audio del CSV se ffmpeg è disponibile.
+
+    python export_movie.py shots.csv animazione review.mp4 --fps 25
+    python export_movie.py shots.csv render review.avi --size 1280x720 --range 100-399
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")    # player_core importa pygame
+
+import cv2
+
+from debug_utils import info, warn
+from frame_pool import FramePool
+from player_core import (choose_proxy_scale, department_timeline, missing_placeholder,
+                         parse_shot_list, resize_frame)
+
+CODECS = {".mp4": "mp4v", ".m4v": "mp4v", ".avi": "MJPG", ".mov": "MJPG"}
+AUDIO_CODECS = {".mp4": "aac", ".m4v": "aac", ".mov": "aac", ".avi": "pcm_s16le"}
+IN_FLIGHT_PER_WORKER = 2                    # frame in decodifica davanti allo scrittore
+
+
+def parse_size(text):
+    """"1280x720" → (1280, 720); "1280" → (1280, None), altezza dal formato."""
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height) if height else None
+
+
+def parse_range(text):
+    """"100-399" → (100, 399), estremi inclusivi; "100-" fino alla fine."""
+    start, _, end = text.partition("-")
+    return int(start or 0), int(end) if end else None
+
+
+def output_size(src_w, src_h, size):
+    """Dimensione finale: quella sorgente, o `size` con l'altezza mancante in proporzione."""
+    if size is None:
+        return src_w, src_h
+    width, height = size
+    if height is None:
+        height = max(2, round(src_h * width / src_w / 2) * 2)   # pari: richiesto dai codec
+    return width, height
+
+
+def _read_scaled(frames, index, size, scale, pool):
+    """Worker: decodifica ridotta di `scale` dalla sorgente dello shot, poi resize a `size`."""
+    img = frames.read(index, scale, pool)
+    if img is not None and img.shape[1::-1] != size:
+        img = resize_frame(img, size, pool)
+    return img
+
+
+def export_movie(shots, reparto, out_path, fps=25, size=None, frame_range=None,
+                 audio_path=None, workers=4, codec=None, on_progress=None,
+                 stop_event=None):
+    """
+    Scrive in `out_path` la timeline di `reparto`.
+    • decodifica parallela e ordinata: `workers` thread leggono dalle
+      sorgenti degli shot (frame_sources, come il playback) al più
+      IN_FLIGHT_PER_WORKER frame a testa davanti allo scrittore, che
+      consuma i risultati nell'ordine della timeline
+    • size (w, h): risoluzione di uscita (h None = in proporzione); la
+      decodifica avviene già alla scala proxy più vicina
+    • frame_range (inizio, fine): indici assoluti e inclusivi della timeline
+    • i frame mancanti diventano il cartello MANCANTE, così l'audio resta
+      a sync
+    • audio_path: traccia muxata con ffmpeg dal secondo corrispondente
+      all'inizio del range
+    Ritorna le statistiche dell'export (frame, mancanti, secondi, fps).
+    """
+    timeline = department_timeline(shots, reparto)
+    total = len(timeline)
+    start, end = frame_range or (0, None)
+    end = total - 1 if end is None else min(end, total - 1)
+    if not 0 <= start <= end:
+        raise ValueError(f"range {start}-{end} fuori dalla timeline ({total} frame)")
+
+    ext = os.path.splitext(out_path)[1].lower()
+    fourcc = codec or CODECS.get(ext, "mp4v")
+    mux = bool(audio_path) and os.path.exists(audio_path)
+    if mux and shutil.which("ffmpeg") is None:
+        warn("EXPORT", "ffmpeg non trovato: filmato senza audio", audio=audio_path)
+        mux = False
+
+    count = end - start + 1
+    pool = FramePool()
+    placeholder = None
+    missing = 0
+    written = 0
+    wait_s = 0.0                            # scrittore fermo ad aspettare i worker
+    write_s = 0.0                           # encode
+    video_path = out_path
+    writer = None
+    executor = None
+    in_flight = deque()
+    # sorgenti aperte, writer e file temporaneo si chiudono anche in caso di errore
+    try:
+        probe = next((img for img in (timeline.read(i) for i in range(start, end + 1))
+                      if img is not None), None)
+        if probe is None:
+            raise FileNotFoundError(f"nessun frame leggibile per il reparto {reparto}")
+        src_h, src_w = probe.shape[:2]
+        width, height = output_size(src_w, src_h, size)
+        scale = choose_proxy_scale(src_w, src_h, width, height)
+        del probe
+
+        if mux:
+            fd, video_path = tempfile.mkstemp(suffix=ext, dir=os.path.dirname(out_path) or None)
+            os.close(fd)
+        writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*fourcc), fps,
+                                 (width, height))
+        if not writer.isOpened():
+            raise RuntimeError(f"cv2.VideoWriter non apre {video_path} ({fourcc})")
+
+        started = time.perf_counter()
+        info("EXPORT", "avvio", out=out_path, reparto=reparto, frames=count,
+             size=f"{width}x{height}", scale=scale, codec=fourcc, workers=workers)
+        executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="export")
+        next_index = start
+        while written < count:
+            if stop_event is not None and stop_event.is_set():
+                break
+            while next_index <= end and len(in_flight) < max(1, workers) * IN_FLIGHT_PER_WORKER:
+                in_flight.append(executor.submit(_read_scaled, timeline, next_index,
+                                                 (width, height), scale, pool))
+                next_index += 1
+            t0 = time.perf_counter()
+            img = in_flight.popleft().result()
+            t1 = time.perf_counter()
+            if img is None:
+                missing += 1
+                if placeholder is None:
+                    import numpy as np
+                    placeholder = missing_placeholder(np.empty((height, width, 3), np.uint8))
+                frame = placeholder
+            else:
+                frame = img
+            writer.write(frame)
+            t2 = time.perf_counter()
+            if img is not None:
+                pool.release(img)
+            del img, frame
+            wait_s += t1 - t0
+            write_s += t2 - t1
+            written += 1
+            if on_progress:
+                on_progress(written, count)
+
+        writer.release()                    # il file deve essere completo prima del mux
+        elapsed = time.perf_counter() - started
+        stopped = written < count
+        if mux and not stopped:
+            _mux_audio(video_path, audio_path, out_path, start / fps,
+                       AUDIO_CODECS.get(ext, "aac"))
+    finally:
+        for future in in_flight:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if writer is not None:
+            writer.release()
+        timeline.close()
+        if video_path != out_path:
+            try:
+                os.remove(video_path)
+            except OSError:
+                pass
+
+    stats = {
+        "frames": written,
+        "missing": missing,
+        "seconds": elapsed,
+        "fps": written / elapsed if elapsed > 0 else 0.0,
+        "decode_wait_s": wait_s,
+        "encode_s": write_s,
+        "stopped": stopped,
+    }
+    stats.update(pool.stats())
+    info("EXPORT", "fine", out=out_path, frames=written, missing=missing,
+         seconds=round(elapsed, 2), fps=round(stats["fps"], 1),
+         decode_wait_s=round(wait_s, 2), encode_s=round(write_s, 2))
+    return stats
+
+
+def _mux_audio(video_path, audio_path, out_path, offset_s, audio_codec):
+    """Unisce video e audio (da `offset_s`) senza ricodificare il video."""
+    cmd = ["ffmpeg", "-y", "-loglevel", "error", "-i", video_path,
+           "-ss", f"{offset_s:.3f}", "-i", audio_path,
+           "-map", "0:v:0", "-map", "1:a:0", "-c:v", "copy", "-c:a", audio_codec,
+           "-shortest", out_path]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        stderr = getattr(e, "stderr", b"") or b""
+        warn("EXPORT", "mux audio fallito: filmato senza audio",
+             error=stderr.decode(errors="replace").strip() or e)
+        shutil.copyfile(video_path, out_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("csv", help="lista shot (parse_shot_list)")
+    parser.add_argument("reparto")
+    parser.add_argument("out", help=".mp4/.m4v (mp4v) oppure .avi/.mov (MJPEG)")
+    parser.add_argument("--fps", type=float, default=25)
+    parser.add_argument("--size", type=parse_size, help="WxH, oppure W con altezza in proporzione")
+    parser.add_argument("--range", type=parse_range, dest="frame_range",
+                        help="inizio-fine, frame assoluti inclusivi (0-based)")
+    parser.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1))
+    parser.add_argument("--codec", help="fourcc al posto di quello dell'estensione")
+    parser.add_argument("--no-audio", action="store_true")
+    args = parser.parse_args(argv)
+
+    shots, audio_path = parse_shot_list(args.csv)
+    if args.reparto not in getattr(shots, "timelines", {}):
+        parser.error(f"reparto {args.reparto!r} non presente in {args.csv}")
+    stats = export_movie(shots, args.reparto, args.out, fps=args.fps, size=args.size,
+                         frame_range=args.frame_range,
+                         audio_path=None if args.no_audio else audio_path,
+                         workers=args.workers, codec=args.codec)
+    print(f"{args.out}: {stats['frames']} frame in {stats['seconds']:.1f} s "
+          f"({stats['fps']:.1f} fps, mancanti {stats['missing']}, "
+          f"attesa decode {stats['decode_wait_s']:.1f} s, encode {stats['encode_s']:.1f} s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
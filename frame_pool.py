@@ -0,0 +1,130 @@
+# frame_pool.py
+
+import threading
+
+
+class FramePool:
+    """
+    Buffer dei frame decodificati riusati invece di riallocarli a ogni
+    frame (un 4K BGR sono ~25 MB: a 25 fps GB al minuto di malloc/free).
+    • acquire(shape): un buffer libero di quella forma, altrimenti uno nuovo
+    • release(buf): il proprietario (cache, scratch a piena risoluzione
+      dopo un resize) non usa più il buffer
+    • hold(buf) / drop(buf): presa esplicita di chi tiene il buffer oltre
+      il proprietario (frame prestato al playback da ImageCache.get_frame,
+      frame a schermo nel VideoWidget, coda dei frame recenti di un
+      filmato). Un buffer rilasciato torna libero solo all'ultimo drop(),
+      quindi un frame a schermo non viene mai riscritto dal decoder
+    • adopt(buf): un buffer preso e già rilasciato torna a un proprietario
+    • shape_for(key) / record(key, img): ultima forma decodificata per una
+      chiave (flag di lettura), per preparare il buffer di destinazione
+      prima della decodifica
+    Contatori: allocated (buffer nuovi, del pool o del decoder), reused,
+    dropped (liberi oltre `max_free`, lasciati al GC).
+    """
+
+    def __init__(self, max_free=8):
+        self.max_free = max_free
+        self.decode_into = True             # False se cv2 non accetta il dst
+        self.allocated = 0
+        self.reused = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._free = {}                     # forma → [buffer liberi]
+        self._free_ids = set()              # id dei buffer in _free
+        self._holds = {}                    # id → [buffer, prese attive]
+        self._released = {}                 # id → buffer rilasciato ma ancora preso
+        self._shapes = {}                   # chiave → ultima forma decodificata
+
+    @staticmethod
+    def _reusable(buf):
+        flags = getattr(buf, "flags", None)
+        # viste e oggetti non numpy: non riusabili
+        return flags is not None and buf.base is None and flags.c_contiguous and flags.writeable
+
+    def shape_for(self, key):
+        return self._shapes.get(key)
+
+    def record(self, key, img):
+        """Annota un frame allocato dal decoder (forma per la prossima lettura)."""
+        with self._lock:
+            self._shapes[key] = img.shape
+            self.allocated += 1
+
+    def acquire(self, shape):
+        shape = tuple(shape)
+        with self._lock:
+            free = self._free.get(shape)
+            if free:
+                buf = free.pop()
+                self._free_ids.discard(id(buf))
+                self.reused += 1
+                return buf
+            self.allocated += 1
+        import numpy as np
+        return np.empty(shape, np.uint8)
+
+    def hold(self, buf):
+        if not self._reusable(buf):
+            return
+        with self._lock:
+            entry = self._holds.get(id(buf))
+            if entry is None:
+                self._holds[id(buf)] = [buf, 1]
+            else:
+                entry[1] += 1
+
+    def drop(self, buf):
+        with self._lock:
+            entry = self._holds.get(id(buf))
+            if entry is None or entry[0] is not buf:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del self._holds[id(buf)]
+            if self._released.pop(id(buf), None) is not None:
+                self._put_free(buf)
+
+    def adopt(self, buf):
+        """
+        Il buffer torna a un proprietario (es. un frame rilasciato dalla
+        cache ma ancora nella coda dei recenti, consegnato di nuovo):
+        annulla il release() in sospeso, così l'ultimo drop() non lo libera.
+        """
+        with self._lock:
+            self._released.pop(id(buf), None)
+
+    def release(self, buf):
+        if not self._reusable(buf):
+            return
+        with self._lock:
+            key = id(buf)
+            if key in self._released or key in self._free_ids:
+                return
+            if key in self._holds:
+                self._released[key] = buf   # torna libero all'ultimo drop()
+            else:
+                self._put_free(buf)
+
+    def _put_free(self, buf):
+        if len(self._free_ids) < self.max_free:
+            self._free.setdefault(buf.shape, []).append(buf)
+            self._free_ids.add(id(buf))
+        else:
+            self.dropped += 1
+
+    def clear(self):
+        with self._lock:
+            self._free.clear()
+            self._free_ids.clear()
+            self._released.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pool_allocated": self.allocated,
+                "pool_reused": self.reused,
+                "pool_free": len(self._free_ids),
+                "pool_held": len(self._released),
+            }
@@ -0,0 +1,80 @@
+# frame_scan.py
+
+import os
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from debug_utils import dbg
+
+
+class FrameScan:
+    """
+    Presenza e metadati dei frame di una timeline (FrameIndex/ShotTimeline).
+    Una sola os.scandir per directory invece di una stat per frame; le
+    directory vengono lette in parallelo da `workers` thread.
+    • sizes[i] / mtimes[i]: byte e mtime_ns del frame assoluto i (-1 se manca)
+    • missing: indici assenti o vuoti, in ordine; gaps(): intervalli [start, end]
+    """
+
+    def __init__(self, frame_index, workers=8):
+        total = len(frame_index)
+        self.total = total
+        self.sizes = array("q", [-1]) * total
+        self.mtimes = array("q", [-1]) * total
+
+        by_dir = {}                         # directory → [(indice, nome file)]
+        index = 0
+        for shot in frame_index.shots:
+            for frame_num in range(shot.start_frame, shot.end_frame + 1):
+                directory, name = os.path.split(shot.path_for(frame_num))
+                by_dir.setdefault(directory, []).append((index, name))
+                index += 1
+
+        with ThreadPoolExecutor(max_workers=max(1, workers),
+                                thread_name_prefix="scan") as pool:
+            list(pool.map(self._scan_dir, by_dir.items()))
+
+        self.missing = [i for i in range(total) if self.sizes[i] <= 0]
+        self._missing_set = set(self.missing)
+        dbg("SCAN", "frame", dirs=len(by_dir), frames=total, missing=len(self.missing))
+
+    def _scan_dir(self, item):
+        directory, wanted = item
+        try:
+            with os.scandir(directory or ".") as it:
+                entries = {entry.name: entry for entry in it}
+        except OSError:
+            return                          # directory assente: tutti mancanti
+        for index, name in wanted:
+            entry = entries.get(name)
+            if entry is None:
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            self.sizes[index] = st.st_size
+            self.mtimes[index] = st.st_mtime_ns
+
+    def is_missing(self, index):
+        return index in self._missing_set
+
+    def info(self, index):
+        """(size, mtime_ns) del frame, None se manca."""
+        if self.sizes[index] <= 0:
+            return None
+        return self.sizes[index], self.mtimes[index]
+
+    def gaps(self, lo=0, hi=None):
+        """Intervalli [start, end] di frame mancanti consecutivi dentro [lo, hi]."""
+        hi = self.total - 1 if hi is None else hi
+        ranges = []
+        for i in self.missing:
+            if i < lo or i > hi:
+                continue
+            if ranges and ranges[-1][1] == i - 1:
+                ranges[-1][1] = i
+            else:
+                ranges.append([i, i])
+        return [tuple(r) for r in ranges]
@@ -0,0 +1,170 @@
+# frame_sources.py
+
+import os
+import threading
+from collections import OrderedDict
+import cv2
+
+MOVIE_EXTENSIONS = (".mov", ".mp4", ".m4v", ".mkv", ".avi", ".mxf")
+
+
+def is_movie(path):
+    return path.lower().endswith(MOVIE_EXTENSIONS)
+
+
+def _scaled(img, scale, pool=None):
+    if img is None or scale == 1:
+        return img
+    height, width = img.shape[:2]
+    size = (max(1, width // scale), max(1, height // scale))
+    if pool is None:
+        return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+    out = cv2.resize(img, size, dst=pool.acquire((size[1], size[0]) + img.shape[2:]),
+                     interpolation=cv2.INTER_AREA)
+    pool.release(img)
+    return out
+
+
+def _drop(img, pool):
+    if pool is not None:
+        pool.drop(img)
+
+
+class ImageSequenceSource:
+    """Sequenza di immagini (####, %04d, $F4): ogni frame è un file a sé."""
+
+    sequential = False
+
+    def __init__(self, shot):
+        self.shot = shot
+
+    def open(self):
+        """
+        Scalda la directory dello shot (una scandir: dentry cache locale,
+        cache delle directory su share di rete) prima del primo frame.
+        """
+        directory = os.path.dirname(self.shot.path_for(self.shot.start_frame))
+        try:
+            with os.scandir(directory or ".") as it:
+                for _ in it:
+                    pass
+        except OSError:
+            return False
+        return True
+
+    def read(self, frame_num, scale=1, pool=None):
+        from player_core import read_frame
+        if pool is None:
+            return read_frame(self.shot.path_for(frame_num), scale)
+        return read_frame(self.shot.path_for(frame_num), scale, pool)
+
+    def close(self):
+        pass
+
+
+class VideoFileSource:
+    """
+    Filmato per shot (H.264/ProRes/MJPEG…) letto con un cv2.VideoCapture
+    persistente. Il frame 0 del file corrisponde a `shot.start_frame`.
+    • lettura sequenziale: il frame successivo a quello appena uscito dal
+      decoder costa una read(), senza seek
+    • salti in avanti entro KEYFRAME_DISTANCE si coprono decodificando in
+      avanti; oltre, o all'indietro, si fa set(CAP_PROP_POS_FRAMES), che
+      con FFmpeg riparte dal keyframe precedente e decodifica fino al target
+    • i frame decodificati di passaggio restano in una piccola coda
+      (RECENT_FRAMES): i worker della cache che chiedono frame vicini fuori
+      ordine non provocano seek all'indietro
+    • con un FramePool il decoder scrive in buffer riusati (read(image));
+      i frame nella coda dei recenti restano presi (hold) finché ne escono
+    Il decoder non è thread-safe: un lock serializza le letture dello shot.
+    """
+
+    sequential = True
+    KEYFRAME_DISTANCE = 48
+    RECENT_FRAMES = 8
+
+    def __init__(self, shot):
+        self.shot = shot
+        self.path = shot.frame_path
+        self.seeks = 0
+        self.decoded = 0
+        self._lock = threading.Lock()
+        self._cap = None
+        self._next = 0                      # indice locale del prossimo frame del decoder
+        self._recent = OrderedDict()        # (indice locale, scala) → (immagine, pool)
+        self._shape = None                  # forma dei frame decodificati
+
+    def open(self):
+        """Apre il decoder (chiamabile in anticipo per scaldare il file)."""
+        with self._lock:
+            return self._ensure_open()
+
+    def _ensure_open(self):
+        if self._cap is None:
+            if not os.path.exists(self.path):
+                return False
+            cap = cv2.VideoCapture(self.path)
+            if not cap.isOpened():
+                cap.release()
+                return False
+            self._cap = cap
+            self._next = 0
+        return True
+
+    def read(self, frame_num, scale=1, pool=None):
+        local = frame_num - self.shot.start_frame
+        if local < 0:
+            return None
+        with self._lock:
+            recent = self._recent.get((local, scale))
+            if recent is not None:
+                img, held = recent
+                if held is not None:
+                    held.adopt(img)         # il chiamante ne è di nuovo proprietario
+                return img
+            if not self._ensure_open():
+                return None
+            if local < self._next or local - self._next > self.KEYFRAME_DISTANCE:
+                self._cap.set(cv2.CAP_PROP_POS_FRAMES, local)
+                self._next = local
+                self.seeks += 1
+            while self._next <= local:
+                dst = None
+                if pool is not None and self._shape is not None:
+                    dst = pool.acquire(self._shape)
+                    ok, frame = self._cap.read(dst)
+                    if frame is not dst:
+                        pool.release(dst)
+                else:
+                    ok, frame = self._cap.read()
+                if not ok:
+                    self._next = local + 1      # fine file: il prossimo accesso rifà seek
+                    return None
+                if pool is not None and frame is not dst:
+                    self._shape = frame.shape
+                    pool.record(self.path, frame)
+                img = _scaled(frame, scale, pool)
+                if pool is not None:
+                    pool.hold(img)
+                self._recent[(self._next, scale)] = (img, pool)
+                if len(self._recent) > self.RECENT_FRAMES:
+                    _drop(*self._recent.popitem(last=False)[1])
+                self._next += 1
+                self.decoded += 1
+            return img
+
+    def close(self):
+        with self._lock:
+            if self._cap is not None:
+                self._cap.release()
+                self._cap = None
+            for img, pool in self._recent.values():
+                _drop(img, pool)
+            self._recent.clear()
+
+
+def open_source(shot):
+    """Sorgente adatta al `frame_path` dello shot (filmato o sequenza)."""
+    if is_movie(shot.frame_path):
+        return VideoFileSource(shot)
+    return ImageSequenceSource(shot)
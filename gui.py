@@ -1,20 +1,48 @@
 # ⚠️ IMPORT NECESSARI
+import os
 import time
 import threading
 import queue
 import pygame
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QLabel, QListWidget,
-    QVBoxLayout, QHBoxLayout, QPushButton, QSlider, QFrame, QSpinBox, QFileDialog)
-from PyQt5.QtGui import QPalette, QColor
-from PyQt5.QtCore import Qt, QTimer
-from player_core import parse_shot_list, play_with_cache
-from debug_utils import dbg, trace, log_exception
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QLabel, QListView,
+    QVBoxLayout, QHBoxLayout, QPushButton, QSpinBox, QFileDialog, QShortcut)
+from PyQt5.QtGui import QPalette, QColor, QKeySequence
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from player_core import (play_with_cache, frame_paths_for, FrameIndex,
+                         department_timeline)
+from proxy_cache import ProxyCache, build_proxies
+from process_decoder import ProcessDecoder
+from video_widget import VideoWidget
+from shot_list_model import ShotListModel, RepartoFilterModel, CsvLoader
+from timeline_slider import TimelineSlider
+from frame_scan import FrameScan
+from perf_stats import PerfStats
+from debug_utils import dbg, trace, info, warn, log_exception
 
 class PlayerGUI(QMainWindow):
+    scan_done = pyqtSignal(object, object)      # (shot list, {reparto: FrameScan})
+    cache_stats = pyqtSignal(dict)              # stats() della cache, dal thread di playback
+    status_text = pyqtSignal(str)               # avanzamento dei lavori in background
+    frame_shown = pyqtSignal(int, int, float)   # (frame, totale, fps) dal thread di playback
+
     def __init__(self):
         super().__init__()
         self.mode_episode = True
         self.loop_enabled = False
+        self.proxy_enabled = True    # decodifica alla risoluzione del widget
+        try:
+            # None se non attivata; la scansione della cartella non blocca la GUI
+            self.proxy_cache = ProxyCache.from_env(background=True)
+        except (OSError, ValueError) as e:
+            log_exception("PROXY", e)
+            self.proxy_cache = None
+        try:
+            self.decoder = ProcessDecoder.from_env()   # None: decodifica solo nei thread
+        except ValueError as e:
+            log_exception("PROC", e)
+            self.decoder = None
+        self.proxy_build_stop = threading.Event()
+        self.proxy_build_thread = None
         self.resume_frame_index = 0  # [DEBUG INIT]
         self.is_playing = False
         self.should_stop = False
@@ -23,12 +51,14 @@ class PlayerGUI(QMainWindow):
         self.current_shot = None
 
         self.total_episode_frames = 0
-        self.episode_frame_map = []  # mappa globale di tutti i frame
+        self.episode_frame_map = FrameIndex([])  # indice globale (lazy) di tutti i frame
 
         self.setWindowTitle("Player Episodio Maga - GUI")
         self.setMinimumSize(1280, 720)
         self.loaded_shots = []
         self.audio_path = None
+        self.csv_path = None
+        self.pack_thread = None
         self.current_reparto = "animazione"
         self.set_dark_theme()
 
@@ -48,10 +78,7 @@ class PlayerGUI(QMainWindow):
         main_layout.addLayout(left_side, stretch=4)
 
         # Area video
-        self.video_frame = QLabel("Area Riproduzione (16:9)")
-        self.video_frame.setFrameStyle(QFrame.Box | QFrame.Raised)
-        self.video_frame.setAlignment(Qt.AlignCenter)
-        self.video_frame.setStyleSheet("background-color: #1e1e1e; color: #aaaaaa;")
+        self.video_frame = VideoWidget("Area Riproduzione (16:9)")
         self.video_frame.setMinimumHeight(400)
         left_side.addWidget(self.video_frame, stretch=8)
 
@@ -115,24 +142,40 @@ class PlayerGUI(QMainWindow):
         self.mode_toggle_btn.clicked.connect(self.toggle_episode_mode)
         self.mute_btn = QPushButton("🔇 Audio")
         self.render_toggle_btn = QPushButton("🎬 Animazione/Render")
+        self.proxy_btn = QPushButton("🔍 Proxy")
+        self.build_proxy_btn = QPushButton("🗂 Crea proxy")
+        self.pack_btn = QPushButton("📦 Pack episodio")
 
         for btn in [
             self.load_csv_btn, self.play_btn, self.pause_btn, self.stop_btn,
-            self.loop_btn, self.mode_toggle_btn, self.mute_btn, self.render_toggle_btn
+            self.loop_btn, self.mode_toggle_btn, self.mute_btn, self.render_toggle_btn,
+            self.proxy_btn, self.build_proxy_btn, self.pack_btn
         ]:
             btn.setStyleSheet(button_style)
             controls_layout.addWidget(btn)
+        self.proxy_btn.clicked.connect(self.handle_proxy_toggle)
+        self.build_proxy_btn.clicked.connect(self.handle_build_proxies)
+        self.pack_btn.clicked.connect(self.handle_pack_episode)
+        self.update_proxy_button()
 
         # Cache spinner
         config_layout = QHBoxLayout()
 
-        self.cache_label = QLabel("Cache:")
+        self.cache_label = QLabel("Cache MB:")
         self.cache_label.setStyleSheet("color: #dddddd;")
         self.cache_spinner = QSpinBox()
-        self.cache_spinner.setRange(10, 1000)
-        self.cache_spinner.setValue(150)
+        self.cache_spinner.setRange(64, 65536)
+        self.cache_spinner.setSingleStep(256)
+        self.cache_spinner.setValue(1024)
         self.cache_spinner.setStyleSheet("background-color: #2a2a2a; color: #ffffff;")
 
+        self.workers_label = QLabel("Worker:")
+        self.workers_label.setStyleSheet("color: #dddddd;")
+        self.workers_spinner = QSpinBox()
+        self.workers_spinner.setRange(1, 16)
+        self.workers_spinner.setValue(min(4, os.cpu_count() or 1))
+        self.workers_spinner.setStyleSheet("background-color: #2a2a2a; color: #ffffff;")
+
         self.fps_label_gui = QLabel("FPS:")
         self.fps_label_gui.setStyleSheet("color: #dddddd;")
         self.fps_spinner = QSpinBox()
@@ -142,6 +185,8 @@ class PlayerGUI(QMainWindow):
 
         config_layout.addWidget(self.cache_label)
         config_layout.addWidget(self.cache_spinner)
+        config_layout.addWidget(self.workers_label)
+        config_layout.addWidget(self.workers_spinner)
         config_layout.addWidget(self.fps_label_gui)
         config_layout.addWidget(self.fps_spinner)
 
@@ -151,10 +196,18 @@ class PlayerGUI(QMainWindow):
 
         # TIMELINE + FPS + Frame counter
         timeline_layout = QHBoxLayout()
-        self.timeline_slider = QSlider(Qt.Horizontal)
+        # [SCRUB] lo slider copre tutti i frame del range corrente (episodio o shot)
+        self.timeline_slider = TimelineSlider(Qt.Horizontal)
         self.timeline_slider.setMinimum(0)
-        self.timeline_slider.setMaximum(100)
+        self.timeline_slider.setMaximum(0)
         self.timeline_slider.setStyleSheet("background-color: #3a3a3a;")
+        self.scrub_target = None
+        self.scrub_sent = None
+        self.scrub_timer = QTimer()          # invio al ritmo del display
+        self.scrub_timer.timeout.connect(self.flush_scrub)
+        self.timeline_slider.sliderPressed.connect(self.handle_scrub_start)
+        self.timeline_slider.sliderMoved.connect(self.handle_scrub_move)
+        self.timeline_slider.sliderReleased.connect(self.handle_scrub_end)
 
         self.fps_label = QLabel("FPS: --")
         self.fps_label.setStyleSheet("color: #bbbbbb;")
@@ -162,17 +215,43 @@ class PlayerGUI(QMainWindow):
         self.frame_counter = QLabel("Frame: 0000 / 0000")
         self.frame_counter.setStyleSheet("color: #bbbbbb; padding-left: 20px;")
 
+        self.cache_status = QLabel("Cache: --")
+        self.cache_status.setStyleSheet("color: #bbbbbb; padding-left: 20px;")
+        # le etichette si aggiornano solo nel thread GUI
+        self.cache_stats.connect(self.show_cache_stats, Qt.QueuedConnection)
+        self.status_text.connect(self.cache_status.setText, Qt.QueuedConnection)
+        self.frame_shown.connect(self.show_frame_position, Qt.QueuedConnection)
+
         timeline_layout.addWidget(self.timeline_slider)
         timeline_layout.addWidget(self.frame_counter)
         timeline_layout.addWidget(self.fps_label)
+        timeline_layout.addWidget(self.cache_status)
 
         left_side.addLayout(timeline_layout)
 
         # --------------------------
         # COLONNA DESTRA (SHOT LIST)
         # --------------------------
-        self.shot_list = QListWidget()
-        self.shot_list.itemClicked.connect(self.shot_selected_in_scene_mode)
+        # modello con tutti gli shot + filtro per reparto: le righe visibili
+        # sono, nell'ordine, quelle della timeline del reparto corrente
+        self.csv_loader = None
+        # [SCAN] presenza dei frame su disco, per reparto; i buchi vanno sulla timeline
+        self.frame_scans = {}
+        self.show_missing_placeholder = True
+        self.scan_done.connect(self.on_frame_scan)
+        self.shot_model = ShotListModel()
+        self.shot_filter = RepartoFilterModel(self.current_reparto)
+        self.shot_filter.setSourceModel(self.shot_model)
+        self.shot_list = QListView()
+        self.shot_list.setModel(self.shot_filter)
+        self.shot_list.setUniformItemSizes(True)      # migliaia di righe senza misurarle
+        self.shot_list.clicked.connect(self.shot_selected_in_scene_mode)
+        # [WARM] hover e selezione scaldano in anticipo la testa dello shot
+        self.warm_row = None
+        self.shot_list.setMouseTracking(True)
+        self.shot_list.entered.connect(lambda index: self.warm_shot_row(index.row()))
+        self.shot_list.selectionModel().currentRowChanged.connect(
+            lambda current, _previous: self.warm_shot_row(current.row()))
         # La lista rimane vuota finché non viene caricato un CSV
         self.shot_list.setMaximumWidth(280)
         self.shot_list.setStyleSheet("background-color: #2a2a2a; color: #dddddd;")
@@ -193,6 +272,27 @@ class PlayerGUI(QMainWindow):
         self.pause_btn.clicked.connect(self.handle_pause)
         self.loop_btn.clicked.connect(self.handle_loop_toggle)
 
+        # [SHUTTLE] J/K/L (reverse / pausa / avanti, premuti di nuovo raddoppiano)
+        # e frecce per il frame-step; shortcut di finestra: funzionano anche
+        # con il focus sulla lista shot
+        self.shuttle_rate = 0
+        self.shuttle_shortcuts = [
+            QShortcut(QKeySequence(key), self, activated=slot)
+            for key, slot in (("J", lambda: self.handle_shuttle(-1)),
+                              ("K", lambda: self.handle_shuttle(0)),
+                              ("L", lambda: self.handle_shuttle(1)),
+                              ("Left", lambda: self.handle_frame_step(-1)),
+                              ("Right", lambda: self.handle_frame_step(1)))]
+
+        # [PERF] statistiche della sessione: overlay sul video con "I",
+        # export a fine sessione in $MAGA_PERF_EXPORT (.json o .csv)
+        self.perf = PerfStats()
+        self.video_frame.perf = self.perf
+        self.perf_overlay_timer = QTimer()
+        self.perf_overlay_timer.timeout.connect(self.refresh_perf_overlay)
+        self.perf_shortcut = QShortcut(QKeySequence("I"), self,
+                                       activated=self.toggle_perf_overlay)
+
     def update_frame_counter(self):
         self.current_frame += 1
         if self.current_frame > self.total_frames:
@@ -204,61 +304,196 @@ class PlayerGUI(QMainWindow):
         current_text = self.mode_toggle_btn.text()
         if "Episodio" in current_text:
             self.mode_toggle_btn.setText("🎯 Solo shot")
-            print("[Modalità] Riproduzione isolata dello shot selezionato")
+            info("MODE", "Riproduzione isolata dello shot selezionato")
         else:
             self.mode_toggle_btn.setText("🎯 Episodio intero")
-            print("[Modalità] Riproduzione dell'intero episodio")
+            info("MODE", "Riproduzione dell'intero episodio")
 
     def open_csv_dialog(self):
         path, _ = QFileDialog.getOpenFileName(
             self, "Seleziona file shot list", "", "CSV Files (*.csv);;All Files (*)"
         )
         if path:
-            print(f"[📂] CSV selezionato: {path}")
-            self.loaded_shots, self.audio_path = parse_shot_list(path)
-            self.populate_shot_list()
+            info("CSV", "CSV selezionato", path=path)
+            self.load_csv(path)
+
+    def load_csv(self, path):
+        """
+        Avvia la lettura del CSV in background: le righe compaiono a lotti
+        mentre il file viene letto, la GUI non si blocca.
+        """
+        if self.csv_loader is not None:
+            self.csv_loader.cancel()
+        self.csv_path = path
+        self.loaded_shots = []
+        self.audio_path = None
+        self.frame_scans = {}
+        self.shot_model.set_shots(self.loaded_shots)    # i lotti si accodano qui
+        loader = CsvLoader(path)
+        loader.batch.connect(lambda batch: self.on_csv_batch(loader, batch))
+        loader.finished.connect(lambda shots, audio: self.on_csv_loaded(loader, shots, audio))
+        loader.failed.connect(lambda error: warn("CSV", "errore CSV", error=error))
+        self.csv_loader = loader
+        loader.start()
+
+    def on_csv_batch(self, loader, batch):
+        if loader is self.csv_loader:
+            self.shot_model.append_shots(batch)
+
+    def on_csv_loaded(self, loader, shots, audio_path):
+        if loader is not self.csv_loader:
+            return                              # CSV nel frattempo sostituito
+        self.csv_loader = None
+        row = self.shot_list.currentIndex().row()
+        self.loaded_shots, self.audio_path = shots, audio_path
+        self.populate_shot_list()
+        if row >= 0:
+            self.shot_list.setCurrentIndex(self.shot_filter.index(row, 0))
+        info("CSV", f"{len(shots)} shot caricati")
+        self.start_frame_scan()
+
+    def start_frame_scan(self):
+        """Scansione dei frame su disco (tutti i reparti) in background."""
+        shots = self.loaded_shots
+        timelines = getattr(shots, "timelines", {})
+
+        def run():
+            try:
+                scans = {reparto: FrameScan(timeline)
+                         for reparto, timeline in timelines.items()}
+            except Exception as e:
+                log_exception("SCAN", e)
+                return
+            try:
+                self.scan_done.emit(shots, scans)
+            except RuntimeError:
+                pass                            # finestra già chiusa
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def show_frame_position(self, current_frame, total_frames, fps_ist):
+        self.frame_counter.setText(f"Frame: {current_frame:04d} / {total_frames:04d}")
+        self.fps_label.setText(f"FPS: {fps_ist:.2f}")
+        if not self.timeline_slider.isSliderDown():
+            self.timeline_slider.setValue(current_frame)
+
+    def show_cache_stats(self, stats):
+        self.cache_status.setText(
+            f"Cache: {stats['bytes'] / 2**20:.0f}/{stats['budget'] / 2**20:.0f} MB"
+            f" · {stats['frames']} fr")
+
+    def on_frame_scan(self, shots, scans):
+        if shots is not self.loaded_shots:
+            return                              # CSV nel frattempo cambiato
+        self.frame_scans = scans
+        for reparto, scan in scans.items():
+            if scan.missing:
+                warn("MANCANTE", f"{reparto}: {len(scan.missing)} frame assenti "
+                     f"in {len(scan.gaps())} buchi")
+        self.update_timeline_gaps()
+
+    def update_timeline_gaps(self):
+        """Segna sullo slider i buchi del range mostrato (episodio o shot)."""
+        scan = self.frame_scans.get(self.current_reparto)
+        timeline = department_timeline(self.loaded_shots, self.current_reparto)
+        lo, hi = 0, len(timeline) - 1
+        if not self.mode_episode and self.current_shot:
+            lo, hi = timeline.range_of(self.current_shot) or (lo, hi)
+        gaps = scan.gaps(lo, hi) if scan is not None and scan.total == len(timeline) else []
+        self.timeline_slider.set_gaps([(start - lo, end - lo) for start, end in gaps])
 
     def populate_shot_list(self):
-        self.shot_list.clear()
-        for shot in self.loaded_shots:
-            if shot.reparto == self.current_reparto:
-                label = f"{shot.shot_id} ({shot.start_frame}–{shot.end_frame})"
-                self.shot_list.addItem(label)
+        # il modello si ricarica solo se è cambiata la lista; il reparto è un filtro
+        if self.shot_model.shots is not self.loaded_shots:
+            self.shot_model.set_shots(self.loaded_shots)
+        self.shot_filter.set_reparto(self.current_reparto)
+        if self.mode_episode:
+            timeline = department_timeline(self.loaded_shots, self.current_reparto)
+            self.timeline_slider.setMaximum(max(0, len(timeline) - 1))
+        self.update_timeline_gaps()
+
+    # ------------------------------------------------------------ [SCRUB]
+    def slider_to_absolute(self, value):
+        """Valore dello slider → frame assoluto nella timeline del reparto."""
+        if self.mode_episode or not self.current_shot:
+            return value
+        shot_range = department_timeline(
+            self.loaded_shots, self.current_reparto).range_of(self.current_shot)
+        return value + (shot_range[0] if shot_range else 0)
+
+    def handle_scrub_start(self):
+        self.scrub_target = self.timeline_slider.value()
+        self.scrub_sent = None
+        self.scrub_timer.start(max(1, 1000 // self.fps_spinner.value()))
+
+    def handle_scrub_move(self, value):
+        # solo l'ultimo valore conta: il timer lo invia al prossimo refresh
+        self.scrub_target = value
+        self.frame_counter.setText(
+            f"Frame: {value:04d} / {self.timeline_slider.maximum() + 1:04d}")
+
+    def flush_scrub(self):
+        if self.scrub_target is None or self.scrub_target == self.scrub_sent:
+            return
+        self.scrub_sent = self.scrub_target
+        if self.is_playing and hasattr(self, "command_q"):
+            self.command_q.put(("scrub", self.slider_to_absolute(self.scrub_target)))
+
+    def handle_scrub_end(self):
+        self.scrub_timer.stop()
+        value = self.timeline_slider.value()
+        self.scrub_target = self.scrub_sent = None
+        self.resume_frame_index = value
+        dbg("GUI", "scrub end", frame=value)
+        if self.is_playing and hasattr(self, "command_q"):
+            self.command_q.put(("scrub_end", self.slider_to_absolute(value)))
 
     def toggle_reparto(self):
         if self.current_reparto == "animazione":
             self.current_reparto = "render"
             self.render_toggle_btn.setText("🎬 Render")
-            print("[Switch] Mostro shot da render")
+            info("SWITCH", "Mostro shot da render")
         else:
             self.current_reparto = "animazione"
             self.render_toggle_btn.setText("🎬 Animazione")
-            print("[Switch] Mostro shot da animazione")
-
+            info("SWITCH", "Mostro shot da animazione")
+
+        # la timeline del nuovo reparto è già pronta: solo uno scambio
+        timeline = department_timeline(self.loaded_shots, self.current_reparto)
+        self.episode_frame_map = timeline
+        self.total_episode_frames = len(timeline)
+        if self.current_shot is not None:
+            # resta sullo stesso shot (se esiste anche nell'altro reparto)
+            self.current_shot = (timeline.shot_by_id(self.current_shot.shot_id)
+                                 or self.current_shot)
         self.populate_shot_list()
 
+    def warm_shot_row(self, row):
+        """Chiede al core di decodificare a bassa priorità la testa dello shot `row`."""
+        if row == self.warm_row or not self.is_playing or not hasattr(self, "command_q"):
+            return
+        timeline = department_timeline(self.loaded_shots, self.current_reparto)
+        if 0 <= row < len(timeline.shots):
+            self.warm_row = row
+            self.command_q.put(("warm", timeline.range_of(timeline.shots[row])[0]))
+
     def shot_selected_in_scene_mode(self):
-        shots = [s for s in self.loaded_shots if s.reparto == self.current_reparto]
-        row = self.shot_list.currentRow()
-        if row < 0 or row >= len(shots):
+        timeline = department_timeline(self.loaded_shots, self.current_reparto)
+        row = self.shot_list.currentIndex().row()
+        if row < 0 or row >= len(timeline.shots):
             return
 
-        selected = shots[row]
+        selected = timeline.shots[row]
+        # frame assoluto nel montaggio del reparto: O(1) dalla timeline
+        abs_start, abs_end = timeline.range_of(selected)
         dbg("SELECT", "click lista",
             shot=selected.shot_id,
-            frame_abs=selected.absolute_start,
+            frame_abs=abs_start,
             playing=self.is_playing,
             mode="Ep" if self.mode_episode else "Sc")        
 
-        # Calcola frame assoluto nel montaggio
-        frame_global_index = 0
-        for s in shots:
-            if s.shot_id == selected.shot_id:
-                break
-            frame_global_index += (s.end_frame - s.start_frame + 1)
-
         if self.mode_episode:
-            self.resume_frame_index = selected.absolute_start
+            self.resume_frame_index = abs_start
             dbg("GUI", "enqueue seek", target=self.resume_frame_index)
             if hasattr(self, "command_q"):
                 self.command_q.put(("seek", self.resume_frame_index))
@@ -266,8 +501,6 @@ class PlayerGUI(QMainWindow):
         else:
             self.current_shot = selected
             self.resume_frame_index = 0
-            abs_start = selected.absolute_start
-            abs_end   = abs_start + (selected.end_frame - selected.start_frame)
             dbg("GUI", "trim+seek scena", start=abs_start, end=abs_end)
 
             if hasattr(self, "command_q"):
@@ -275,14 +508,15 @@ class PlayerGUI(QMainWindow):
                 self.command_q.put(("seek", abs_start))
             # nessuno stop / restart
             shot_len = selected.end_frame - selected.start_frame + 1
-            self.timeline_slider.setMaximum(shot_len)
+            self.timeline_slider.setMaximum(shot_len - 1)
             self.frame_counter.setText(f"Frame: 0000 / {shot_len:04d}")
+            self.update_timeline_gaps()
 
     def handle_play(self):
         trace("GUI", "handle_play",
             mode="Episodio" if self.mode_episode else "Scena",
             resume_frame=self.resume_frame_index)
-        print(f"[▶ handle_play] resume_frame_index: {self.resume_frame_index}")
+        dbg("PLAY", "handle_play", resume_frame_index=self.resume_frame_index)
         # [PATCH-SEEK] coda comandi (una sola istanza)
         queue_cleared = False
         if not hasattr(self, "command_q"):
@@ -296,37 +530,40 @@ class PlayerGUI(QMainWindow):
                     break
             queue_cleared = True
         if self.is_playing:
-            print("[INFO] Riproduzione già in corso.")
+            info("PLAY", "Riproduzione già in corso")
             self.should_pause = False
+            self.command_q.put(("pause", False))     # sveglia subito il core
             return
 
         if not self.loaded_shots:
-            print("⚠️ Nessuno shot caricato.")
+            warn("GUI", "Nessuno shot caricato")
             return
 
-        if self.mode_episode:
-            # filtra gli shot in base al reparto corrente
-            selected_shots = [
-                s for s in self.loaded_shots if s.reparto == self.current_reparto
-            ]
-            # mappa completa episodio solo sugli shot filtrati
-            self.episode_frame_map = []
-            for s in selected_shots:
-                self.episode_frame_map.extend(range(s.start_frame, s.end_frame + 1))
-            self.total_episode_frames = len(self.episode_frame_map)
-        else:
+        # timeline del reparto già calcolata dal parser: in Scena si riproduce
+        # la stessa timeline con un trim sullo shot, così indici e audio
+        # restano assoluti in entrambe le modalità
+        timeline = department_timeline(self.loaded_shots, self.current_reparto)
+        selected_shots = timeline.shots
+        self.episode_frame_map = timeline
+        self.total_episode_frames = len(timeline)
+        scene_range = None
+        if not self.mode_episode:
             if not self.current_shot:
-                print("[⚠️] Nessuno shot selezionato.")
+                warn("GUI", "Nessuno shot selezionato")
                 return
-            selected_shots = [self.current_shot]
-            self.episode_frame_map = list(
-                range(self.current_shot.start_frame, self.current_shot.end_frame + 1)
-            )
-            self.total_episode_frames = len(self.episode_frame_map)
-
+            scene_range = timeline.range_of(self.current_shot)
+            if scene_range is None:
+                warn("GUI", "Lo shot selezionato non appartiene al reparto corrente")
+                return
+        self.timeline_slider.setMaximum(
+            scene_range[1] - scene_range[0] if scene_range else max(0, len(timeline) - 1))
 
         fps_value = self.fps_spinner.value()
-        cache_value = self.cache_spinner.value()
+        cache_bytes = self.cache_spinner.value() * 1024 * 1024
+        workers_value = self.workers_spinner.value()
+        # [PROXY] la cache decodifica già alla dimensione dell'area video
+        proxy_size = ((self.video_frame.width(), self.video_frame.height())
+                      if self.proxy_enabled else None)
         # [PATCH] calcola offset audio corretto
         if self.mode_episode:
             start_index = self.resume_frame_index
@@ -336,28 +573,28 @@ class PlayerGUI(QMainWindow):
                                        self.total_episode_frames - 1))
             audio_offset_frames = start_index
         else:
-            shot_len = (self.current_shot.end_frame -
-                        self.current_shot.start_frame + 1)
-            start_index = max(0, min(self.resume_frame_index, shot_len - 1))
-            audio_offset_frames = (self.current_shot.absolute_start +
-                                   start_index)
-        print(f"[AUDIO] offset_frames = {audio_offset_frames}")
+            shot_len = self.current_shot.frame_count
+            start_index = scene_range[0] + max(0, min(self.resume_frame_index, shot_len - 1))
+            audio_offset_frames = start_index
+        dbg("AUDIO", "offset", offset_frames=audio_offset_frames)
 
         audio = self.audio_path  # audio sempre attivo
 
-        final_start_index = (
-            self.resume_frame_index
-            if self.mode_episode
-            else self.current_shot.absolute_start + self.resume_frame_index
-        )
-        if self.mode_episode:
-            trim_range = None
-        else:
-            trim_range = (
-                self.current_shot.absolute_start,
-                self.current_shot.absolute_start
-                + (self.current_shot.end_frame - self.current_shot.start_frame)
-            )
+        # [PACK] se esiste un pack dell'episodio per questo reparto si legge da lì
+        frame_store = None
+        if self.csv_path:
+            from episode_pack import EpisodePack, pack_path_for
+            pack_file = pack_path_for(self.csv_path, self.current_reparto)
+            if os.path.exists(pack_file + ".json"):
+                try:
+                    frame_store = EpisodePack(pack_file).reader_for(selected_shots)
+                except (OSError, ValueError, KeyError) as e:
+                    log_exception("PACK", e)
+            if frame_store is not None:
+                dbg("PLAY", "uso pack episodio", path=pack_file)
+
+        final_start_index = start_index
+        trim_range = scene_range
 
         dbg(
             "PLAY",
@@ -368,11 +605,24 @@ class PlayerGUI(QMainWindow):
         )
 
         def update_gui_live(current_frame, total_frames, fps_ist):
+            if not self.mode_episode and self.current_shot:
+                # in Scena contatore e indice sono locali allo shot
+                shot_range = timeline.range_of(self.current_shot)
+                if shot_range:
+                    current_frame -= shot_range[0]
+                    total_frames = self.current_shot.frame_count
             self.resume_frame_index = current_frame
-            self.frame_counter.setText(f"Frame: {current_frame:04d} / {total_frames:04d}")
-            self.fps_label.setText(f"FPS: {fps_ist:.2f}")
-            self.timeline_slider.setValue(int((current_frame / total_frames) * 100))
+            # etichette e slider si aggiornano nel thread GUI
+            try:
+                self.frame_shown.emit(current_frame, total_frames, fps_ist)
+            except RuntimeError:
+                pass                            # finestra già chiusa
 
+        def update_cache_status(stats):
+            try:
+                self.cache_stats.emit(dict(stats))
+            except RuntimeError:
+                pass                            # finestra già chiusa
 
         def playback_loop():
             try:
@@ -383,17 +633,26 @@ class PlayerGUI(QMainWindow):
 
                 while self.is_playing:
                     play_with_cache(
-                        selected_shots,   # <— solo shot del reparto corrente
+                        selected_shots,   # <— timeline del reparto corrente
                         self.video_frame,
                         audio,
                         fps=fps_value,
-                        max_cache_size=cache_value,
+                        max_cache_bytes=cache_bytes,
+                        workers=workers_value,
+                        proxy_size=proxy_size,
+                        proxy_cache=self.proxy_cache if self.proxy_enabled else None,
+                        frame_store=frame_store,
+                        frame_scan=self.frame_scans.get(self.current_reparto),
+                        show_placeholder=self.show_missing_placeholder,
                         on_frame=update_gui_live,
+                        on_status=update_cache_status,
                         stop_flag=lambda: self.should_stop,
                         pause_flag=lambda: self.should_pause,
                         start_index=start_index,
                         audio_offset_frames=audio_offset_frames,
-                        command_q=self.command_q       # <── PASSAGGIO CODA
+                        command_q=self.command_q,      # <── PASSAGGIO CODA
+                        perf=self.perf,
+                        decoder=self.decoder
                     )
 
                     if self.should_stop or not self.loop_enabled:
@@ -423,10 +682,8 @@ class PlayerGUI(QMainWindow):
         if self.mode_episode:
             self.command_q.put(("trim_off", None))
         else:
-            shot_len = (self.current_shot.end_frame -
-                        self.current_shot.start_frame + 1)
-            self.command_q.put(("trim", (0, shot_len - 1)))
-            # assicura che parta dal frame locale corretto
+            self.command_q.put(("trim", scene_range))
+            # assicura che parta dal frame corretto dello shot
             self.command_q.put(("seek", start_index))
 
         dbg(
@@ -438,6 +695,8 @@ class PlayerGUI(QMainWindow):
             prev_alive=self.play_thread.is_alive() if getattr(self, "play_thread", None) else False,
         )
         self.play_thread = threading.Thread(target=playback_loop, daemon=True)
+        self.is_playing = True      # già vero al ritorno: handle_pause/stop non vanno persi
+        self.shuttle_rate = 1       # il core riparte sempre a 1x
         self.play_thread.start()
 
     def handle_loop_toggle(self):
@@ -459,7 +718,7 @@ class PlayerGUI(QMainWindow):
                     background-color: #1b2d4d;
                 }
             """)
-            print("[Loop] Attivo")
+            info("LOOP", "Attivo")
         else:
             # Torna grigio default
             self.loop_btn.setStyleSheet("""
@@ -477,12 +736,131 @@ class PlayerGUI(QMainWindow):
                     background-color: #222222;
                 }
             """)
-            print("[Loop] Disattivato")
+            info("LOOP", "Disattivato")
 
         # [PATCH-LOOP] comunica il nuovo stato al core
         if hasattr(self, "command_q"):
             self.command_q.put(("loop", self.loop_enabled))
 
+    def handle_proxy_toggle(self):
+        # vale dal prossimo Play: la cache in corso mantiene la sua scala
+        self.proxy_enabled = not self.proxy_enabled
+        self.update_proxy_button()
+        info("PROXY", "Attivo" if self.proxy_enabled else "Disattivato")
+
+    def handle_build_proxies(self):
+        """
+        Genera in background i proxy su disco degli shot del reparto
+        corrente; un secondo click interrompe la generazione in corso.
+        """
+        if self.proxy_build_thread and self.proxy_build_thread.is_alive():
+            self.proxy_build_stop.set()
+            info("PROXY", "Generazione interrotta")
+            return
+        if self.proxy_cache is None:
+            warn("PROXY", "Cache proxy su disco non attiva: impostare MAGA_PROXY_CACHE")
+            return
+        shots = department_timeline(self.loaded_shots, self.current_reparto).shots
+        if not shots:
+            warn("GUI", "Nessuno shot caricato")
+            return
+
+        paths = frame_paths_for(shots)
+        target = (self.video_frame.width(), self.video_frame.height())
+        workers = self.workers_spinner.value()
+        self.proxy_build_stop = threading.Event()
+
+        def progress(done, total):
+            if done % 25 == 0 or done == total:
+                self.status_text.emit(f"Proxy: {done}/{total}")
+
+        def run():
+            try:
+                build_proxies(self.proxy_cache, paths, target, workers=workers,
+                              on_progress=progress, stop_event=self.proxy_build_stop)
+            except Exception as e:
+                log_exception("PROXY", e)
+
+        info("PROXY", f"Generazione di {len(paths)} frame", root=self.proxy_cache.root)
+        self.proxy_build_thread = threading.Thread(target=run, daemon=True)
+        self.proxy_build_thread.start()
+
+    def handle_pack_episode(self):
+        """
+        Scrive in background il pack dell'episodio (reparto corrente) accanto
+        al CSV; gli shot non modificati vengono riusati dal pack esistente.
+        """
+        if self.pack_thread and self.pack_thread.is_alive():
+            info("PACK", "Generazione già in corso")
+            return
+        if not self.csv_path:
+            warn("GUI", "Nessun CSV caricato")
+            return
+        if self.is_playing:
+            # il file in uso non può essere sostituito (Windows)
+            warn("PACK", "Ferma la riproduzione prima di creare il pack")
+            return
+        from episode_pack import pack_episode, pack_path_for
+
+        shots = department_timeline(self.loaded_shots, self.current_reparto).shots
+        if not shots:
+            warn("GUI", "Nessuno shot caricato")
+            return
+        pack_file = pack_path_for(self.csv_path, self.current_reparto)
+        target = ((self.video_frame.width(), self.video_frame.height())
+                  if self.proxy_enabled else None)
+        workers = self.workers_spinner.value()
+
+        def progress(done, total):
+            if done % 25 == 0 or done == total:
+                self.status_text.emit(f"Pack: {done}/{total}")
+
+        def run():
+            try:
+                pack_episode(shots, pack_file, target_size=target, workers=workers,
+                             on_progress=progress)
+                info("PACK", "Completato", path=pack_file)
+            except Exception as e:
+                log_exception("PACK", e)
+
+        info("PACK", "Creazione", path=pack_file)
+        self.pack_thread = threading.Thread(target=run, daemon=True)
+        self.pack_thread.start()
+
+    def update_proxy_button(self):
+        if self.proxy_enabled:
+            self.proxy_btn.setStyleSheet("""
+                QPushButton {
+                    background-color: #223366;
+                    color: white;
+                    padding: 6px 12px;
+                    border: 1px solid #555555;
+                    border-radius: 4px;
+                }
+                QPushButton:hover {
+                    background-color: #2a3b66;
+                }
+                QPushButton:pressed {
+                    background-color: #1b2d4d;
+                }
+            """)
+        else:
+            self.proxy_btn.setStyleSheet("""
+                QPushButton {
+                    background-color: #333333;
+                    color: white;
+                    padding: 6px 12px;
+                    border: 1px solid #555555;
+                    border-radius: 4px;
+                }
+                QPushButton:hover {
+                    background-color: #444444;
+                }
+                QPushButton:pressed {
+                    background-color: #222222;
+                }
+            """)
+
     def handle_stop(self):
         """
         STOP:
@@ -498,6 +876,15 @@ class PlayerGUI(QMainWindow):
         self.should_stop = True
         self.is_playing = False
 
+        # i comandi ancora in coda non servono più: il core si sveglia sullo stop
+        if hasattr(self, "command_q"):
+            while not self.command_q.empty():
+                try:
+                    self.command_q.get_nowait()
+                except queue.Empty:
+                    break
+            self.command_q.put(("stop", None))
+
         # join sicuro – solo se siamo nel thread GUI
         if (hasattr(self, "play_thread")
                 and self.play_thread.is_alive()
@@ -524,45 +911,93 @@ class PlayerGUI(QMainWindow):
             if self.total_episode_frames:
                 self.frame_counter.setText(f"Frame: 0000 / {self.total_episode_frames:04d}")
 
+    def handle_shuttle(self, direction):
+        """J/K/L: direction −1/0/+1. Stessa direzione → velocità doppia (max 4x)."""
+        if direction == 0:
+            self.handle_pause()
+            return
+        rate = self.shuttle_rate
+        if rate * direction > 0 and not self.should_pause:
+            rate = max(-4, min(4, rate * 2))
+        else:
+            rate = direction
+        if not self.is_playing:
+            self.handle_play()
+        self.shuttle_rate = rate
+        self.should_pause = False
+        dbg("GUI", "shuttle", rate=rate)
         if hasattr(self, "command_q"):
-            while not self.command_q.empty():
-                try:
-                    self.command_q.get_nowait()
-                except queue.Empty:
-                    break
-            dbg("GUI", "command queue cleared")
+            self.command_q.put(("rate", rate))
+
+    def handle_frame_step(self, delta):
+        if not self.is_playing or not hasattr(self, "command_q"):
+            return
+        self.should_pause = True
+        self.command_q.put(("step", delta))
+
+    def toggle_perf_overlay(self):
+        if self.perf_overlay_timer.isActive():
+            self.perf_overlay_timer.stop()
+            self.video_frame.set_overlay(None)
+        else:
+            self.refresh_perf_overlay()
+            self.perf_overlay_timer.start(500)
+
+    def refresh_perf_overlay(self):
+        self.video_frame.set_overlay(self.perf.overlay_lines())
+
+    def export_perf_stats(self, path):
+        try:
+            self.perf.export(path)
+            info("PERF", "statistiche salvate", path=path)
+        except OSError as e:
+            log_exception("PERF", e)
+
+    def closeEvent(self, event):
+        path = os.environ.get("MAGA_PERF_EXPORT")
+        if path:
+            self.export_perf_stats(path)
+        if self.decoder is not None:
+            # [PROC] prima si ferma il playback: i worker della cache usano il decoder
+            self.should_stop = True
+            self.is_playing = False
+            if hasattr(self, "command_q"):
+                self.command_q.put(("stop", None))
+            thread = getattr(self, "play_thread", None)
+            if thread is not None and thread.is_alive():
+                thread.join(timeout=5.0)
+            self.decoder.close()
+        super().closeEvent(event)
 
     def handle_pause(self):
         if self.is_playing:
             self.should_pause = True
-            print("[Pausa] Playback in pausa")
+            if hasattr(self, "command_q"):
+                self.command_q.put(("pause", True))
+            info("PAUSE", "Playback in pausa")
 
     def toggle_episode_mode(self):
         # non fermiamo più il thread: continuerà con trim/seek
         self.mode_episode = not self.mode_episode
         # se stiamo passando a SCENA deduci lo shot corrente dal frame globale
-        if not self.mode_episode:
-            for sh in self.loaded_shots:
-                if sh.reparto != self.current_reparto:
-                    continue
-                if sh.absolute_start <= self.resume_frame_index <= (
-                    sh.absolute_start + (sh.end_frame - sh.start_frame)
-                ):
-                    self.current_shot = sh
-                    break
+        timeline = department_timeline(self.loaded_shots, self.current_reparto)
+        if not self.mode_episode and 0 <= self.resume_frame_index < len(timeline):
+            self.current_shot, _ = timeline.shot_at(self.resume_frame_index)
+        shot_range = None
+        if self.current_shot:
+            shot_range = timeline.range_of(self.current_shot) or (
+                self.current_shot.absolute_start,
+                self.current_shot.absolute_start + self.current_shot.frame_count - 1)
         # [PATCH] sincronizza indice frame quando si cambia modalità
         if self.current_shot:
             if self.mode_episode:   # Scena → Episodio (locale → globale)
-                self.resume_frame_index = (self.current_shot.absolute_start +
-                                           self.resume_frame_index)
+                self.resume_frame_index = shot_range[0] + self.resume_frame_index
             else:                   # Episodio → Scena (globale → locale)
                 # converti l'indice globale in locale e clampalo
                 self.resume_frame_index = max(
                     0,
-                    min(
-                        self.resume_frame_index - self.current_shot.absolute_start,
-                        self.current_shot.end_frame - self.current_shot.start_frame
-                    )
+                    min(self.resume_frame_index - shot_range[0],
+                        self.current_shot.frame_count - 1)
                 )
                 
         dbg("MODE", "toggle",
@@ -574,17 +1009,17 @@ class PlayerGUI(QMainWindow):
             if self.mode_episode:
                 self.command_q.put(("trim_off", None))
                 if self.total_episode_frames:
-                    self.timeline_slider.setMaximum(self.total_episode_frames)
+                    self.timeline_slider.setMaximum(self.total_episode_frames - 1)
                     self.frame_counter.setText(f"Frame: {self.resume_frame_index:04d} / {self.total_episode_frames:04d}")
             elif self.current_shot:
-                abs_s = self.current_shot.absolute_start
-                abs_e = abs_s + (self.current_shot.end_frame - self.current_shot.start_frame)
+                abs_s, abs_e = shot_range
                 self.command_q.put(("trim", (abs_s, abs_e)))
                 self.command_q.put(("seek", abs_s + self.resume_frame_index))
                 # aggiorna slider & contatore per lo shot
                 shot_len = abs_e - abs_s + 1
-                self.timeline_slider.setMaximum(shot_len)
+                self.timeline_slider.setMaximum(shot_len - 1)
                 self.frame_counter.setText(f"Frame: {self.resume_frame_index:04d} / {shot_len:04d}")
+        self.update_timeline_gaps()
 
         if self.mode_episode:
             self.mode_toggle_btn.setText("Episodio")
@@ -603,7 +1038,7 @@ class PlayerGUI(QMainWindow):
                     background-color: #2d1d55;
                 }
             """)
-            print("[Modalità] Riproduzione dell'intero episodio")
+            info("MODE", "Riproduzione dell'intero episodio")
         else:
             self.mode_toggle_btn.setText("Scena")
             self.mode_toggle_btn.setStyleSheet("""
@@ -621,7 +1056,7 @@ class PlayerGUI(QMainWindow):
                     background-color: #246428;
                 }
             """)
-            print("[Modalità] Riproduzione isolata dello shot")
+            info("MODE", "Riproduzione isolata dello shot")
         
     def set_dark_theme(self):
         dark_palette = QPalette()
@@ -0,0 +1,115 @@
+# perf_stats.py
+
+import csv
+import json
+import threading
+import time
+from array import array
+
+# stadi del percorso caldo, in ordine di pipeline
+STAGES = ("decode", "scale", "queue_wait", "sleep_error", "convert", "paint", "seek")
+RING_SIZE = 1024
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyRing:
+    """Ultimi `size` campioni (ms) di uno stadio in un array circolare fisso."""
+
+    def __init__(self, size=RING_SIZE):
+        self.size = size
+        self.samples = array("d", [0.0]) * size
+        self.count = 0                      # campioni visti in totale
+        self.max = 0.0
+
+    def add(self, ms):
+        self.samples[self.count % self.size] = ms
+        self.count += 1
+        if ms > self.max:
+            self.max = ms
+
+    def values(self):
+        return self.samples[:min(self.count, self.size)]
+
+    def summary(self):
+        values = sorted(self.values())
+        result = {"count": self.count,
+                  "mean": sum(values) / len(values) if values else 0.0,
+                  "max": self.max}
+        for p in PERCENTILES:
+            result[f"p{p}"] = (values[min(len(values) - 1, len(values) * p // 100)]
+                               if values else 0.0)
+        return result
+
+
+class PerfStats:
+    """
+    Strumentazione del playback, condivisa tra core, cache e widget.
+    • record(stage, seconds): durata di uno stadio (decode, scale,
+      queue_wait, sleep_error, convert, paint, seek) in un LatencyRing;
+      p50/p95/p99 sono calcolati solo quando servono (snapshot)
+    • set(name, value) / add(name, n): contatori e livelli (profondità della
+      cache, frame saltati/ripetuti/mancanti, frame scartati dal widget…)
+    • overlay_lines(): testo compatto per l'overlay del VideoWidget
+    • export(path): JSON o CSV secondo l'estensione
+    Thread-safe: i campioni arrivano dai worker di decodifica, dal thread
+    di playback e dal thread GUI.
+    """
+
+    def __init__(self, ring_size=RING_SIZE):
+        self.ring_size = ring_size
+        self._lock = threading.Lock()
+        self.rings = {stage: LatencyRing(ring_size) for stage in STAGES}
+        self.counters = {}
+        self.started = time.time()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            ring = self.rings.get(stage)
+            if ring is None:
+                ring = self.rings[stage] = LatencyRing(self.ring_size)
+            ring.add(seconds * 1000.0)
+
+    def set(self, name, value):
+        with self._lock:
+            self.counters[name] = value
+
+    def add(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "started": self.started,
+                "duration": time.time() - self.started,
+                "stages": {name: ring.summary() for name, ring in self.rings.items()
+                           if ring.count},
+                "counters": dict(self.counters),
+            }
+
+    def overlay_lines(self):
+        snap = self.snapshot()
+        lines = [f"{'stadio':<12}{'p50':>7}{'p95':>7}{'p99':>7}  ms"]
+        for name, s in snap["stages"].items():
+            lines.append(f"{name:<12}{s['p50']:>7.1f}{s['p95']:>7.1f}{s['p99']:>7.1f}")
+        counters = snap["counters"]
+        if counters:
+            lines.append("  ".join(f"{name} {value}" for name, value in sorted(counters.items())))
+        return lines
+
+    def export(self, path):
+        """Scrive lo snapshot in `path`: .csv una riga per stadio/contatore, altrimenti JSON."""
+        snap = self.snapshot()
+        if path.lower().endswith(".csv"):
+            fields = ["kind", "name", "count", "mean", "p50", "p95", "p99", "max", "value"]
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=fields)
+                writer.writeheader()
+                for name, s in snap["stages"].items():
+                    writer.writerow(dict(s, kind="stage_ms", name=name))
+                for name, value in sorted(snap["counters"].items()):
+                    writer.writerow({"kind": "counter", "name": name, "value": value})
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(snap, f, indent=2)
+        return path
@@ -2,45 +2,138 @@
 # player_core.py
 
 import os
+import re
 import cv2
 import time
 import queue
 import threading
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
 import pygame
-from PyQt5.QtGui import QPixmap, QImage
-from PyQt5.QtCore import Qt
 
-from debug_utils import dbg, trace, log_exception
+from debug_utils import dbg, trace, info, warn, log_exception
+from frame_sources import open_source, is_movie
+from frame_pool import FramePool
+from perf_stats import PerfStats
 
 
+# "####" (padding = numero di #), "%04d" / "%d", "$F4" / "$F" (stile Houdini)
+_FRAME_TOKEN = re.compile(r"#+|%0?(\d*)d|\$F(\d*)")
+
+
+def frame_path_formatter(pattern):
+    """
+    Compila `pattern` una volta sola e ritorna una funzione frame → percorso.
+    Il token è l'ultimo del nome del file: "#" o "%d" nelle directory
+    restano com'erano. Un percorso senza token numerico (es. un filmato)
+    resta invariato.
+    """
+    name_start = max(pattern.rfind("/"), pattern.rfind("\\")) + 1
+    match = None
+    for match in _FRAME_TOKEN.finditer(pattern, name_start):
+        pass
+    if match is None:
+        return lambda frame: pattern
+    token = match.group(0)
+    if token.startswith("#"):
+        width = len(token)
+    else:
+        width = int(match.group(1) or match.group(2) or 0)
+    head, tail = pattern[:match.start()], pattern[match.end():]
+    return lambda frame: f"{head}{frame:0{width}d}{tail}"
+
+
+def _frame_number(value):
+    return None if value is None or value == "" else int(value)
+
+
+@dataclass(slots=True, eq=False, repr=False)
 class Shot:
-    def __init__(self, shot_id, reparto, frame_path, start_frame, end_frame, absolute_start=0):
-        self.shot_id = shot_id
-        self.reparto = reparto
-        self.frame_path = frame_path
-        self.start_frame = int(start_frame) if start_frame else None
-        self.end_frame = int(end_frame) if end_frame else None
-        self.absolute_start = absolute_start
+    # eq=False: identità come chiave (ShotTimeline) anche per shot uguali
+    # in reparti diversi
+    shot_id: str
+    reparto: str
+    frame_path: str
+    start_frame: int
+    end_frame: int
+    absolute_start: int = 0
+    _format: object = field(init=False, default=None)
+
+    def __post_init__(self):
+        # 0 è un frame valido (i filmati partono spesso da 0): solo None/"" mancano
+        self.start_frame = _frame_number(self.start_frame)
+        self.end_frame = _frame_number(self.end_frame)
+        self._format = frame_path_formatter(self.frame_path)
+
+    @property
+    def frame_count(self):
+        return self.end_frame - self.start_frame + 1
+
+    def path_for(self, frame_num):
+        return self._format(frame_num)
 
     def __repr__(self):
         return f"<Shot {self.shot_id} ({self.reparto}) - {self.start_frame} to {self.end_frame}>"
 
 
-def parse_shot_list(csv_path):
-    import csv
-    shots = []
-    audio_path = None
-
-    with open(csv_path, newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        absolute_counter = 0
-        for row in reader:
-            if row["shot_id"] == "audio":
-                audio_path = row["frame_path"]
-            else:
+class ShotList(list):
+    """Lista di Shot (in ordine di CSV) con le ShotTimeline per reparto."""
+
+    def __init__(self, shots=()):
+        super().__init__(shots)
+        self.timelines = build_timelines(self)
+
+
+def build_timelines(shots):
+    """{reparto: ShotTimeline} costruite in un solo passaggio."""
+    by_reparto = {}
+    for shot in shots:
+        by_reparto.setdefault(shot.reparto, []).append(shot)
+    return {reparto: ShotTimeline(group) for reparto, group in by_reparto.items()}
+
+
+def department_timeline(shots, reparto):
+    """
+    ShotTimeline del reparto: quella precalcolata da parse_shot_list se
+    `shots` è una ShotList, altrimenti costruita al volo.
+    """
+    timelines = getattr(shots, "timelines", None)
+    if timelines is None:
+        timelines = build_timelines(shots)
+    return timelines.get(reparto) or ShotTimeline([])
+
+
+SHOT_BATCH = 256                             # shot per lotto nella lettura in streaming
+
+
+class ShotListReader:
+    """
+    Lettura in streaming del CSV: iterando si ottengono liste di al massimo
+    `batch_size` Shot, con `absolute_start` già calcolato per reparto.
+    La riga "audio" non produce shot: il percorso finisce in `audio_path`.
+    """
+
+    def __init__(self, csv_path, batch_size=SHOT_BATCH):
+        self.csv_path = csv_path
+        self.batch_size = max(1, batch_size)
+        self.audio_path = None
+
+    def __iter__(self):
+        import csv
+        batch = []
+        with open(self.csv_path, newline='', encoding='utf-8') as csvfile:
+            reader = csv.DictReader(csvfile)
+            absolute_counters = {}          # reparto → prossimo frame assoluto
+            for row in reader:
+                if row["shot_id"] == "audio":
+                    self.audio_path = row["frame_path"]
+                    continue
                 sf = int(row["start_frame"])
                 ef = int(row["end_frame"])
-                shots.append(Shot(
+                absolute_counter = absolute_counters.get(row["reparto"], 0)
+                batch.append(Shot(
                     shot_id=row["shot_id"],
                     reparto=row["reparto"],
                     frame_path=row["frame_path"],
@@ -48,46 +141,800 @@ def parse_shot_list(csv_path):
                     end_frame=ef,
                     absolute_start=absolute_counter
                 ))
-                absolute_counter += (ef - sf + 1)
+                absolute_counters[row["reparto"]] = absolute_counter + (ef - sf + 1)
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+
+def parse_shot_list(csv_path):
+    """
+    Ritorna (ShotList, audio_path). `absolute_start` è l'offset dello shot
+    nel montaggio del proprio reparto: animazione e render hanno ciascuno
+    la propria timeline anche se le righe del CSV sono intercalate.
+    """
+    reader = ShotListReader(csv_path)
+    shots = [shot for batch in reader for shot in batch]
+    return ShotList(shots), reader.audio_path
+
+
+DEFAULT_CACHE_BYTES = 1024 * 1024 * 1024     # 1 GiB di frame decodificati
+READ_AHEAD_FRACTION = 0.75                   # il resto del budget tiene i frame già visti
+MIN_CACHE_BYTES = 64 * 1024 * 1024           # sotto pressione non si scende oltre
+MEMORY_CHECK_INTERVAL = 1.0                  # secondi tra due letture della RAM libera
+THUMB_SCALE = 4                              # scrub: riduzione rispetto al proxy
+THUMB_CACHE_FRAMES = 48                      # miniature tenute per lo scrub
+WARM_HEAD_FRAMES = 8                         # frame di testa scaldati per shot
+OPEN_SOURCES = 16                            # decoder di filmati aperti insieme al più
+MAX_RATE = 4.0                               # shuttle: da −4x a +4x
+FLAG_POLL = 0.25                             # attesa massima quando si usano stop/pause_flag
+
+
+def available_memory():
+    """
+    (disponibile, totale) in byte: psutil se installato, altrimenti
+    /proc/meminfo. None se nessuna delle due fonti è leggibile.
+    """
+    try:
+        import psutil
+        vm = psutil.virtual_memory()
+        return vm.available, vm.total
+    except Exception:
+        pass
+    try:
+        info = {}
+        with open("/proc/meminfo") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                info[key] = int(value.split()[0]) * 1024
+        return info["MemAvailable"], info["MemTotal"]
+    except Exception:
+        return None
+
+
+_REDUCED_FLAGS = {2: "IMREAD_REDUCED_COLOR_2", 4: "IMREAD_REDUCED_COLOR_4",
+                  8: "IMREAD_REDUCED_COLOR_8"}
+
+
+def choose_proxy_scale(src_w, src_h, dst_w, dst_h):
+    """Fattore di riduzione (1/2/4/8) più grande che non scende sotto dst."""
+    for scale in (8, 4, 2):
+        if src_w // scale >= dst_w and src_h // scale >= dst_h:
+            return scale
+    return 1
+
+
+def read_frame(path, scale=1, pool=None):
+    """
+    Decodifica `path` ridotto di `scale`. I JPEG usano la riduzione nativa
+    del decoder (IMREAD_REDUCED_COLOR_n, decodifica solo i coefficienti
+    necessari); gli altri formati vengono ridimensionati subito dopo.
+    Con un `pool` (frame_pool.FramePool) decodifica e resize scrivono in
+    buffer riusati e lo scratch a piena risoluzione torna subito al pool.
+    """
+    if scale > 1 and path.lower().endswith((".jpg", ".jpeg")):
+        flag = getattr(cv2, _REDUCED_FLAGS[scale], None)
+        if flag is not None:
+            return _imread(path, flag, pool)
+    img = _imread(path, None, pool)
+    if img is None or scale == 1:
+        return img
+    height, width = img.shape[:2]
+    return resize_frame(img, (max(1, width // scale), max(1, height // scale)), pool)
+
+
+_MARKS = {}                                  # lunghezza riga → segno di controllo
 
-    return shots, audio_path
+
+def _mark_of(size):
+    mark = _MARKS.get(size)
+    if mark is None:
+        import numpy as np
+        mark = _MARKS[size] = (np.arange(size, dtype=np.uint32) * 97 + 13).astype(np.uint8)
+    return mark
+
+
+def _imread(path, flag, pool):
+    if pool is None:
+        return cv2.imread(path) if flag is None else cv2.imread(path, flag)
+    key = cv2.IMREAD_COLOR if flag is None else flag
+    shape = pool.shape_for(key)
+    if shape is not None and pool.decode_into:
+        dst = pool.acquire(shape)
+        # con un dst imread non segnala i file illeggibili (torna dst intatto):
+        # l'ultima riga riceve un segno che solo una decodifica completa
+        # sovrascrive, così il file sulla share viene aperto una volta sola
+        last = dst[-1].reshape(-1)
+        mark = _mark_of(last.size)
+        last[:] = mark
+        try:
+            img = cv2.imread(path, dst, key)
+        except cv2.error as e:
+            img = None
+            if "Overload" in str(e):
+                pool.decode_into = False    # cv2 senza imread(path, dst, flags)
+            # altrimenti la risoluzione è cambiata: si rilegge e si annota
+        if img is not None and img is not dst:
+            pool.release(dst)
+            return img
+        if img is dst and not (last == mark).all():
+            return img
+        pool.release(dst)
+        # segno intatto: file illeggibile o troncato (raro: frame che lo
+        # riproduce); la lettura normale lo distingue
+    img = cv2.imread(path, key)
+    if img is not None:
+        pool.record(key, img)
+    return img
+
+
+def resize_frame(img, size, pool=None):
+    """cv2.resize a `size` (w, h); con un pool in un buffer riusato."""
+    if pool is None:
+        return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+    dst = pool.acquire((size[1], size[0]) + img.shape[2:])
+    out = cv2.resize(img, size, dst=dst, interpolation=cv2.INTER_AREA)
+    pool.release(img)
+    return out
+
+
+class FrameIndex:
+    """
+    Indice globale dei frame di una lista di shot, senza materializzare i
+    percorsi: offset cumulativi + bisect risolvono indice → (shot, frame,
+    percorso) in O(log n) al momento della richiesta.
+    Si comporta come una sequenza di percorsi (len, [i], iterazione), quindi
+    può essere passato direttamente a ImageCache.
+    read(i) decodifica attraverso la sorgente dello shot (frame_sources):
+    una per shot, aperta alla prima lettura, così sequenze di immagini e
+    filmati convivono nella stessa timeline. Dei filmati restano aperti al
+    più `max_open` decoder: oltre, si chiude quello usato meno di recente
+    (lontano dal playhead e dagli shot scaldati), che si riapre da solo se
+    il playhead ci torna. close() li rilascia tutti.
+    """
+
+    max_open = OPEN_SOURCES
+
+    def __init__(self, shots):
+        self.shots = list(shots)
+        self.starts = []
+        total = 0
+        for shot in self.shots:
+            self.starts.append(total)
+            total += shot.frame_count
+        self.total = total
+        self._sources = {}                  # posizione shot → sorgente aperta
+        self._open = OrderedDict()          # posizioni dei filmati aperti (LRU in testa)
+        self._sources_lock = threading.Lock()
+
+    def __len__(self):
+        return self.total
+
+    def locate(self, index):
+        """(posizione dello shot nella lista, frame locale 0-based)"""
+        if not 0 <= index < self.total:
+            raise IndexError(index)
+        pos = bisect_right(self.starts, index) - 1
+        return pos, index - self.starts[pos]
+
+    def resolve(self, index):
+        pos, local = self.locate(index)
+        shot = self.shots[pos]
+        frame_num = shot.start_frame + local
+        return shot, frame_num, shot.path_for(frame_num)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.total
+        return self.resolve(index)[2]
+
+    def source_at(self, pos):
+        """Sorgente persistente dello shot in posizione `pos`."""
+        source = self._sources.get(pos)
+        if source is None:
+            with self._sources_lock:
+                source = self._sources.get(pos)
+                if source is None:
+                    source = self._sources[pos] = open_source(self.shots[pos])
+        if source.sequential:
+            self._touch(pos)
+        return source
+
+    def _touch(self, pos):
+        # [SRC-LRU] decoder dei filmati: chiuso quello usato meno di recente
+        with self._sources_lock:
+            self._open[pos] = None
+            self._open.move_to_end(pos)
+            if len(self._open) <= self.max_open:
+                return
+            old, _ = self._open.popitem(last=False)
+            source = self._sources.get(old)
+        if source is not None:
+            dbg("SOURCE", "decoder chiuso", shot=self.shots[old].shot_id, open=self.max_open)
+            source.close()
+
+    def prepare(self, index):
+        """Apre in anticipo la sorgente dello shot che contiene `index`."""
+        pos, _ = self.locate(index)
+        return self.source_at(pos).open()
+
+    def read(self, index, scale=1, pool=None):
+        """Frame all'indice assoluto, ridotto di `scale` (None se non leggibile)."""
+        pos, local = self.locate(index)
+        shot = self.shots[pos]
+        source = self.source_at(pos)
+        if pool is None:
+            return source.read(shot.start_frame + local, scale)
+        return source.read(shot.start_frame + local, scale, pool)
+
+    def close(self):
+        """Rilascia i decoder aperti (filmati)."""
+        with self._sources_lock:
+            sources, self._sources = self._sources, {}
+            self._open.clear()
+        for source in sources.values():
+            source.close()
+
+    def __iter__(self):
+        for shot in self.shots:
+            for frame_num in range(shot.start_frame, shot.end_frame + 1):
+                yield shot.path_for(frame_num)
+
+
+class ShotTimeline(FrameIndex):
+    """
+    Indice di un reparto, costruito una volta sola (`total` = frame totali
+    del reparto):
+    • frame globale → shot        O(log n)  (shot_at)
+    • shot_id → shot              O(1)      (shot_by_id)
+    • shot → range assoluto/riga  O(1)      (range_of / row_of)
+    """
+
+    def __init__(self, shots):
+        super().__init__(shots)
+        self._rows = {shot: row for row, shot in enumerate(self.shots)}
+        self._by_id = {}
+        for shot in self.shots:
+            self._by_id.setdefault(shot.shot_id, shot)
+
+    def shot_at(self, index):
+        """(shot, frame locale 0-based) che contiene il frame globale `index`."""
+        pos, local = self.locate(index)
+        return self.shots[pos], local
+
+    def shot_by_id(self, shot_id):
+        return self._by_id.get(shot_id)
+
+    def row_of(self, shot):
+        return self._rows.get(shot)
+
+    def range_of(self, shot):
+        """(inizio, fine) assoluti e inclusivi dello shot, None se assente."""
+        row = self._rows.get(shot)
+        if row is None:
+            return None
+        start = self.starts[row]
+        return start, start + shot.frame_count - 1
+
+
+def frame_paths_for(shot_list):
+    """Percorsi di tutti i frame degli shot, in ordine di montaggio (lazy)."""
+    return FrameIndex(shot_list)
 
 
 class ImageCache:
-    def __init__(self, frame_paths, max_cache_size=150, start_index=0):
-        self.frame_paths = frame_paths[start_index:]
-        self.cache = queue.Queue(maxsize=max_cache_size)
+    """
+    Cache dei frame indirizzata per indice assoluto.
+    • I frame decodificati restano in un OrderedDict (ordine LRU) finché
+      stanno nel budget `max_bytes`: seek e loop su range già visti
+      vengono serviti dalla memoria.
+    • La finestra di read-ahead parte dal playhead (limitata a [lo, hi],
+      con wrap se il loop è attivo) e viene decodificata da un pool di
+      `workers` thread (cv2 rilascia il GIL). La sua lunghezza deriva dal
+      budget: misurato il primo frame, READ_AHEAD_FRACTION del budget in
+      frame; `max_cache_size` (frame a piena risoluzione) è solo un tetto
+      opzionale.
+    • seek() sposta solo la finestra: non svuota nulla.
+    • set_direction(step): la finestra procede di `step` frame alla volta
+      (negativo in reverse, |step| > 1 ad alta velocità), quindi i frame
+      che non verranno mostrati non vengono decodificati.
+    • proxy: con `target_size` (w, h) il fattore di riduzione viene scelto
+      dal primo frame e la decodifica avviene già alla risoluzione del
+      widget, quindi lo stesso budget contiene scale² frame in più.
+    • con un `proxy_cache` (proxy_cache.ProxyCache) i frame ridotti vengono
+      letti da/scritti su disco locale invece di ridecodificare l'originale.
+    • se la RAM libera del sistema scende sotto il 10% (o 512 MB) il budget
+      effettivo (`budget`) si riduce, e risale quando la pressione passa.
+    • warm(indices): frame da scaldare a bassa priorità (teste degli shot
+      vicini o puntati nella lista) solo con i worker liberi dalla finestra
+      e nella quota di budget che la finestra non usa; vengono sfrattati
+      dopo i frame già visti ma prima di quelli della finestra. Con un
+      FrameIndex la sorgente di ogni shot coinvolto viene aperta subito
+      (prepare), così il taglio non paga apertura del file o lookup della
+      directory.
+    • `missing`: indici già noti come mancanti (frame_scan.FrameScan):
+      non vengono mai decodificati e get_frame() risponde subito None.
+    • thumbnail(): percorso a bassa risoluzione per lo scrub, con una
+      piccola LRU separata che non tocca né finestra né budget.
+    • con un `pool` (frame_pool.FramePool) i frame vengono decodificati in
+      buffer riusati e quelli sfrattati tornano al pool. L'ultimo frame
+      consegnato da get_frame()/thumbnail() resta preso (hold) fino alla
+      consegna successiva: il playback lo passa al sink, che lo prende a
+      sua volta finché è a schermo.
+    • con un `perf` (perf_stats.PerfStats) vengono registrati i tempi di
+      decodifica ("decode") e di riduzione al proxy ("scale").
+    • con un `decoder` (process_decoder.ProcessDecoder) le sequenze di
+      immagini vengono decodificate in processi separati: ogni worker
+      attende il suo frame dal processo, quindi finestra, ordine di
+      consegna e budget non cambiano; i worker diventano almeno quanti
+      i processi. I filmati restano nei thread.
+    """
+
+    def __init__(self, frame_paths, max_cache_size=None, start_index=0, workers=4,
+                 max_bytes=DEFAULT_CACHE_BYTES, target_size=None, proxy_cache=None,
+                 missing=None, pool=None, perf=None, decoder=None):
+        self.frame_paths = frame_paths
+        self.pool = pool
+        self.perf = perf
+        self.decoder = decoder
+        self.proxy_cache = proxy_cache
+        self.target_size = target_size
+        self.scale = 1 if target_size is None else None    # None: ancora da stimare
+        self._proxy_size = None
+        self.read_ahead = max(1, int(max_cache_size)) if max_cache_size else None
+        self.max_bytes = max_bytes
+        self.budget = max_bytes
+        self._last_memory_check = 0.0
+        self.workers = max(1, int(workers), getattr(decoder, "processes", 0))
+
+        self._frames = OrderedDict()        # indice → immagine (LRU in testa)
+        self._thumbs = OrderedDict()        # indice → miniatura per lo scrub
+        self._pending = {}                  # indice → Future in decodifica
+        self._missing = set(missing or ())
+        self._bytes = 0
+        self._frame_bytes = 0               # dimensione dell'ultimo frame decodificato
+        self._playhead = start_index
+        self._cursor = start_index          # usato da get_image()
+        self._lo, self._hi = 0, len(frame_paths) - 1
+        self._wrap = False
+        self._step = 1                      # direzione e passo del read-ahead
+        self._warm = []                     # indici da scaldare, in ordine di priorità
+        self._lent = None                   # ultimo frame consegnato (preso nel pool)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._cond = threading.Condition()
         self.stop_event = threading.Event()
-        self.thread = threading.Thread(target=self._preload_images)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers,
+                                           thread_name_prefix="decode")
+        self.thread = threading.Thread(target=self._prefetch_loop, daemon=True)
         self.thread.start()
 
-    def _preload_images(self):
-        for path in self.frame_paths:
-            if self.stop_event.is_set():
+    # ------------------------------------------------------------ finestra
+    def _window(self):
+        """Indici della finestra di read-ahead, nell'ordine di riproduzione."""
+        if self._frame_bytes:
+            limit = max(1, int(self.budget * READ_AHEAD_FRACTION) // self._frame_bytes)
+        else:
+            limit = self.workers * 2            # primo frame non ancora misurato
+        if self.read_ahead:
+            limit = min(limit, self.read_ahead * (self.scale or 1) ** 2)
+        step = self._step
+        span = self._hi - self._lo + 1
+        i = min(max(self._playhead, self._lo), self._hi)
+        for _ in range(min(limit, -(-span // abs(step)))):
+            yield i
+            i += step
+            if not self._lo <= i <= self._hi:
+                if not self._wrap:
+                    return
+                i = self._lo + (i - self._lo) % span
+
+    def _prefetch_loop(self):
+        with self._cond:
+            while not self.stop_event.is_set():
+                self._check_memory()
+                target = None
+                if len(self._pending) < self.workers * 2:
+                    for i in self._window():
+                        if (i not in self._frames and i not in self._pending
+                                and i not in self._missing):
+                            target = i
+                            break
+                if target is None and len(self._pending) < self.workers:
+                    target = self._next_warm()
+                if target is None:
+                    self._cond.wait(0.1)
+                    continue
+                self._pending[target] = self.executor.submit(self._decode, target)
+
+    def _warm_limit(self):
+        """Quanti frame scaldati stanno nella quota di budget fuori finestra."""
+        if not self._frame_bytes:
+            return len(self._warm)
+        return int(self.budget * (1 - READ_AHEAD_FRACTION)) // self._frame_bytes
+
+    def _next_warm(self):
+        warm = self._warm[:self._warm_limit()]
+        for i in warm:
+            if i not in self._frames and i not in self._pending and i not in self._missing:
+                return i
+        return None
+
+    def _read(self, index, scale, pooled=True):
+        # FrameIndex legge dalla sorgente dello shot (sequenza o filmato)
+        pool = self.pool if pooled else None
+        if pooled and self.decoder is not None:
+            path = self.frame_paths[index]
+            if not is_movie(path):
+                # [PROC] sequenze decodificate nei processi del decoder
+                return self.decoder.read(path, scale, pool)
+        reader = getattr(self.frame_paths, "read", None)
+        if pool is None:
+            if reader is not None:
+                return reader(index, scale)
+            return read_frame(self.frame_paths[index], scale)
+        if reader is not None:
+            return reader(index, scale, pool)
+        return read_frame(self.frame_paths[index], scale, pool)
+
+    def _decode(self, index):
+        path = self.frame_paths[index]
+        scale = self.scale or 1
+        # i filmati hanno un solo percorso per tutti i frame: niente proxy su disco
+        use_proxy_cache = self.proxy_cache is not None and not is_movie(path)
+        img = None
+        if use_proxy_cache and scale > 1:
+            img = self.proxy_cache.get(path, scale)
+        if img is None:
+            t0 = time.perf_counter()
+            img = self._read(index, scale)
+            if self.perf is not None:
+                self.perf.record("decode", time.perf_counter() - t0)
+            if img is not None and self.target_size is not None:
+                img = self._fit_proxy(img)
+                if use_proxy_cache and self.scale > 1:
+                    self.proxy_cache.put(path, self.scale, img)
+        with self._cond:
+            self._pending.pop(index, None)
+            if img is None:
+                self._missing.add(index)
+                warn("MANCANTE", "frame non leggibile", path=path)
+            elif index not in self._frames:
+                size = getattr(img, "nbytes", 0)
+                self._frames[index] = img
+                self._bytes += size
+                self._frame_bytes = size
+                self._evict()
+            elif self.pool is not None and self._frames[index] is not img:
+                self.pool.release(img)          # decodificato due volte
+            self._cond.notify_all()
+
+    def _fit_proxy(self, img):
+        height, width = img.shape[:2]
+        if self.scale is None:
+            scale = choose_proxy_scale(width, height, *self.target_size)
+            self._proxy_size = (max(1, width // scale), max(1, height // scale))
+            self.scale = scale
+            dbg("CACHE", "proxy", source=f"{width}x{height}", scale=scale)
+        # i frame partiti prima della stima arrivano a piena risoluzione
+        if self._proxy_size and width > self._proxy_size[0]:
+            t0 = time.perf_counter()
+            img = resize_frame(img, self._proxy_size, self.pool)
+            if self.perf is not None:
+                self.perf.record("scale", time.perf_counter() - t0)
+        return img
+
+    def _check_memory(self):
+        now = time.monotonic()
+        if now - self._last_memory_check < MEMORY_CHECK_INTERVAL:
+            return
+        self._last_memory_check = now
+        mem = available_memory()
+        if mem is None:
+            return
+        available, total = mem
+        threshold = max(512 * 1024 * 1024, total // 10)
+        if available < threshold:
+            budget = max(MIN_CACHE_BYTES, min(self.budget, self._bytes) - (threshold - available))
+            if budget < self.budget:
+                dbg("CACHE", "memory pressure", available_mb=available >> 20,
+                    budget_mb=budget >> 20)
+                self.budget = budget
+                self._evict()
+        elif self.budget < self.max_bytes and available > 2 * threshold:
+            self.budget = min(self.max_bytes, self.budget + (available - 2 * threshold))
+
+    def _evict(self):
+        if self._bytes <= self.budget:
+            return
+        window = set(self._window())
+        warm = set(self._warm[:self._warm_limit()]) - window
+        # prima i frame fuori dalla finestra, dal meno usato di recente,
+        # poi quelli scaldati, infine la finestra dal fondo
+        victims = [i for i in self._frames if i not in window and i not in warm]
+        victims += [i for i in self._frames if i in warm]
+        victims += [i for i in reversed(list(self._frames)) if i in window]
+        for i in victims:
+            if self._bytes <= self.budget or len(self._frames) <= 1:
                 break
-            while self.cache.full():
-                time.sleep(0.001)
-            img = cv2.imread(path)
+            img = self._frames.pop(i)
+            self._bytes -= getattr(img, "nbytes", 0)
+            self.evictions += 1
+            if self.pool is not None:
+                self.pool.release(img)
+
+    # ------------------------------------------------------------ API
+    def seek(self, index):
+        """Sposta la finestra di read-ahead senza scartare la cache."""
+        with self._cond:
+            self._playhead = index
+            self._cursor = index
+            self._cond.notify_all()
+
+    def set_bounds(self, lo, hi, wrap=False):
+        """Limita il read-ahead a [lo, hi]; con wrap prosegue da lo (loop)."""
+        with self._cond:
+            self._lo = max(0, lo)
+            self._hi = min(hi, len(self.frame_paths) - 1)
+            self._wrap = wrap
+            self._cond.notify_all()
+
+    def warm(self, indices):
+        """Sostituisce l'insieme dei frame da scaldare (priorità: ordine dato)."""
+        with self._cond:
+            self._warm = [i for i in dict.fromkeys(indices) if 0 <= i < len(self.frame_paths)]
+            self._cond.notify_all()
+        prepare = getattr(self.frame_paths, "prepare", None)
+        if prepare is not None:
+            heads = {}
+            for i in self._warm:
+                heads.setdefault(self.frame_paths.locate(i)[0], i)
+            for i in heads.values():
+                self.executor.submit(prepare, i)
+
+    def set_direction(self, step):
+        """Read-ahead a passi di `step` frame (negativo = reverse)."""
+        with self._cond:
+            self._step = int(step) or 1
+            self._cond.notify_all()
+
+    def _lend(self, img):
+        # il frame consegnato non torna al pool finché non ne arriva un altro
+        if self.pool is None or img is None or img is self._lent:
+            return
+        self.pool.hold(img)
+        if self._lent is not None:
+            self.pool.drop(self._lent)
+        self._lent = img
+
+    def get_frame(self, index, timeout=1.0):
+        """Frame all'indice assoluto `index` (None se mancante o in timeout)."""
+        with self._cond:
+            self._playhead = index
+            if index in self._frames:
+                self.hits += 1
+            elif index not in self._missing:
+                self.misses += 1
+                self._cond.notify_all()
+                deadline = time.monotonic() + timeout
+                while (index not in self._frames and index not in self._missing
+                       and not self.stop_event.is_set()):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
+            img = self._frames.get(index)
             if img is not None:
-                self.cache.put(img)
+                self._frames.move_to_end(index)
+                self._lend(img)
+            self._cond.notify_all()
+            return img
+
+    def thumbnail(self, index):
+        """
+        Frame per lo scrub: quello pieno se è già in cache, altrimenti una
+        miniatura decodificata subito (THUMB_SCALE volte più piccola del
+        proxy) e conservata tra le THUMB_CACHE_FRAMES più recenti.
+        """
+        with self._cond:
+            img = self._frames.get(index)
+            if img is not None:
+                self._lend(img)
             else:
-                print(f"[MANCANTE] {path}")
+                img = self._thumbs.get(index)
+                if img is not None:
+                    self._thumbs.move_to_end(index)
+            if img is not None or index in self._missing:
+                return img
+        # le miniature restano fuori dal pool: piccole e tenute a parte
+        img = self._read(index, min(8, (self.scale or 1) * THUMB_SCALE), pooled=False)
+        if img is not None:
+            with self._cond:
+                self._thumbs[index] = img
+                while len(self._thumbs) > THUMB_CACHE_FRAMES:
+                    self._thumbs.popitem(last=False)
+        return img
 
     def get_image(self):
-        try:
-            return self.cache.get(timeout=1)
-        except queue.Empty:
-            return None
+        """Prossimo frame in ordine (i frame mancanti vengono saltati)."""
+        while self._cursor < len(self.frame_paths):
+            index = self._cursor
+            img = self.get_frame(index)
+            if img is None and index not in self._missing:
+                return None                     # timeout: riprova dallo stesso indice
+            self._cursor = index + 1
+            if img is not None:
+                return img
+        return None
+
+    def stats(self):
+        with self._cond:
+            lookups = self.hits + self.misses
+            ahead = 0                       # frame pronti di fila davanti al playhead
+            for i in self._window():
+                if i not in self._frames:
+                    break
+                ahead += 1
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "frames": len(self._frames),
+                "ahead": ahead,
+                "bytes": self._bytes,
+                "budget": self.budget,
+            }
+        if self.pool is not None:
+            stats.update(self.pool.stats())
+        if self.decoder is not None:
+            stats.update(self.decoder.stats())
+        return stats
 
     def stop(self):
         self.stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
         self.thread.join()
+        with self._cond:
+            for future in self._pending.values():
+                future.cancel()
+        self.executor.shutdown(wait=True)
+        if self.proxy_cache is not None:
+            self.proxy_cache.flush()            # ordine LRU dei proxy letti, in blocco
+        with self._cond:
+            if self._lent is not None:
+                self.pool.drop(self._lent)
+                self._lent = None
+
+
+def missing_placeholder(like):
+    """Frame scuro con la scritta MANCANTE, delle dimensioni di `like`."""
+    import numpy as np
+    height, width = like.shape[:2]
+    img = np.full((height, width, 3), 40, dtype=np.uint8)
+    scale = max(0.5, width / 640)
+    (tw, th), _ = cv2.getTextSize("MANCANTE", cv2.FONT_HERSHEY_SIMPLEX, scale, 2)
+    cv2.putText(img, "MANCANTE", ((width - tw) // 2, (height + th) // 2),
+                cv2.FONT_HERSHEY_SIMPLEX, scale, (90, 90, 200), 2, cv2.LINE_AA)
+    return img
+
+
+def _audio_position():
+    """Secondi di musica riprodotti dall'ultimo play() (None se non disponibile)."""
+    try:
+        if not pygame.mixer.get_init():
+            return None
+        ms = pygame.mixer.music.get_pos()
+    except Exception:
+        return None
+    return ms / 1000.0 if ms >= 0 else None
+
+
+class PlaybackClock:
+    """
+    Orologio master della riproduzione, basato su time.perf_counter.
+    • ancora (istante, frame): il frame `n` va a schermo a due_time(n),
+      quindi i ritardi di un frame non si accumulano sui successivi
+    • pause()/resume() spostano l'ancora della durata della pausa
+    • con `audio_position` (callable → secondi dall'ultimo play dell'audio)
+      l'audio è il master: sync_audio() misura lo scarto A/V e corregge
+      l'ancora gradualmente (SLEW) o di colpo oltre SNAP_FRAMES
+    • `dropped` / `repeated` contano i frame saltati per recuperare il
+      ritardo e quelli rimasti a schermo perché il successivo non era pronto;
+      `missing` i frame assenti su disco (placeholder o frame trattenuto)
+    • record_cut(): latenza del primo frame di ogni shot al taglio, cioè
+      quanto è arrivato dopo la sua scadenza (0 = taglio pulito)
+    • `rate` (≠ 0, anche negativo) scala l'avanzamento: position() e
+      due_time() sono sempre in frame sorgente; l'audio fa da master solo a 1x
+    """
+
+    SLEW = 0.1
+    SNAP_FRAMES = 5
+
+    def __init__(self, fps, audio_position=None):
+        self.fps = fps
+        self.frame_duration = 1.0 / fps
+        self.audio_position = audio_position
+        self.dropped = 0
+        self.repeated = 0
+        self.missing = 0
+        self.cuts = []                              # (shot_id, latenza ms)
+        self.av_offsets = deque(maxlen=10000)      # ms, audio − video
+        self._anchor_time = time.perf_counter()
+        self._anchor_frame = 0
+        self._audio_frame = 0
+        self._paused_at = None
+        self.rate = 1.0
+
+    def start(self, frame):
+        """Aggancia l'orologio a `frame` adesso (l'audio è appena ripartito da lì)."""
+        self._anchor_time = time.perf_counter()
+        self._anchor_frame = frame
+        self._audio_frame = frame
+        self._paused_at = None
+
+    seek = start
+
+    def pause(self):
+        if self._paused_at is None:
+            self._paused_at = time.perf_counter()
+
+    def resume(self):
+        if self._paused_at is not None:
+            self._anchor_time += time.perf_counter() - self._paused_at
+            self._paused_at = None
+
+    def position(self):
+        """Frame (frazionario) che dovrebbe essere a schermo adesso."""
+        now = self._paused_at if self._paused_at is not None else time.perf_counter()
+        return self._anchor_frame + (now - self._anchor_time) * self.fps * self.rate
+
+    def due_time(self, frame):
+        return self._anchor_time + (frame - self._anchor_frame) * self.frame_duration / self.rate
+
+    def sync_audio(self):
+        if self.audio_position is None or self._paused_at is not None or self.rate != 1:
+            return
+        seconds = self.audio_position()
+        if seconds is None:
+            return
+        error = self._audio_frame + seconds * self.fps - self.position()
+        self.av_offsets.append(error * self.frame_duration * 1000.0)
+        shift = error if abs(error) > self.SNAP_FRAMES else error * self.SLEW
+        self._anchor_time -= shift * self.frame_duration
+
+    def record_cut(self, shot_id, latency):
+        self.cuts.append((shot_id, max(0.0, latency) * 1000.0))
+
+    def stats(self):
+        offsets = list(self.av_offsets)
+        cuts = [ms for _, ms in self.cuts]
+        return {
+            "dropped": self.dropped,
+            "repeated": self.repeated,
+            "missing": self.missing,
+            "av_samples": len(offsets),
+            "av_mean_ms": sum(offsets) / len(offsets) if offsets else 0.0,
+            "av_max_ms": max((abs(o) for o in offsets), default=0.0),
+            "cuts": len(cuts),
+            "cut_mean_ms": sum(cuts) / len(cuts) if cuts else 0.0,
+            "cut_max_ms": max(cuts, default=0.0),
+            "cut_late": sum(1 for ms in cuts if ms > self.frame_duration * 1000.0),
+        }
 
 
-def play_with_cache(shot_list, video_label, audio_path=None, fps=25, max_cache_size=150,
-                    on_frame=None, stop_flag=None, pause_flag=None,
+def play_with_cache(shot_list, video_sink, audio_path=None, fps=25, max_cache_size=None,
+                    workers=4, max_cache_bytes=DEFAULT_CACHE_BYTES, proxy_size=None,
+                    proxy_cache=None, frame_store=None, on_frame=None, on_status=None, stop_flag=None, pause_flag=None,
                     start_index=0, audio_offset_frames=None,
-                    command_q=None):
+                    command_q=None, frame_scan=None, show_placeholder=False, perf=None,
+                    decoder=None):
         # [PATCH] calcolo offset audio (globale se Episodio, locale se Scena)
     trace("CORE", "play_with_cache",
           start_index=start_index,
@@ -100,17 +947,15 @@ def play_with_cache(shot_list, video_label, audio_path=None, fps=25, max_cache_s
 
     audio_start_frames = audio_offset_frames if audio_offset_frames is not None else start_index
     if not shot_list:
-        print("⚠ Nessuno shot da riprodurre.")
+        warn("CORE", "Nessuno shot da riprodurre")
         return
 
     frame_duration = 1.0 / fps
+    # [PERF] tempi per stadio e contatori (overlay della GUI, export a fine sessione)
+    if perf is None:
+        perf = PerfStats()
 
-    all_paths = []
-    for shot in shot_list:
-        for frame_num in range(shot.start_frame, shot.end_frame + 1):
-            padded = str(frame_num).zfill(4)
-            path = shot.frame_path.replace("####", padded)
-            all_paths.append(path)
+    all_paths = FrameIndex(shot_list)
 
     total_frame_count = len(all_paths)
     if start_index >= total_frame_count:
@@ -118,7 +963,23 @@ def play_with_cache(shot_list, video_label, audio_path=None, fps=25, max_cache_s
             start_index=start_index, max_index=total_frame_count-1)
         start_index = 0
 
-    cache = ImageCache(all_paths, max_cache_size=max_cache_size, start_index=start_index)
+    if frame_store is not None:
+        # [PACK] frame già decodificati (episode_pack.PackReader): niente imread
+        cache = frame_store
+        cache.seek(start_index)
+    else:
+        pool = FramePool()
+        cache = ImageCache(all_paths, max_cache_size=max_cache_size,
+                           start_index=start_index, workers=workers,
+                           max_bytes=max_cache_bytes, target_size=proxy_size,
+                           proxy_cache=proxy_cache,
+                           missing=frame_scan.missing if frame_scan else None,
+                           pool=pool, perf=perf, decoder=decoder)
+        if hasattr(video_sink, "pool"):
+            video_sink.pool = pool              # il sink prende i frame finché sono a schermo
+
+    # [CLOCK] il primo frame deve essere pronto prima che partano audio e orologio
+    cache.get_frame(start_index)
 
     if audio_path:
         try:
@@ -126,18 +987,23 @@ def play_with_cache(shot_list, video_label, audio_path=None, fps=25, max_cache_s
                 pygame.mixer.init()
             pygame.mixer.music.stop()
             pygame.mixer.music.load(audio_path)
-            print(f"[AUDIO DEBUG] offset_frames: {audio_start_frames}, "
-                  f"start_sec: {audio_start_frames / fps:.2f}")
+            dbg("AUDIO", "avvio", offset_frames=audio_start_frames,
+                start_sec=round(audio_start_frames / fps, 2))
             pygame.mixer.music.play(start=audio_start_frames / fps)
         except Exception as e:
-            print(f"[Errore audio] {e}")
+            warn("AUDIO", "errore audio", error=e)
+            audio_path = None
     else:
-        print("[INFO] Audio disattivato o non presente")
+        info("AUDIO", "Audio disattivato o non presente")
+
+    clock = PlaybackClock(fps, audio_position=_audio_position if audio_path else None)
+    clock.start(start_index)
 
-    timestamps_live = []
-    timestamps_all = []
+    timestamps_live = deque(maxlen=10)
+    last_status = 0.0
+    first_shown_at = last_shown_at = None
+    shown_count = 0
     total_pause_time = 0.0
-    start_time = time.time() - (start_index * frame_duration)
     pause_start_time = None
 
     # ------ PLAYBACK MAIN LOOP -------------------------------------------
@@ -145,95 +1011,279 @@ def play_with_cache(shot_list, video_label, audio_path=None, fps=25, max_cache_s
     trim_active = False          # [PATCH-TRIM] flag
     trim_start, trim_end = 0, total_frame_count - 1
     loop_on = False           # [PATCH-LOOP] stato corrente del loop
-    start_time = time.time() - (i * frame_duration)
+    paused = False            # [PATCH-PAUSE] stato da comando ("pause", bool)
+    stopped = False
+    scrubbing = False         # [SCRUB] slider trascinato: miniature, niente orologio
+    paused_before_scrub = False
+    rate = 1.0                # [SHUTTLE] velocità ("rate", r), negativa in reverse
+    step = 1                  # frame sorgente tra due frame mostrati
+    shown = start_index       # ultimo frame consegnato al sink (base dei "step")
+    # [SCAN] frame assenti noti in anticipo: placeholder o ultimo frame trattenuto
+    is_missing = frame_scan.is_missing if frame_scan is not None else (lambda index: False)
+    last_image = None
+    placeholder = None
+    set_direction = getattr(cache, "set_direction", None)
+    last_pause_flag = False
+    # [WARM] teste degli shot vicini al playhead e di quelli puntati nella GUI
+    warm = getattr(cache, "warm", None)
+    requested_heads = deque(maxlen=4)
+    warm_shot = None
+    # [CUT] taglio = primo frame di uno shot raggiunto avanzando (non con seek)
+    expected = None           # prossimo frame se non arrivano comandi
+    expected_shot = None
+    seek_started = None       # [PERF] seek in corso: latenza fino al frame a schermo
 
-    while i < total_frame_count:
-        # -------- [PATCH-SEEK/TRIM] processa eventuali comandi ------------
+    def head_frames(start):
+        pos, _ = all_paths.locate(start)
+        end = all_paths.starts[pos + 1] if pos + 1 < len(all_paths.starts) else len(all_paths)
+        return range(start, min(start + WARM_HEAD_FRAMES, end))
+
+    def update_warm(force=False):
+        nonlocal warm_shot
+        if warm is None or not 0 <= i < total_frame_count:
+            return
+        pos = all_paths.locate(i)[0]
+        if pos == warm_shot and not force:
+            return
+        warm_shot = pos
+        ahead = 1 if step > 0 else -1
+        heads = list(requested_heads)
+        for p in (pos + ahead, pos - ahead, pos + 2 * ahead):
+            if 0 <= p < len(all_paths.starts):
+                heads.append(all_paths.starts[p])
+        warm([f for head in heads for f in head_frames(head)])
+    # i frame store senza miniature (PackReader) sono già in memoria
+    thumbnail = getattr(cache, "thumbnail", None) or cache.get_frame
+
+    def publish_counters(stats):
+        perf.set("cache_frames", stats.get("frames", 0))
+        perf.set("cache_ahead", stats.get("ahead", 0))
+        for name in ("pool_allocated", "pool_reused", "proc_decoded", "proc_fallbacks"):
+            if name in stats:
+                perf.set(name, stats[name])
+        perf.set("dropped", clock.dropped)
+        perf.set("repeated", clock.repeated)
+        perf.set("missing", clock.missing)
+        perf.set("sink_dropped", getattr(video_sink, "dropped", 0))
+
+    def set_paused(flag):
+        nonlocal paused, pause_start_time, total_pause_time
+        if flag == paused:
+            return
+        paused = flag
+        if flag:
+            pause_start_time = time.perf_counter()
+            clock.pause()
+            if pygame.mixer.get_init():
+                pygame.mixer.music.pause()
+        else:
+            # l'orologio riparte dal punto della pausa
+            total_pause_time += time.perf_counter() - pause_start_time
+            pause_start_time = None
+            clock.resume()
+            if pygame.mixer.get_init() and rate == 1:
+                pygame.mixer.music.unpause()
+
+    def present(frame, image, fps_value=0.0):
+        nonlocal shown, last_image, placeholder, seek_started
+        shown = frame
+        if seek_started is not None:
+            perf.record("seek", time.perf_counter() - seek_started)
+            seek_started = None
+        if image is None and is_missing(frame) and show_placeholder and last_image is not None:
+            if placeholder is None or placeholder.shape != last_image.shape:
+                placeholder = missing_placeholder(last_image)
+            image = placeholder
+        elif image is not None:
+            last_image = image
+        if image is not None and video_sink is not None:
+            # il sink (VideoWidget) disegna nel thread GUI: qui solo consegna
+            video_sink.present(image)
+        if on_frame:
+            on_frame(frame + 1, total_frame_count, fps_value)
+
+    def resync(frame, wait=True):
+        """Dopo un salto: (attende il frame,) riparte l'audio e si riaggancia l'orologio."""
+        if wait or paused:
+            image = cache.get_frame(frame)
+            if paused:
+                # [PATCH-PAUSE] seek in pausa: il frame va subito a schermo
+                present(frame, image)
+        if audio_path:
+            pygame.mixer.music.stop()
+            if rate == 1:             # fuori da 1x l'audio resta muto
+                pygame.mixer.music.play(start=frame / fps)
+                if paused:
+                    pygame.mixer.music.pause()
+        clock.seek(frame)
+        if paused:
+            clock.pause()
+
+    def wait_commands(deadline):
+        """
+        Attende sulla coda fino a `deadline` (perf_counter; None = in pausa)
+        e restituisce TUTTI i comandi arrivati. Con pause/stop_flag esterni
+        l'attesa è limitata a FLAG_POLL per accorgersi dei flag.
+        """
+        timeout = None if deadline is None else deadline - time.perf_counter()
+        if stop_flag or pause_flag:
+            timeout = FLAG_POLL if timeout is None else min(timeout, FLAG_POLL)
+        commands = []
         try:
-            cmd, arg = command_q.get_nowait()
-            if cmd == "seek":
-                dbg("CORE", "seek request", target=arg)
-                i = max(0, min(arg, total_frame_count - 1))
-                cache.stop()
-                cache = ImageCache(all_paths, max_cache_size=max_cache_size, start_index=i)
-                start_time = time.time() - (i * frame_duration)
-                if audio_path:
-                    pygame.mixer.music.stop()
-                    pygame.mixer.music.play(start=i / fps)
+            if timeout is not None and timeout <= 0:
+                commands.append(command_q.get_nowait())
+            else:
+                commands.append(command_q.get(timeout=timeout))
+            while True:
+                commands.append(command_q.get_nowait())
+        except queue.Empty:
+            pass
+        return commands
 
+    def apply_commands(commands):
+        """
+        Applica un lotto di comandi: i seek consecutivi collassano
+        sull'ultimo target e la cache si tocca una sola volta per lotto.
+        """
+        nonlocal i, trim_active, trim_start, trim_end, loop_on, stopped
+        nonlocal scrubbing, paused_before_scrub, rate, step, seek_started
+        target = None
+        scrub_target = None
+        bounds_changed = False
+        rate_changed = False
+        warm_requested = False
+        for cmd, arg in commands:
+            if cmd == "seek":
+                target = arg
+            elif cmd == "rate":
+                new_rate = max(-MAX_RATE, min(MAX_RATE, float(arg)))
+                if new_rate == 0:
+                    set_paused(True)            # K: ferma senza perdere la velocità
+                    continue
+                rate_changed = rate_changed or new_rate != rate
+                rate = new_rate
+                set_paused(False)
+            elif cmd == "step":
+                # frame-step: in pausa, relativo al frame a schermo
+                set_paused(True)
+                target = (shown if target is None else target) + int(arg)
+            elif cmd == "scrub":
+                if not scrubbing:
+                    scrubbing = True
+                    paused_before_scrub = paused
+                    set_paused(True)
+                scrub_target = arg      # i target intermedi si perdono
+            elif cmd == "scrub_end":
+                scrub_target = None
+                target = arg            # al rilascio: seek a piena qualità
             elif cmd == "trim":
                 trim_start, trim_end = arg
                 trim_active = True
+                bounds_changed = True
+                target = trim_start        # [FIX] riparti SEMPRE dal primo frame del range
                 dbg("CORE", "trim ON", start=trim_start, end=trim_end)
-
-                # [FIX] ricrea SEMPRE la cache e riparti dal primo frame del range
-                i = trim_start
-                cache.stop()
-                cache = ImageCache(all_paths, max_cache_size=max_cache_size, start_index=i)
-                start_time = time.time() - (i * frame_duration)
-                if audio_path:
-                    pygame.mixer.music.stop()
-                    pygame.mixer.music.play(start=i / fps)
-                continue          # forza il ridisegno immediato del nuovo frame
-
             elif cmd == "trim_off":
                 trim_active = False
                 trim_start, trim_end = 0, total_frame_count - 1
+                bounds_changed = True
                 dbg("CORE", "trim OFF")
-
             elif cmd == "loop":
                 loop_on = bool(arg)
+                bounds_changed = True
                 dbg("CORE", "loop set", enabled=loop_on)
+            elif cmd == "pause":
+                set_paused(bool(arg))
+            elif cmd == "stop":
+                stopped = True
+            elif cmd == "warm":
+                if 0 <= arg < total_frame_count and arg not in requested_heads:
+                    requested_heads.appendleft(arg)
+                    warm_requested = True
+        if len(commands) > 1:
+            dbg("CORE", "command batch", size=len(commands), seek=target)
+        if bounds_changed:
+            cache.set_bounds(trim_start, trim_end, wrap=loop_on and trim_active)
+        lo, hi = (trim_start, trim_end) if trim_active else (0, total_frame_count - 1)
+        if scrub_target is not None and scrubbing and not stopped:
+            i = max(lo, min(scrub_target, hi))
+            present(i, thumbnail(i))
+        if rate_changed:
+            step = (1 if rate > 0 else -1) * max(1, int(abs(rate)))
+            clock.rate = rate
+            if set_direction:
+                set_direction(step)
+            dbg("CORE", "rate", rate=rate, step=step)
+            if target is None:
+                resync(i, wait=False)       # riaggancia l'orologio alla nuova velocità
+        if target is not None and not stopped:
+            i = max(lo, min(target, hi))
+            seek_started = time.perf_counter()
+            perf.add("seeks")
+            dbg("CORE", "seek request", target=i)
+            cache.seek(i)       # la cache resta valida: si sposta solo il read-ahead
+            resync(i)
+        update_warm(force=warm_requested)
+        if scrubbing and any(cmd == "scrub_end" for cmd, _ in commands):
+            scrubbing = False
+            set_paused(paused_before_scrub)
 
-        except queue.Empty:
-            pass
-        if stop_flag and stop_flag():
-            print("[STOP] Playback interrotto esternamente.")
+    while i < total_frame_count:
+        # -------- [PATCH-SEEK/TRIM] attesa: comandi o scadenza del frame --
+        commands = wait_commands(None if paused else clock.due_time(i))
+        if commands:
+            apply_commands(commands)
+        if stopped or (stop_flag and stop_flag()):
+            info("STOP", "Playback interrotto esternamente")
             break
+        if pause_flag and not scrubbing:
+            # il flag esterno conta solo quando cambia: rate 0 / fine reverse
+            # mettono in pausa anche con il flag a False
+            flag = bool(pause_flag())
+            if flag != last_pause_flag:
+                last_pause_flag = flag
+                set_paused(flag)
+        if paused or time.perf_counter() < clock.due_time(i):
+            continue          # si ricalcola la scadenza (eventualmente del nuovo frame)
 
-        while pause_flag and pause_flag():
-            if pause_start_time is None:
-                pause_start_time = time.time()
-                if pygame.mixer.get_init():
-                    pygame.mixer.music.pause()
-            time.sleep(0.05)
-            if stop_flag and stop_flag():
-                break
+        # -------- [CLOCK] scadenza raggiunta ------------------------------
+        perf.record("sleep_error", time.perf_counter() - clock.due_time(i))
+        clock.sync_audio()
+        lo, hi = (trim_start, trim_end) if trim_active else (0, total_frame_count - 1)
+        interval = frame_duration * abs(step / rate)      # tra due frame mostrati
+        due = clock.due_time(i)
+        scheduled, scheduled_due = i, due
+        if time.perf_counter() - due > interval:
+            # in ritardo di più di un frame: si salta (lungo il passo) al frame dell'orologio
+            behind = int((clock.position() - i) / step)
+            target = max(lo, min(i + behind * step, hi))
+            if target != i:
+                clock.dropped += abs(target - i) // abs(step)
+                i = target
+                due = clock.due_time(i)
 
-        if pause_start_time is not None:
-            # Calcola durata pausa e correggi start_time
-            pause_duration = time.time() - pause_start_time
-            total_pause_time += pause_duration
-            start_time += pause_duration
-            pause_start_time = None
-            if pygame.mixer.get_init():
-                pygame.mixer.music.unpause()
+        # al massimo fino alla scadenza del frame successivo, poi si va avanti
+        t0 = time.perf_counter()
+        frame = cache.get_frame(i, timeout=max(0.0, due + interval - time.perf_counter()))
+        perf.record("queue_wait", time.perf_counter() - t0)
+        if frame is None:
+            if is_missing(i):
+                clock.missing += 1       # il frame non esiste: la sincronia resta intatta
+            else:
+                clock.repeated += 1      # resta a schermo il frame precedente
 
-        target_time = start_time + (i * frame_duration)
-        now = time.time()
-        delay = target_time - now
-        if delay > 0:
-            time.sleep(delay)
-
-        path = all_paths[i]
-        frame = cache.get_image()
-        if frame is not None:
-            height, width, channel = frame.shape
-            bytes_per_line = 3 * width
-            img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            q_img = QImage(img_rgb.data, width, height, bytes_per_line, QImage.Format_RGB888)
-            pixmap = QPixmap.fromImage(q_img)
-            video_label.setPixmap(pixmap.scaled(
-                video_label.size(),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation
-            ))
-
-        now = time.time()
-        timestamps_all.append(now)
+        now = time.perf_counter()
+        shot_pos = all_paths.locate(i)[0]
+        if scheduled == expected and shot_pos != expected_shot:
+            # in ritardo rispetto alla scadenza del frame atteso (anche se saltato)
+            clock.record_cut(all_paths.shots[shot_pos].shot_id, now - scheduled_due)
+            dbg("CUT", "taglio", shot=all_paths.shots[shot_pos].shot_id,
+                latency_ms=round(clock.cuts[-1][1], 2))
+        expected, expected_shot = i + step, shot_pos
+        if first_shown_at is None:
+            first_shown_at = now
+        last_shown_at = now
+        shown_count += 1
         timestamps_live.append(now)
-        if len(timestamps_live) > 10:
-            timestamps_live.pop(0)
 
         if len(timestamps_live) >= 2:
             elapsed = timestamps_live[-1] - timestamps_live[0]
@@ -241,17 +1291,30 @@ def play_with_cache(shot_list, video_label, audio_path=None, fps=25, max_cache_s
         else:
             fps_istantaneo = 0.0
 
-        if on_frame:
-            on_frame(i + 1, total_frame_count, fps_istantaneo)
+        present(i, frame, fps_istantaneo)
+        update_warm()
+        if now - last_status >= 0.5:
+            last_status = now
+            cache_stats = cache.stats()
+            publish_counters(cache_stats)
+            if on_status:
+                on_status(cache_stats)
 
-        i += 1
+        i += step
+        if i < lo:
+            # [SHUTTLE] reverse oltre l'inizio del range
+            if trim_active and loop_on:
+                i = trim_end
+                resync(i, wait=False)
+            else:
+                i = lo
+                set_paused(True)        # fermo sul primo frame
+            continue
         # [PATCH-ISOLATE] se siamo in trim e superiamo la fine
         if trim_active and i > trim_end:
             if loop_on:
                 i = trim_start
-                if audio_path:
-                    pygame.mixer.music.stop()
-                    pygame.mixer.music.play(start=i / fps)
+                resync(i, wait=False)      # la testa del range è già in cache (wrap)
                 continue
             else:
                 dbg("CORE", "trim ended, stopping")
@@ -260,19 +1323,39 @@ def play_with_cache(shot_list, video_label, audio_path=None, fps=25, max_cache_s
         if trim_active and i > trim_end:
             i = trim_start  # loop di scena (anche se loop GUI disattivato)
 
+    cache_stats = cache.stats()
+    dbg("CORE", "cache stats", **cache_stats)
     cache.stop()
+    all_paths.close()
     if audio_path:
         pygame.mixer.music.stop()
 
+    publish_counters(cache_stats)
     actual_fps = None
-    if len(timestamps_all) > 1:
-        total_time = timestamps_all[-1] - timestamps_all[0] - total_pause_time
-        actual_fps = (len(timestamps_all) - 1) / total_time
-        print(f"\n[PERFORMANCE] FPS medio episodio: {actual_fps:.2f} (target: {fps})")
+    if shown_count > 1:
+        total_time = last_shown_at - first_shown_at - total_pause_time
+        actual_fps = (shown_count - 1) / total_time
+        info("PERFORMANCE", f"FPS medio episodio: {actual_fps:.2f} (target: {fps})")
         if actual_fps < fps - 1:
-            print("[⚠️ AVVISO] Il player non ha mantenuto il framerate target!")
+            warn("PERFORMANCE", "Il player non ha mantenuto il framerate target!")
+        clock_stats = clock.stats()
+        info("PERFORMANCE", f"Frame saltati: {clock_stats['dropped']}, "
+             f"ripetuti: {clock_stats['repeated']}, mancanti: {clock_stats['missing']}")
+        if "pool_allocated" in cache_stats:
+            info("PERFORMANCE", f"Buffer frame: allocati {cache_stats['pool_allocated']}, "
+                 f"riusati {cache_stats['pool_reused']}")
+        if clock_stats["cuts"]:
+            info("PERFORMANCE", f"Tagli: {clock_stats['cuts']}, latenza media "
+                 f"{clock_stats['cut_mean_ms']:.1f} ms (max {clock_stats['cut_max_ms']:.1f} ms, "
+                 f"oltre un frame: {clock_stats['cut_late']})")
+        if clock_stats["av_samples"]:
+            info("PERFORMANCE", f"A/V offset medio: {clock_stats['av_mean_ms']:+.1f} ms "
+                 f"(max {clock_stats['av_max_ms']:.1f} ms)")
+        for name, stage in perf.snapshot()["stages"].items():
+            info("PERFORMANCE", f"{name}: p50 {stage['p50']:.1f} ms, "
+                 f"p95 {stage['p95']:.1f} ms, p99 {stage['p99']:.1f} ms")
                 
     dbg("CORE", "loop ended",
         reason="stop_flag" if stop_flag and stop_flag() else "fine video",
         last_frame=i-1)
-    return actual_fps
+    return actual_fps
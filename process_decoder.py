@@ -0,0 +1,242 @@
+# process_decoder.py
+
+import os
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+from debug_utils import dbg, warn
+
+SLOTS_PER_PROCESS = 2                       # frame in volo per processo
+SLOT_POLL = 0.25                            # attesa massima di uno slot prima di ricontrollare close()
+
+# ------------------------------------------------------------------ processo figlio
+_attached = {}                              # nome slot → SharedMemory aperta nel figlio
+_child_pool = None
+
+
+def _child_init():
+    global _child_pool
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    from frame_pool import FramePool
+    _child_pool = FramePool(max_free=2)
+
+
+def _attach(name):
+    shm = _attached.get(name)
+    if shm is None:
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)   # Python ≥ 3.13
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+        _attached[name] = shm
+    return shm
+
+
+def _decode_into_slot(path, scale, slot_name, slot_bytes):
+    """
+    Decodifica `path` e copia il frame nello slot condiviso: al padre
+    tornano solo (shape, dtype). Senza slot, o se il frame non ci sta,
+    torna l'array (serializzato: il padre ingrandisce l'anello).
+    """
+    import numpy as np
+    from player_core import read_frame
+    img = read_frame(path, scale, _child_pool)
+    if img is None:
+        return None
+    if slot_name is None or img.nbytes > slot_bytes:
+        return img
+    view = np.ndarray(img.shape, img.dtype, buffer=_attach(slot_name).buf)
+    np.copyto(view, img)
+    del view
+    _child_pool.release(img)
+    return img.shape, img.dtype.str
+
+
+# ------------------------------------------------------------------ processo padre
+class ProcessDecoder:
+    """
+    Decodifica delle sequenze di immagini in un pool di processi, per i
+    formati il cui decoder non scala con i thread (EXR, TIFF 16 bit, DPX:
+    lavoro CPU che tiene il GIL o wrapper Python pesanti).
+    • read(path, scale, pool) ha la firma di read_frame e blocca il thread
+      chiamante (un worker di ImageCache) finché il frame è pronto: l'ordine
+      di consegna resta quello della cache, come con i soli thread
+    • i frame tornano in un anello di slot multiprocessing.shared_memory
+      (SLOTS_PER_PROCESS per processo) invece di essere serializzati: il
+      figlio scrive nello slot, il padre copia in un buffer del FramePool
+      e libera lo slot per la decodifica successiva
+    • la dimensione degli slot si misura sul primo frame (che torna
+      serializzato); un frame più grande fa crescere l'anello, gli slot
+      vecchi vengono scartati al rilascio
+    • se il pool di processi si rompe, se il decoder è stato chiuso o se
+      la decodifica nel figlio fallisce, il frame viene decodificato nel
+      processo corrente: un worker della cache non resta mai senza risposta
+    I filmati restano ai thread: il loro decoder è sequenziale e con stato.
+    I processi partono con "spawn": lo script principale deve avere la
+    guardia `if __name__ == "__main__"` (main.py, bench/).
+    """
+
+    def __init__(self, processes=None, slots=None):
+        self.processes = max(1, int(processes or os.cpu_count() or 1))
+        self.slot_count = max(1, int(slots or self.processes * SLOTS_PER_PROCESS))
+        self.slot_bytes = 0
+        self.decoded = 0                    # frame passati dagli slot
+        self.fallbacks = 0                  # frame tornati serializzati
+        self.broken = False
+        self._lock = threading.Lock()
+        self._executor = None
+        self._free = queue.Queue()          # slot liberi dell'anello
+        self._slots = {}                    # nome → SharedMemory creata qui
+        self._closed = False
+
+    @classmethod
+    def from_env(cls):
+        """
+        MAGA_DECODE_PROCESSES: processi di decodifica ("auto" = uno per
+        core; vuoto/0 = solo thread, nessun decoder)
+        """
+        value = os.environ.get("MAGA_DECODE_PROCESSES", "").strip().lower()
+        if value in ("", "0", "off", "none"):
+            return None
+        return cls(None if value == "auto" else int(value))
+
+    def _pool(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ProcessDecoder chiuso")
+            if self._executor is None:
+                # spawn: il padre ha già thread attivi (cache, listener dei log)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes, initializer=_child_init,
+                    mp_context=multiprocessing.get_context("spawn"))
+                dbg("PROC", "pool avviato", processes=self.processes, slots=self.slot_count)
+            return self._executor
+
+    # ------------------------------------------------------------ anello
+    def _acquire_slot(self):
+        while True:
+            with self._lock:
+                size = self.slot_bytes
+                if not size or self._closed:
+                    return None             # primo frame (dimensione ignota) o chiuso
+                try:
+                    shm = self._free.get_nowait()
+                except queue.Empty:
+                    shm = None
+                    if len(self._slots) < self.slot_count:
+                        shm = shared_memory.SharedMemory(create=True, size=size)
+                        self._slots[shm.name] = shm
+                        return shm
+            if shm is None:
+                try:
+                    shm = self._free.get(timeout=SLOT_POLL)
+                except queue.Empty:
+                    continue                # ricontrolla close()
+            if shm.size >= self.slot_bytes and not self._closed:
+                return shm
+            self._discard(shm)              # generazione precedente, troppo piccolo
+
+    def _release_slot(self, shm):
+        if self._closed or shm.size < self.slot_bytes:
+            self._discard(shm)
+        else:
+            self._free.put(shm)
+
+    def _discard(self, shm):
+        with self._lock:
+            self._slots.pop(shm.name, None)
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _grow(self, nbytes):
+        with self._lock:
+            if nbytes > self.slot_bytes:
+                self.slot_bytes = nbytes
+                dbg("PROC", "slot", bytes=nbytes, slots=self.slot_count)
+
+    # ------------------------------------------------------------ API
+    @staticmethod
+    def _read_here(path, scale, pool):
+        from player_core import read_frame
+        return read_frame(path, scale, pool)
+
+    def read(self, path, scale=1, pool=None):
+        """Frame `path` ridotto di `scale` (None se non leggibile)."""
+        if self.broken or self._closed:
+            return self._read_here(path, scale, pool)
+        import numpy as np
+        slot = self._acquire_slot()
+        try:
+            try:
+                result = self._pool().submit(
+                    _decode_into_slot, path, scale,
+                    slot.name if slot is not None else None,
+                    slot.size if slot is not None else 0).result()
+            except BrokenProcessPool as e:
+                warn("PROC", "pool di processi interrotto: decodifica nei thread", error=e)
+                self.broken = True
+                return self._read_here(path, scale, pool)
+            except Exception as e:
+                # decoder chiuso durante l'attesa (futuro annullato) o errore nel figlio
+                if not self._closed:
+                    dbg("PROC", "decodifica nel processo fallita", path=path, error=e)
+                return self._read_here(path, scale, pool)
+            if result is None or not isinstance(result, tuple):
+                if result is not None:
+                    self.fallbacks += 1
+                    self._grow(result.nbytes)
+                return result
+            shape, dtype = result
+            view = np.ndarray(shape, dtype, buffer=slot.buf)
+            if pool is not None and view.dtype == np.uint8:
+                out = pool.acquire(shape)
+            else:
+                out = np.empty(shape, dtype)
+            np.copyto(out, view)
+            del view
+            self.decoded += 1
+            return out
+        finally:
+            if slot is not None:
+                self._release_slot(slot)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "proc_decoded": self.decoded,
+                "proc_fallbacks": self.fallbacks,
+                "proc_slots": len(self._slots),
+            }
+
+    def close(self):
+        """Ferma i processi e rimuove gli slot condivisi."""
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        while True:
+            try:
+                self._discard(self._free.get_nowait())
+            except queue.Empty:
+                break
+        with self._lock:
+            leftover = list(self._slots.values())
+        for shm in leftover:                # ancora in uso: li scarta il rilascio
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,233 @@
+# proxy_cache.py
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from debug_utils import dbg
+
+DEFAULT_PROXY_DIR = os.path.join(os.path.expanduser("~"), ".cache", "maga_player", "proxy")
+DEFAULT_PROXY_BYTES = 20 * 1024 * 1024 * 1024      # 20 GiB
+_EXTENSIONS = {"jpg": ".jpg", "raw": ".npy"}
+
+
+class ProxyCache:
+    """
+    Cache su disco locale dei frame già ridotti per il proxy.
+    • un file per frame: <sorgente+scala>_<versione><ext>, dove la versione
+      è l'hash di mtime e size della sorgente: se il frame originale cambia
+      la chiave cambia e la vecchia copia viene cancellata alla riscrittura
+    • formato "jpg" (compatto, q=90) oppure "raw" (.npy BGR letto in memmap)
+    • tetto `max_bytes` con evizione LRU (l'ordine d'uso sopravvive tra le
+      sessioni tramite la mtime dei file). Una lettura aggiorna solo
+      l'ordine in memoria: gli istanti d'uso vengono scritti sui file in
+      blocco da flush() (fine del playback o della generazione), non con
+      un utime per frame
+    • background=True: la scansione iniziale della cartella (uno stat per
+      file) gira in un thread; finché non finisce i file già presenti
+      risultano mancanti e quelli scritti nel frattempo restano i più recenti
+    """
+
+    def __init__(self, root=DEFAULT_PROXY_DIR, max_bytes=DEFAULT_PROXY_BYTES, fmt="jpg",
+                 background=False):
+        if fmt not in _EXTENSIONS:
+            raise ValueError(f"formato proxy non supportato: {fmt}")
+        self.root = root
+        self.max_bytes = max_bytes
+        self.fmt = fmt
+        self.ext = _EXTENSIONS[fmt]
+        self._lock = threading.Lock()
+        self._files = OrderedDict()     # nome file → byte (LRU in testa)
+        self._by_source = {}            # prefisso sorgente → nome file attuale
+        self._touched = {}              # nome file → istante dell'ultima lettura
+        self._bytes = 0
+        os.makedirs(root, exist_ok=True)
+        if background:
+            self.scan_thread = threading.Thread(target=self._scan, name="proxy-scan",
+                                                daemon=True)
+            self.scan_thread.start()
+        else:
+            self.scan_thread = None
+            self._scan()
+
+    @classmethod
+    def from_env(cls, background=False):
+        """
+        MAGA_PROXY_CACHE   : cartella ("on"/"1" = DEFAULT_PROXY_DIR); non
+                             impostata, vuota o "off" = nessuna cache
+        MAGA_PROXY_CACHE_MB: tetto in MB
+        MAGA_PROXY_FORMAT  : jpg | raw
+        """
+        root = os.environ.get("MAGA_PROXY_CACHE", "").strip()
+        if root.lower() in ("", "0", "off", "none"):
+            return None
+        if root.lower() in ("1", "on"):
+            root = DEFAULT_PROXY_DIR
+        max_mb = int(os.environ.get("MAGA_PROXY_CACHE_MB", DEFAULT_PROXY_BYTES >> 20))
+        return cls(root, max_mb * 1024 * 1024, os.environ.get("MAGA_PROXY_FORMAT", "jpg"),
+                   background=background)
+
+    def _scan(self):
+        entries = []
+        try:
+            with os.scandir(self.root) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.endswith(self.ext):
+                        st = entry.stat()
+                        entries.append((st.st_mtime, entry.name, st.st_size))
+        except OSError as e:
+            dbg("PROXY", "scan fallita", root=self.root, err=e)
+        with self._lock:
+            # i file scritti durante la scansione restano in coda (più recenti)
+            written, self._files = self._files, OrderedDict()
+            by_source = {}
+            for _, name, size in sorted(entries):
+                if name not in written:
+                    self._files[name] = size
+                    by_source[name.split("_", 1)[0]] = name
+                    self._bytes += size
+            self._files.update(written)
+            by_source.update(self._by_source)
+            self._by_source = by_source
+            while self._bytes > self.max_bytes and len(self._files) > 1:
+                self._remove(next(iter(self._files)))
+            files, mb = len(self._files), self._bytes >> 20
+        dbg("PROXY", "scan", root=self.root, files=files, mb=mb)
+
+    def _name(self, path, scale):
+        st = os.stat(path)
+        source = hashlib.sha1(f"{os.path.abspath(path)}|{scale}".encode()).hexdigest()[:20]
+        version = hashlib.sha1(f"{st.st_mtime_ns}|{st.st_size}".encode()).hexdigest()[:10]
+        return source, f"{source}_{version}{self.ext}"
+
+    def get(self, path, scale):
+        """Frame ridotto di `scale` se presente e aggiornato, altrimenti None."""
+        try:
+            _, name = self._name(path, scale)
+        except OSError:
+            return None
+        with self._lock:
+            if name not in self._files:
+                return None
+            self._files.move_to_end(name)
+            self._touched[name] = time.time()
+        full = os.path.join(self.root, name)
+        try:
+            if self.fmt == "raw":
+                import numpy as np
+                return np.load(full, mmap_mode="r")
+            return cv2.imread(full)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, path, scale, img):
+        try:
+            source, name = self._name(path, scale)
+        except OSError:
+            return
+        full = os.path.join(self.root, name)
+        tmp = f"{full}.{threading.get_ident()}.tmp"
+        try:
+            if self.fmt == "raw":
+                import numpy as np
+                with open(tmp, "wb") as f:
+                    np.save(f, img)
+            else:
+                ok, data = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+                if not ok:
+                    return
+                with open(tmp, "wb") as f:
+                    f.write(data.tobytes())
+            os.replace(tmp, full)
+            size = os.path.getsize(full)
+        except OSError as e:
+            dbg("PROXY", "scrittura fallita", path=path, err=e)
+            return
+        with self._lock:
+            stale = self._by_source.get(source)
+            if stale and stale != name:
+                self._remove(stale)              # sorgente cambiata: invalida
+            self._by_source[source] = name
+            self._bytes += size - self._files.pop(name, 0)
+            self._files[name] = size
+            while self._bytes > self.max_bytes and len(self._files) > 1:
+                self._remove(next(iter(self._files)))
+
+    def flush(self):
+        """Scrive come mtime dei file l'istante delle letture dall'ultimo flush."""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        for name, when in touched.items():
+            try:
+                os.utime(os.path.join(self.root, name), (when, when))
+            except OSError:
+                pass                            # sfrattato nel frattempo
+
+    def _remove(self, name):
+        self._touched.pop(name, None)
+        self._bytes -= self._files.pop(name, 0)
+        source = name.split("_", 1)[0]
+        if self._by_source.get(source) == name:
+            del self._by_source[source]
+        try:
+            os.remove(os.path.join(self.root, name))
+        except OSError:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {"files": len(self._files), "bytes": self._bytes,
+                    "max_bytes": self.max_bytes}
+
+
+def build_proxies(proxy_cache, frame_paths, target_size, workers=4,
+                  on_progress=None, stop_event=None):
+    """
+    Pre-genera i proxy di `frame_paths` alla scala che il player sceglierebbe
+    per `target_size`. Pensata per girare in un thread in background.
+    Ritorna il numero di frame scritti.
+    """
+    from player_core import read_frame, choose_proxy_scale
+    from frame_sources import is_movie
+
+    # i filmati si decodificano già in sequenza: i proxy riguardano le immagini
+    frame_paths = [p for p in frame_paths if not is_movie(p)]
+    first = next((p for p in frame_paths if os.path.exists(p)), None)
+    if first is None:
+        return 0
+    img = read_frame(first)
+    height, width = img.shape[:2]
+    scale = choose_proxy_scale(width, height, *target_size)
+    size = (max(1, width // scale), max(1, height // scale))
+    total = len(frame_paths)
+    done = [0, 0]                       # [processati, scritti]
+    lock = threading.Lock()
+
+    def build_one(path):
+        if stop_event is not None and stop_event.is_set():
+            return
+        written = 0
+        if proxy_cache.get(path, scale) is None:
+            frame = read_frame(path, scale)
+            if frame is not None:
+                if frame.shape[1] != size[0]:
+                    frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                proxy_cache.put(path, scale, frame)
+                written = 1
+        with lock:
+            done[0] += 1
+            done[1] += written
+            if on_progress:
+                on_progress(done[0], total)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers),
+                            thread_name_prefix="proxy") as pool:
+        list(pool.map(build_one, frame_paths))
+    proxy_cache.flush()
+    dbg("PROXY", "build completato", frames=total, written=done[1], scale=scale)
+    return done[1]
@@ -0,0 +1,114 @@
+# shot_list_model.py
+
+import threading
+from PyQt5.QtCore import (Qt, QObject, QAbstractListModel, QSortFilterProxyModel,
+                          QModelIndex, pyqtSignal)
+from player_core import ShotList, ShotListReader
+from debug_utils import dbg, log_exception
+
+
+class ShotListModel(QAbstractListModel):
+    """
+    Modello della lista shot: tutti i reparti, in ordine di CSV.
+    Le righe vengono solo aggiunte in coda (append_shots) mentre il CSV
+    viene letto, quindi la vista resta utilizzabile durante il caricamento
+    anche con migliaia di shot. Qt.UserRole restituisce lo Shot.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.shots = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.shots)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self.shots):
+            return None
+        shot = self.shots[index.row()]
+        if role == Qt.DisplayRole:
+            return f"{shot.shot_id} ({shot.start_frame}–{shot.end_frame})"
+        if role == Qt.UserRole:
+            return shot
+        return None
+
+    def set_shots(self, shots):
+        """Sostituisce il contenuto (la lista viene tenuta per riferimento)."""
+        self.beginResetModel()
+        self.shots = shots
+        self.endResetModel()
+
+    def append_shots(self, batch):
+        if not batch:
+            return
+        first = len(self.shots)
+        self.beginInsertRows(QModelIndex(), first, first + len(batch) - 1)
+        self.shots.extend(batch)
+        self.endInsertRows()
+
+
+class RepartoFilterModel(QSortFilterProxyModel):
+    """Mostra solo gli shot del reparto corrente, senza svuotare il modello."""
+
+    def __init__(self, reparto=None, parent=None):
+        super().__init__(parent)
+        self.reparto = reparto
+
+    def set_reparto(self, reparto):
+        if reparto != self.reparto:
+            self.reparto = reparto
+            self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        shot = self.sourceModel().shots[source_row]
+        return self.reparto is None or shot.reparto == self.reparto
+
+
+class CsvLoader(QObject):
+    """
+    Legge il CSV in un thread di background e consegna gli Shot a lotti.
+    I segnali emessi dal thread arrivano alla GUI come queued connection:
+    • batch(list)               → un lotto di Shot, nell'ordine del CSV
+    • finished(object, object)  → (ShotList completa, audio_path)
+    • failed(str)
+    cancel() interrompe la lettura al prossimo lotto.
+    """
+
+    batch = pyqtSignal(list)
+    finished = pyqtSignal(object, object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, csv_path, batch_size=None, parent=None):
+        super().__init__(parent)
+        self.csv_path = csv_path
+        self.batch_size = batch_size
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        self.stop_event.set()
+
+    def _run(self):
+        reader = (ShotListReader(self.csv_path) if self.batch_size is None
+                  else ShotListReader(self.csv_path, self.batch_size))
+        shots = []
+        try:
+            for batch in reader:
+                if self.stop_event.is_set():
+                    dbg("CSV", "caricamento annullato", path=self.csv_path)
+                    return
+                shots.extend(batch)
+                self.batch.emit(batch)
+            # timeline per reparto calcolate qui, fuori dal thread GUI
+            result = ShotList(shots)
+        except (OSError, ValueError, KeyError) as e:
+            log_exception("CSV", e)
+            self.failed.emit(str(e))
+            return
+        if not self.stop_event.is_set():
+            dbg("CSV", "caricato", path=self.csv_path, shots=len(result))
+            self.finished.emit(result, reader.audio_path)
@@ -0,0 +1,58 @@
+import json
+import logging
+import os
+import sys
+
+# Ensure project root is on sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import debug_utils
+from debug_utils import dbg, parse_tag_levels, set_tag_level
+
+
+class Counted:
+    """Valore che conta quante volte viene convertito in stringa."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __str__(self):
+        self.calls += 1
+        return "v"
+
+
+def test_parse_tag_levels():
+    levels = parse_tag_levels("cache=INFO, SCAN=warning,bad,CORE=15", 5)
+    assert levels == {"CACHE": logging.INFO, "SCAN": logging.WARNING, "CORE": 15}
+
+
+def test_disabled_tag_skips_formatting(monkeypatch):
+    monkeypatch.setattr(debug_utils, "_tag_levels", {})
+    set_tag_level("MUTO", "INFO")
+    value = Counted()
+    dbg("MUTO", "niente", value=value)
+    debug_utils.flush()
+    assert value.calls == 0
+
+
+def test_enabled_record_goes_to_json_sink(tmp_path, monkeypatch):
+    monkeypatch.setattr(debug_utils, "_tag_levels", {})
+    handlers = debug_utils._listener.handlers
+    path = tmp_path / "log.jsonl"
+    debug_utils.add_json_sink(str(path))
+    try:
+        value = Counted()
+        dbg("SINK", "messaggio", frame=12, value=value)
+        debug_utils.flush()
+    finally:
+        debug_utils._listener.stop()
+        debug_utils._listener.handlers = handlers
+        debug_utils._listener.start()
+    entries = [json.loads(line) for line in path.read_text().splitlines()]
+    entry = [e for e in entries if e["tag"] == "SINK"][-1]
+    assert entry["msg"] == "messaggio" and entry["frame"] == 12
+    assert entry["level"] == "DEBUG"
+    # formattato dal listener, non dal thread che ha chiamato dbg()
+    assert value.calls >= 1
@@ -0,0 +1,122 @@
+import os
+import sys
+import types
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+np = pytest.importorskip("numpy")
+
+sys.modules.setdefault('cv2', types.ModuleType('cv2'))
+pygame_stub = types.ModuleType('pygame')
+pygame_stub.mixer = types.SimpleNamespace(get_init=lambda: False, music=types.SimpleNamespace())
+sys.modules.setdefault('pygame', pygame_stub)
+
+import player_core
+import export_movie
+from player_core import Shot, ShotList
+
+
+class FakeWriter:
+    def __init__(self, path, fourcc, fps, size):
+        self.path, self.fourcc, self.fps, self.size = path, fourcc, fps, size
+        self.frames = []
+        writers.append(self)
+
+    def isOpened(self):
+        return True
+
+    def write(self, img):
+        self.frames.append(int(img[0, 0, 0]))
+
+    def release(self):
+        pass
+
+
+writers = []
+
+
+@pytest.fixture
+def fake_cv2(monkeypatch):
+    writers.clear()
+    cv2 = types.SimpleNamespace(VideoWriter=FakeWriter,
+                                VideoWriter_fourcc=lambda *c: "".join(c))
+    monkeypatch.setattr(export_movie, 'cv2', cv2)
+    monkeypatch.setattr(export_movie, 'missing_placeholder',
+                        lambda like: np.full(like.shape, 255, np.uint8))
+    return cv2
+
+
+def make_shot(tmp_path, name, reparto, frames, missing=()):
+    folder = tmp_path / f"{name}_{reparto}"
+    folder.mkdir()
+    for n in range(1, frames + 1):
+        if n not in missing:
+            (folder / f"f{n:04d}.png").write_text(str(n))
+    return Shot(name, reparto, str(folder / "f####.png"), 1, frames)
+
+
+def test_export_writes_range_in_order_with_placeholders(tmp_path, monkeypatch, fake_cv2):
+    def fake_read(path, scale=1, pool=None):
+        if not os.path.exists(path):
+            return None
+        base = 100 if "s2" in path else 0
+        return np.full((4, 6, 3), base + int(open(path).read()), np.uint8)
+
+    monkeypatch.setattr(player_core, 'read_frame', fake_read)
+    shots = ShotList([make_shot(tmp_path, "s1", "animazione", 5),
+                      make_shot(tmp_path, "s1", "render", 5),
+                      make_shot(tmp_path, "s2", "animazione", 4, missing=(2,))])
+
+    stats = export_movie.export_movie(shots, "animazione", str(tmp_path / "out.avi"),
+                                      fps=24, frame_range=(3, 7), workers=3)
+
+    (writer,) = writers
+    assert writer.fourcc == "MJPG" and writer.size == (6, 4) and writer.fps == 24
+    # s1 frame 4-5, poi s2 frame 1, mancante, 3: ordine della timeline del reparto
+    assert writer.frames == [4, 5, 101, 255, 103]
+    assert stats["frames"] == 5 and stats["missing"] == 1
+
+
+def test_export_rejects_range_outside_timeline(tmp_path, monkeypatch, fake_cv2):
+    monkeypatch.setattr(player_core, 'read_frame',
+                        lambda path, scale=1, pool=None: np.zeros((4, 6, 3), np.uint8))
+    shots = ShotList([make_shot(tmp_path, "s1", "animazione", 3)])
+    with pytest.raises(ValueError):
+        export_movie.export_movie(shots, "animazione", str(tmp_path / "out.mp4"),
+                                  frame_range=(5, 9))
+
+
+def test_size_and_range_parsing():
+    assert export_movie.parse_size("1280x720") == (1280, 720)
+    assert export_movie.output_size(4096, 2160, export_movie.parse_size("1280")) == (1280, 676)
+    assert export_movie.output_size(1920, 1080, None) == (1920, 1080)
+    assert export_movie.parse_range("100-399") == (100, 399)
+    assert export_movie.parse_range("100-") == (100, None)
+
+
+def test_export_cleans_up_when_writer_fails(tmp_path, monkeypatch, fake_cv2):
+    class ClosedWriter(FakeWriter):
+        def isOpened(self):
+            return False
+
+    closed = []
+    monkeypatch.setattr(fake_cv2, 'VideoWriter', ClosedWriter)
+    monkeypatch.setattr(export_movie.shutil, 'which', lambda name: "/usr/bin/ffmpeg")
+    monkeypatch.setattr(player_core.FrameIndex, 'close', lambda self: closed.append(self))
+    monkeypatch.setattr(player_core, 'read_frame',
+                        lambda path, scale=1, pool=None: np.zeros((4, 6, 3), np.uint8))
+    shots = ShotList([make_shot(tmp_path, "s1", "animazione", 3)])
+    audio = tmp_path / "audio.wav"
+    audio.write_bytes(b"RIFF")
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+
+    with pytest.raises(RuntimeError):
+        export_movie.export_movie(shots, "animazione", str(out_dir / "review.mp4"),
+                                  audio_path=str(audio))
+    # il file temporaneo del video da muxare non resta accanto all'uscita
+    assert os.listdir(out_dir) == []
+    assert len(closed) == 1
@@ -0,0 +1,53 @@
+import os
+import sys
+import types
+
+# Ensure project root is on sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Provide minimal stubs so player_core can be imported without optional deps
+sys.modules.setdefault('cv2', types.ModuleType('cv2'))
+pygame_stub = types.ModuleType('pygame')
+pygame_stub.mixer = types.SimpleNamespace(get_init=lambda: False, music=types.SimpleNamespace())
+sys.modules.setdefault('pygame', pygame_stub)
+
+from player_core import FrameIndex, Shot, frame_path_formatter
+
+
+def test_frame_path_patterns():
+    assert frame_path_formatter("a/frame####.png")(7) == "a/frame0007.png"
+    assert frame_path_formatter("a/frame######.exr")(12) == "a/frame000012.exr"
+    assert frame_path_formatter("a/frame.%04d.jpg")(7) == "a/frame.0007.jpg"
+    assert frame_path_formatter("a/frame.%d.jpg")(7) == "a/frame.7.jpg"
+    assert frame_path_formatter("a/frame.$F4.png")(1001) == "a/frame.1001.png"
+    assert frame_path_formatter("a/frame.$F.png")(3) == "a/frame.3.png"
+    assert frame_path_formatter("a/movie.mov")(3) == "a/movie.mov"
+    # token solo nel nome del file: "#" e "%d" nelle directory restano
+    assert frame_path_formatter("/proj/#shots/a.####.exr")(7) == "/proj/#shots/a.0007.exr"
+    assert frame_path_formatter("/proj/100%done/a.%04d.png")(7) == "/proj/100%done/a.0007.png"
+    assert frame_path_formatter("/proj/#shots/a.mov")(7) == "/proj/#shots/a.mov"
+
+
+def test_shot_starting_at_frame_zero():
+    shot = Shot("a", "animazione", "/x/a.mov", 0, 10)
+    assert shot.start_frame == 0 and shot.frame_count == 11
+    assert len(FrameIndex([shot])) == 11
+    assert Shot("b", "animazione", "/x/b.####.exr", "0", "").end_frame is None
+
+
+def test_frame_index_resolve():
+    shots = [
+        Shot("s1", "animazione", "s1/f####.png", 1, 3),
+        Shot("s2", "animazione", "s2/f.%04d.png", 101, 102),
+        Shot("s3", "animazione", "s3/f.$F4.png", 5, 5),
+    ]
+    index = FrameIndex(shots)
+
+    assert len(index) == 6
+    assert index.resolve(0) == (shots[0], 1, "s1/f0001.png")
+    assert index.resolve(3) == (shots[1], 101, "s2/f.0101.png")
+    assert index.resolve(5) == (shots[2], 5, "s3/f.0005.png")
+    assert index[-1] == "s3/f.0005.png"
+    assert list(index) == [index[i] for i in range(6)]
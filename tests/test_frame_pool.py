@@ -0,0 +1,128 @@
+import os
+import sys
+import time
+import types
+import pytest
+
+# Ensure project root is on sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+np = pytest.importorskip("numpy")
+
+sys.modules.setdefault('cv2', types.ModuleType('cv2'))
+pygame_stub = types.ModuleType('pygame')
+pygame_stub.mixer = types.SimpleNamespace(get_init=lambda: False, music=types.SimpleNamespace())
+sys.modules.setdefault('pygame', pygame_stub)
+
+import player_core
+from player_core import ImageCache, read_frame
+from frame_pool import FramePool
+
+
+def fake_cv2(reads):
+    """cv2 finto: il frame N vale N in ogni pixel; imread(path, dst, flag) scrive in dst."""
+    def imread(path, *args):
+        if path.endswith("rotto"):
+            reads.append("fail")
+            return args[0] if len(args) == 2 else None     # come cv2: dst intatto
+        value = int(path[-4:])
+        if len(args) == 2:
+            dst, _ = args
+            dst[...] = value
+            reads.append("dst")
+            return dst
+        reads.append("new")
+        return np.full((4, 6, 3), value, np.uint8)
+
+    return types.SimpleNamespace(imread=imread, IMREAD_COLOR=1, error=RuntimeError)
+
+
+def test_released_buffer_is_reused_only_after_the_last_drop():
+    pool = FramePool()
+    shown = pool.acquire((4, 6, 3))
+    pool.hold(shown)                        # a schermo
+    pool.hold(shown)                        # e prestato al playback
+    pool.release(shown)
+    # ancora preso: il pool non lo riscrive
+    other = pool.acquire((4, 6, 3))
+    assert other is not shown
+    assert pool.stats()["pool_held"] == 1
+    pool.drop(shown)
+    assert pool.acquire((4, 6, 3)) is not shown
+    pool.drop(shown)
+    assert pool.stats()["pool_held"] == 0
+    assert pool.acquire((4, 6, 3)) is shown
+    stats = pool.stats()
+    assert stats["pool_allocated"] == 3 and stats["pool_reused"] == 1
+
+
+def test_image_cache_keeps_lent_frame_out_of_the_pool(monkeypatch):
+    reads = []
+    monkeypatch.setattr(player_core, 'cv2', fake_cv2(reads))
+    paths = [f"/x/a.{n:04d}" for n in range(12)]
+    pool = FramePool()
+    # budget di due frame: il frame consegnato viene sfrattato quasi subito
+    cache = ImageCache(paths, workers=1, max_bytes=72 * 2, pool=pool)
+    try:
+        lent = cache.get_frame(0)
+        for i in range(1, 12):
+            cache.seek(i)               # solo read-ahead: nessuna nuova consegna
+            deadline = time.monotonic() + 2.0
+            while i not in cache._frames and time.monotonic() < deadline:
+                time.sleep(0.005)
+        stats = cache.stats()
+    finally:
+        cache.stop()
+    assert stats["evictions"] >= 8 and stats["pool_reused"] > 0
+    # sfrattato e rilasciato, ma ancora preso: mai riscritto dal decoder
+    assert int(lent[0, 0, 0]) == 0
+
+
+def test_read_frame_decodes_into_pool_buffers(monkeypatch):
+    reads = []
+    monkeypatch.setattr(player_core, 'cv2', fake_cv2(reads))
+    pool = FramePool()
+    first = read_frame("/x/a.0001", pool=pool)
+    pool.release(first)
+    del first
+    second = read_frame("/x/a.0002", pool=pool)
+    # la forma è nota dal primo frame: il secondo va nel buffer rilasciato
+    assert reads == ["new", "dst"]
+    assert int(second[0, 0, 0]) == 2
+    assert pool.stats()["pool_reused"] == 1
+
+
+def test_pooled_read_opens_each_file_once_and_reports_unreadable(monkeypatch):
+    reads = []
+    monkeypatch.setattr(player_core, 'cv2', fake_cv2(reads))
+    pool = FramePool()
+    pool.release(read_frame("/x/a.0001", pool=pool))
+    for n in range(2, 5):
+        pool.release(read_frame(f"/x/a.{n:04d}", pool=pool))
+    # nessuna sonda prima della lettura: un'apertura per frame
+    assert reads == ["new", "dst", "dst", "dst"]
+    reads.clear()
+    # dst tornato intatto: la lettura normale conferma il file illeggibile
+    assert read_frame("/x/rotto", pool=pool) is None
+    assert reads == ["fail", "fail"]
+    assert pool.stats()["pool_free"] == 1
+
+
+def test_image_cache_recycles_evicted_frames(monkeypatch):
+    reads = []
+    monkeypatch.setattr(player_core, 'cv2', fake_cv2(reads))
+    paths = [f"/x/a.{n:04d}" for n in range(40)]
+    pool = FramePool()
+    cache = ImageCache(paths, max_cache_size=4, workers=2, max_bytes=72 * 5, pool=pool)
+    try:
+        for i in range(40):
+            frame = cache.get_frame(i)
+            # un buffer riusato non deve mai contenere un altro frame
+            assert int(frame[0, 0, 0]) == i
+        stats = cache.stats()
+    finally:
+        cache.stop()
+    assert stats["pool_reused"] > 20
+    assert stats["pool_allocated"] < 20
@@ -0,0 +1,63 @@
+import os
+import sys
+import types
+import time
+
+# Ensure project root is on sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+sys.modules.setdefault('cv2', types.ModuleType('cv2'))
+pygame_stub = types.ModuleType('pygame')
+pygame_stub.mixer = types.SimpleNamespace(get_init=lambda: False, music=types.SimpleNamespace())
+sys.modules.setdefault('pygame', pygame_stub)
+
+import player_core
+from player_core import Shot, FrameIndex, ImageCache
+from frame_scan import FrameScan
+
+
+def make_shot(root, name, count, skip=(), empty=()):
+    folder = root / name
+    folder.mkdir()
+    for n in range(1, count + 1):
+        if n in skip:
+            continue
+        (folder / f"f.{n:04d}.png").write_bytes(b"" if n in empty else b"x" * n)
+    return Shot(name, "animazione", str(folder / "f.####.png"), 1, count)
+
+
+def test_scan_finds_missing_and_empty_frames(tmp_path):
+    shots = [make_shot(tmp_path, "a", 10, skip={4, 5}, empty={8}),
+             Shot("b", "animazione", str(tmp_path / "nope" / "f.####.png"), 1, 3),
+             make_shot(tmp_path, "c", 4)]
+    scan = FrameScan(FrameIndex(shots), workers=2)
+
+    assert scan.missing == [3, 4, 7, 10, 11, 12]
+    assert scan.gaps() == [(3, 4), (7, 7), (10, 12)]
+    assert scan.gaps(5, 11) == [(7, 7), (10, 11)]
+    assert scan.info(0)[0] == 1 and scan.info(16)[0] == 4
+    assert scan.info(3) is None
+    assert scan.is_missing(11) and not scan.is_missing(13)
+
+
+def test_cache_never_decodes_scanned_missing_frames(monkeypatch):
+    decoded = []
+
+    def imread(path, *args):
+        decoded.append(path)
+        return path
+
+    monkeypatch.setattr(player_core, 'cv2', types.SimpleNamespace(imread=imread))
+    paths = [f"frame{n:04d}" for n in range(10)]
+    cache = ImageCache(paths, workers=2, missing=[2, 3])
+    try:
+        assert cache.get_frame(1) == paths[1]
+        start = time.monotonic()
+        assert cache.get_frame(2) is None
+        assert time.monotonic() - start < 0.1
+        assert cache.get_frame(4) == paths[4]
+        assert paths[2] not in decoded and paths[3] not in decoded
+    finally:
+        cache.stop()
@@ -0,0 +1,180 @@
+import os
+import sys
+import types
+import threading
+import pytest
+
+# Ensure project root is on sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+sys.modules.setdefault('cv2', types.ModuleType('cv2'))
+pygame_stub = types.ModuleType('pygame')
+pygame_stub.mixer = types.SimpleNamespace(get_init=lambda: False, music=types.SimpleNamespace())
+sys.modules.setdefault('pygame', pygame_stub)
+
+import player_core
+import frame_sources
+from player_core import Shot, FrameIndex, ImageCache
+from frame_sources import VideoFileSource, ImageSequenceSource, open_source
+
+
+class FakeCapture:
+    """VideoCapture finto: 100 frame, ogni frame è il proprio indice."""
+    instances = []
+
+    def __init__(self, path):
+        self.path = path
+        self.pos = 0
+        self.reads = 0
+        self.seeks = []
+        self.released = False
+        FakeCapture.instances.append(self)
+
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        self.seeks.append(value)
+        self.pos = value
+
+    def read(self):
+        if self.pos >= 100:
+            return False, None
+        self.reads += 1
+        self.pos += 1
+        return True, (self.path, self.pos - 1)
+
+    def release(self):
+        self.released = True
+
+
+@pytest.fixture
+def fake_cv2(monkeypatch, tmp_path):
+    FakeCapture.instances = []
+    monkeypatch.setattr(frame_sources, 'cv2', types.SimpleNamespace(
+        VideoCapture=FakeCapture, CAP_PROP_POS_FRAMES=1))
+    movie = tmp_path / "shot.mov"
+    movie.write_bytes(b"x")
+    return str(movie)
+
+
+def test_video_source_decodes_sequentially(fake_cv2):
+    source = VideoFileSource(Shot("m", "animazione", fake_cv2, 1001, 1100))
+    assert [source.read(n)[1] for n in range(1001, 1011)] == list(range(10))
+    cap = FakeCapture.instances[0]
+    assert cap.seeks == [] and cap.reads == 10
+
+    # piccolo salto in avanti: decodifica in avanti, nessun seek
+    assert source.read(1020)[1] == 19
+    assert cap.seeks == []
+    # frame appena passati serviti dalla coda recente
+    assert source.read(1018)[1] == 17 and cap.seeks == []
+    # all'indietro o lontano: seek (keyframe + decodifica in avanti)
+    assert source.read(1002)[1] == 1
+    assert source.read(1090)[1] == 89
+    assert cap.seeks == [1, 89]
+    assert source.read(1200) is None           # oltre la fine del file
+
+
+def test_mixed_sequence_and_movie_timeline(fake_cv2, monkeypatch):
+    monkeypatch.setattr(player_core, 'read_frame', lambda path, scale=1: ("img", path))
+    shots = [Shot("a", "animazione", "/seq/a.####.exr", 1, 3),
+             Shot("m", "animazione", fake_cv2, 1, 5)]
+    index = FrameIndex(shots)
+    assert isinstance(index.source_at(0), ImageSequenceSource)
+    assert isinstance(index.source_at(1), VideoFileSource)
+    assert index.read(1) == ("img", "/seq/a.0002.exr")
+    assert index.read(4) == (fake_cv2, 1)
+
+    cache = ImageCache(index, workers=3)
+    try:
+        frames = [cache.get_frame(i) for i in range(len(index))]
+    finally:
+        cache.stop()
+    assert frames[:3] == [("img", f"/seq/a.{n:04d}.exr") for n in (1, 2, 3)]
+    assert [f[1] for f in frames[3:]] == [0, 1, 2, 3, 4]
+    # un solo decoder per lo shot filmato, anche con tre worker
+    assert len(FakeCapture.instances) == 1
+    index.close()
+    assert index._sources == {}
+
+
+def test_frame_index_caps_open_movie_decoders(fake_cv2, monkeypatch):
+    monkeypatch.setattr(FrameIndex, 'max_open', 3)
+    shots = [Shot(f"m{n}", "animazione", fake_cv2, 1, 5) for n in range(10)]
+    index = FrameIndex(shots)
+    for pos in range(10):
+        assert index.read(pos * 5)[1] == 0
+    open_caps = [cap for cap in FakeCapture.instances if not cap.released]
+    # solo gli ultimi tre shot visitati tengono un decoder aperto
+    assert len(open_caps) == 3
+    assert [s._cap is not None for s in index._sources.values()] == [False] * 7 + [True] * 3
+    # si torna su uno shot chiuso: il decoder si riapre
+    assert index.read(2)[1] == 2
+    assert index.source_at(0)._cap is not None
+    assert sum(not cap.released for cap in FakeCapture.instances) == 3
+    index.close()
+    assert all(cap.released for cap in FakeCapture.instances)
+
+
+def test_open_source_by_extension():
+    assert isinstance(open_source(Shot("a", "r", "/x/a.%04d.png", 1, 2)), ImageSequenceSource)
+    assert isinstance(open_source(Shot("b", "r", "/x/B.MOV", 1, 2)), VideoFileSource)
+
+
+def test_warm_opens_next_shot_source_ahead(fake_cv2, monkeypatch):
+    monkeypatch.setattr(player_core, 'read_frame', lambda path, scale=1: ("img", path))
+    shots = [Shot("a", "animazione", "/seq/a.####.exr", 1, 40),
+             Shot("m", "animazione", fake_cv2, 1, 5)]
+    index = FrameIndex(shots)
+    cache = ImageCache(index, workers=2)
+    try:
+        cache.warm([40])
+        cache.executor.submit(lambda: None).result(timeout=1.0)
+        for _ in range(100):
+            if FakeCapture.instances:
+                break
+            threading.Event().wait(0.01)
+        # decoder del filmato già aperto prima che il playhead arrivi al taglio
+        assert len(FakeCapture.instances) == 1
+        assert index.source_at(1)._cap is not None
+    finally:
+        cache.stop()
+        index.close()
+
+
+class PooledCapture(FakeCapture):
+    """Come FakeCapture, ma con frame numpy: read(dst) scrive l'indice in dst."""
+
+    def read(self, image=None):
+        np = pytest.importorskip("numpy")
+        if self.pos >= 100:
+            return False, None
+        if image is None:
+            image = np.empty((2, 2, 3), np.uint8)
+        image[...] = self.pos
+        self.reads += 1
+        self.pos += 1
+        return True, image
+
+
+def test_recent_frame_handed_out_again_is_not_recycled(fake_cv2, monkeypatch):
+    pytest.importorskip("numpy")
+    from frame_pool import FramePool
+    monkeypatch.setattr(frame_sources, 'cv2', types.SimpleNamespace(
+        VideoCapture=PooledCapture, CAP_PROP_POS_FRAMES=1))
+    pool = FramePool()
+    source = VideoFileSource(Shot("m", "animazione", fake_cv2, 1, 100))
+    frames = [source.read(n + 1, pool=pool) for n in range(4)]
+    # la cache sfratta il frame 2 mentre è ancora nella coda dei recenti...
+    pool.release(frames[2])
+    # ...poi lo richiede: stesso buffer, di nuovo suo
+    again = source.read(3, pool=pool)
+    assert again is frames[2]
+    # il frame esce dalla coda dei recenti: non deve tornare libero
+    for n in range(4, 4 + 2 * VideoFileSource.RECENT_FRAMES):
+        assert int(source.read(n + 1, pool=pool)[0, 0, 0]) == n
+    assert int(again[0, 0, 0]) == 2
+    source.close()
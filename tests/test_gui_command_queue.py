@@ -28,6 +28,7 @@ class DummyGui:
     def __init__(self, shots):
         self.mode_episode = True
         self.loop_enabled = False
+        self.proxy_enabled = False
         self.resume_frame_index = 0
         self.is_playing = False
         self.should_stop = False
@@ -38,9 +39,15 @@ class DummyGui:
         self.episode_frame_map = []
         self.total_episode_frames = 0
         self.audio_path = None
+        self.csv_path = None
+        self.frame_scans = {}
+        self.show_missing_placeholder = False
+        self.perf = None
+        self.decoder = None
         self.video_frame = None
         self.fps_spinner = DummySpinner(25)
-        self.cache_spinner = DummySpinner(150)
+        self.cache_spinner = DummySpinner(1024)
+        self.workers_spinner = DummySpinner(4)
         self.fps_label = types.SimpleNamespace(setText=lambda *a, **k: None)
         self.frame_counter = types.SimpleNamespace(setText=lambda *a, **k: None)
         self.timeline_slider = types.SimpleNamespace(setValue=lambda *a, **k: None,
@@ -65,10 +72,17 @@ def setup_modules():
     qtgui.QImage = object
     qtgui.QPalette = type('QPalette', (), {})
     qtgui.QColor = type('QColor', (), {})
+    qtgui.QPainter = type('QPainter', (), {})
+    qtgui.QKeySequence = type('QKeySequence', (), {})
+    qtgui.QFont = type('QFont', (), {})
     sys.modules['PyQt5.QtGui'] = qtgui
 
     qtcore = types.ModuleType('PyQt5.QtCore')
-    qtcore.Qt = types.SimpleNamespace(KeepAspectRatio=0)
+    qtcore.Qt = types.SimpleNamespace(KeepAspectRatio=0, DisplayRole=0, UserRole=256)
+    qtcore.QRect = type('QRect', (), {})
+    qtcore.pyqtSignal = lambda *a, **k: None
+    for name in ['QObject', 'QAbstractListModel', 'QSortFilterProxyModel', 'QModelIndex']:
+        setattr(qtcore, name, type(name, (), {'__init__': lambda self, *a, **k: None}))
     qtcore.QTimer = type('QTimer', (), {'__init__': lambda self, *a, **k: None,
                                         'timeout': types.SimpleNamespace(connect=lambda *a, **k: None)})
     sys.modules['PyQt5.QtCore'] = qtcore
@@ -76,7 +90,7 @@ def setup_modules():
     qtwidgets = types.ModuleType('PyQt5.QtWidgets')
     for name in ['QApplication', 'QMainWindow', 'QWidget', 'QLabel', 'QListWidget',
                  'QVBoxLayout', 'QHBoxLayout', 'QPushButton', 'QSlider', 'QFrame',
-                 'QSpinBox', 'QFileDialog']:
+                 'QSpinBox', 'QFileDialog', 'QShortcut', 'QListView']:
         setattr(qtwidgets, name, type(name, (), {'__init__': lambda self, *a, **k: None}))
     sys.modules['PyQt5.QtWidgets'] = qtwidgets
 
@@ -120,4 +134,27 @@ def test_handle_stop_clears_queue(monkeypatch):
 
     handle_stop(gui)
 
-    assert gui.command_q.empty()
+    # i comandi pendenti vengono scartati: resta solo lo stop che sveglia il core
+    assert list(gui.command_q.queue) == [('stop', None)]
+
+
+def test_shuttle_keys_send_rates(monkeypatch):
+    setup_modules()
+    from player_core import parse_shot_list
+    from gui import PlayerGUI
+
+    csv_path = os.path.join(os.path.dirname(__file__), 'data', 'sample_shots.csv')
+    shots, _ = parse_shot_list(csv_path)
+
+    gui = DummyGui(shots)
+    gui.is_playing = True
+    gui.shuttle_rate = 1
+    gui.handle_pause = lambda: gui.command_q.put(('pause', True))
+
+    for direction in (1, 1, 1, -1, -1, 0):
+        PlayerGUI.handle_shuttle(gui, direction)
+    PlayerGUI.handle_frame_step(gui, -1)
+
+    assert list(gui.command_q.queue) == [('rate', 2), ('rate', 4), ('rate', 4),
+                                         ('rate', -1), ('rate', -2),
+                                         ('pause', True), ('step', -1)]
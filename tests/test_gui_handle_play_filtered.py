@@ -30,6 +30,7 @@ class DummyGui:
     def __init__(self, shots):
         self.mode_episode = True
         self.loop_enabled = False
+        self.proxy_enabled = False
         self.resume_frame_index = 0
         self.is_playing = False
         self.should_stop = False
@@ -40,9 +41,15 @@ class DummyGui:
         self.episode_frame_map = []
         self.total_episode_frames = 0
         self.audio_path = None
+        self.csv_path = None
+        self.frame_scans = {}
+        self.show_missing_placeholder = False
+        self.perf = None
+        self.decoder = None
         self.video_frame = None
         self.fps_spinner = DummySpinner(25)
-        self.cache_spinner = DummySpinner(150)
+        self.cache_spinner = DummySpinner(1024)
+        self.workers_spinner = DummySpinner(4)
         self.fps_label = types.SimpleNamespace(setText=lambda *a, **k: None)
         self.frame_counter = types.SimpleNamespace(setText=lambda *a, **k: None)
         self.timeline_slider = types.SimpleNamespace(setValue=lambda *a, **k: None, setMaximum=lambda *a, **k: None)
@@ -62,10 +69,17 @@ def test_handle_play_filters_reparto(monkeypatch):
     qtgui.QImage = object
     qtgui.QPalette = type('QPalette', (), {})
     qtgui.QColor = type('QColor', (), {})
+    qtgui.QPainter = type('QPainter', (), {})
+    qtgui.QKeySequence = type('QKeySequence', (), {})
+    qtgui.QFont = type('QFont', (), {})
     sys.modules['PyQt5.QtGui'] = qtgui
 
     qtcore = sys.modules.get('PyQt5.QtCore', types.ModuleType('PyQt5.QtCore'))
-    qtcore.Qt = types.SimpleNamespace(KeepAspectRatio=0)
+    qtcore.Qt = types.SimpleNamespace(KeepAspectRatio=0, DisplayRole=0, UserRole=256)
+    qtcore.QRect = type('QRect', (), {})
+    qtcore.pyqtSignal = lambda *a, **k: None
+    for name in ['QObject', 'QAbstractListModel', 'QSortFilterProxyModel', 'QModelIndex']:
+        setattr(qtcore, name, type(name, (), {'__init__': lambda self, *a, **k: None}))
     qtcore.QTimer = type('QTimer', (), {'__init__': lambda self, *a, **k: None, 'timeout': types.SimpleNamespace(connect=lambda *a, **k: None)})
     sys.modules['PyQt5.QtCore'] = qtcore
 
@@ -73,7 +87,7 @@ def test_handle_play_filters_reparto(monkeypatch):
     for name in [
         'QApplication', 'QMainWindow', 'QWidget', 'QLabel', 'QListWidget',
         'QVBoxLayout', 'QHBoxLayout', 'QPushButton', 'QSlider', 'QFrame',
-        'QSpinBox', 'QFileDialog']:
+        'QSpinBox', 'QFileDialog', 'QShortcut', 'QListView']:
         setattr(qtwidgets, name, type(name, (), {'__init__': lambda self, *a, **k: None}))
     sys.modules['PyQt5.QtWidgets'] = qtwidgets
 
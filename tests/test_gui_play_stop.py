@@ -75,3 +75,34 @@ def test_handle_play_then_stop(qtbot, monkeypatch):
     assert gui.is_playing is False
     assert gui.resume_frame_index == 0
     assert stop_calls
+
+
+def test_frame_position_updates_run_in_gui_thread(qtbot, monkeypatch):
+    import threading
+    csv_path = os.path.join(os.path.dirname(__file__), 'data', 'sample_shots.csv')
+    shots, audio = parse_shot_list(csv_path)
+
+    gui = PlayerGUI()
+    qtbot.addWidget(gui)
+    gui.loaded_shots = shots
+    gui.audio_path = None
+
+    threads = []
+    set_value = gui.timeline_slider.setValue
+    monkeypatch.setattr(gui.timeline_slider, 'setValue',
+                        lambda v: (threads.append(threading.get_ident()), set_value(v)))
+
+    def fake_play_with_cache(*args, **kwargs):
+        for i in range(1, 4):
+            kwargs['on_frame'](i, 3, 25.0)
+        return 25
+
+    monkeypatch.setattr(sys.modules['gui'], 'play_with_cache', fake_play_with_cache)
+    gui.handle_play()
+    gui.play_thread.join(timeout=1.0)
+    # emessi dal thread di playback, applicati solo dal loop degli eventi
+    assert threads == []
+    qtbot.waitUntil(lambda: gui.frame_counter.text().startswith("Frame: 0003"), timeout=1000)
+    assert set(threads) == {threading.get_ident()}
+    assert gui.fps_label.text() == "FPS: 25.00"
+    gui.handle_stop()
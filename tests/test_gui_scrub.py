@@ -0,0 +1,50 @@
+import os
+import sys
+import types
+import queue
+import pytest
+
+# Ensure project root is on sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+pytest.importorskip("PyQt5")
+
+# Stub pygame if missing
+if 'pygame' not in sys.modules:
+    pygame_stub = types.ModuleType('pygame')
+    pygame_stub.mixer = types.SimpleNamespace(get_init=lambda: False, music=types.SimpleNamespace())
+    sys.modules['pygame'] = pygame_stub
+
+from player_core import parse_shot_list, department_timeline
+from gui import PlayerGUI
+
+
+def test_scrub_is_throttled_and_absolute(qtbot):
+    csv_path = os.path.join(os.path.dirname(__file__), 'data', 'sample_shots.csv')
+    shots, _ = parse_shot_list(csv_path)
+
+    gui = PlayerGUI()
+    qtbot.addWidget(gui)
+    gui.loaded_shots = shots
+    gui.populate_shot_list()
+    gui.is_playing = True
+    gui.command_q = queue.Queue()
+
+    gui.toggle_episode_mode()           # Scena sullo shot del frame 0
+    while not gui.command_q.empty():
+        gui.command_q.get_nowait()
+    start, end = department_timeline(shots, gui.current_reparto).range_of(gui.current_shot)
+    assert gui.timeline_slider.maximum() == end - start
+
+    gui.handle_scrub_start()
+    for value in (1, 2):
+        gui.handle_scrub_move(value)
+    gui.flush_scrub()
+    gui.flush_scrub()                   # nessun nuovo target: niente da inviare
+    gui.timeline_slider.setValue(2)
+    gui.handle_scrub_end()
+
+    assert list(gui.command_q.queue) == [("scrub", start + 2), ("scrub_end", start + 2)]
+    assert gui.resume_frame_index == 2
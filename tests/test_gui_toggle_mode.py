@@ -70,3 +70,23 @@ def test_gui_toggle_mode_duplicate_departments(qtbot):
     assert gui.resume_frame_index == 4
     assert gui.command_q.get_nowait() == ("trim_off", None)
     assert gui.command_q.empty()
+
+
+def test_gui_toggle_reparto_swaps_timeline(qtbot):
+    csv_path = os.path.join(os.path.dirname(__file__), 'data', 'mixed_reparto.csv')
+    shots, _ = parse_shot_list(csv_path)
+
+    gui = PlayerGUI()
+    qtbot.addWidget(gui)
+    gui.loaded_shots = shots
+    gui.current_shot = shots[0]             # s1 animazione
+
+    gui.toggle_reparto()                    # animazione -> render
+    assert gui.current_reparto == "render"
+    assert gui.total_episode_frames == 2
+    assert gui.shot_list.model().rowCount() == 1
+    assert gui.episode_frame_map is shots.timelines["render"]
+
+    gui.toggle_reparto()                    # render -> animazione
+    assert gui.total_episode_frames == 4
+    assert gui.current_shot is shots[0]
@@ -0,0 +1,249 @@
+import os
+import sys
+import time
+import types
+import random
+import pytest
+
+# Ensure project root is on sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Provide minimal stubs so player_core can be imported without optional deps
+sys.modules.setdefault('cv2', types.ModuleType('cv2'))
+pygame_stub = types.ModuleType('pygame')
+pygame_stub.mixer = types.SimpleNamespace(get_init=lambda: False, music=types.SimpleNamespace())
+sys.modules.setdefault('pygame', pygame_stub)
+
+qtgui = types.ModuleType('PyQt5.QtGui')
+qtgui.QPixmap = object
+qtgui.QImage = object
+qtcore = types.ModuleType('PyQt5.QtCore')
+qtcore.Qt = types.SimpleNamespace(KeepAspectRatio=0)
+sys.modules.setdefault('PyQt5', types.ModuleType('PyQt5'))
+sys.modules.setdefault('PyQt5.QtGui', qtgui)
+sys.modules.setdefault('PyQt5.QtCore', qtcore)
+
+import player_core
+from player_core import ImageCache
+
+
+def fake_imread(path, *args):
+    # tempi di decodifica irregolari: i worker finiscono fuori ordine
+    time.sleep(random.uniform(0, 0.01))
+    return None if path.endswith("missing") else path
+
+
+def test_image_cache_ordered_with_workers(monkeypatch):
+    monkeypatch.setattr(player_core, 'cv2', types.SimpleNamespace(imread=fake_imread))
+    paths = [f"frame{n:04d}" for n in range(40)]
+
+    cache = ImageCache(paths, max_cache_size=8, start_index=5, workers=4)
+    try:
+        got = [cache.get_image() for _ in range(len(paths) - 5)]
+    finally:
+        cache.stop()
+
+    assert got == paths[5:]
+
+
+def test_image_cache_skips_missing_frames(monkeypatch):
+    monkeypatch.setattr(player_core, 'cv2', types.SimpleNamespace(imread=fake_imread))
+    paths = ["a", "missing", "b"]
+
+    cache = ImageCache(paths, max_cache_size=4, workers=3)
+    try:
+        assert cache.get_image() == "a"
+        assert cache.get_image() == "b"
+    finally:
+        cache.stop()
+
+
+def test_image_cache_seek_serves_decoded_frames(monkeypatch):
+    reads = []
+
+    def counting_imread(path, *args):
+        reads.append(path)
+        return path
+
+    monkeypatch.setattr(player_core, 'cv2', types.SimpleNamespace(imread=counting_imread))
+    paths = [f"frame{n:04d}" for n in range(20)]
+
+    cache = ImageCache(paths, max_cache_size=10, workers=2)
+    try:
+        for i in range(10):
+            assert cache.get_frame(i) == paths[i]
+        cache.seek(0)
+        for i in range(10):
+            assert cache.get_frame(i) == paths[i]
+        stats = cache.stats()
+    finally:
+        cache.stop()
+
+    # ogni frame della seconda passata arriva dalla memoria
+    assert all(reads.count(p) == 1 for p in paths[:10])
+    assert stats["hits"] >= 10
+    assert stats["evictions"] == 0
+
+
+def test_image_cache_evicts_lru_under_byte_budget(monkeypatch):
+    def sized_imread(path, *args):
+        return types.SimpleNamespace(path=path, nbytes=100)
+
+    monkeypatch.setattr(player_core, 'cv2', types.SimpleNamespace(imread=sized_imread))
+    paths = [f"frame{n:04d}" for n in range(30)]
+
+    cache = ImageCache(paths, max_cache_size=4, workers=2, max_bytes=500)
+    try:
+        for i in range(30):
+            assert cache.get_frame(i).path == paths[i]
+        stats = cache.stats()
+    finally:
+        cache.stop()
+
+    assert stats["bytes"] <= 500
+    assert stats["frames"] <= 5
+    assert stats["evictions"] >= 25
+
+
+def test_choose_proxy_scale():
+    assert player_core.choose_proxy_scale(4096, 2160, 1000, 560) == 2
+    assert player_core.choose_proxy_scale(4096, 2160, 500, 270) == 8
+    assert player_core.choose_proxy_scale(1920, 1080, 1280, 720) == 1
+    assert player_core.choose_proxy_scale(4096, 2160, 1024, 540) == 4
+
+
+def test_image_cache_proxy_decode(monkeypatch):
+    np = pytest.importorskip("numpy")
+    calls = []
+
+    def sized_imread(path, flag=None):
+        calls.append(flag)
+        scale = {None: 1, "R2": 2, "R4": 4, "R8": 8}[flag]
+        return np.zeros((2160 // scale, 4096 // scale, 3), dtype=np.uint8)
+
+    def resize(img, size, interpolation=None):
+        return np.zeros((size[1], size[0], 3), dtype=np.uint8)
+
+    monkeypatch.setattr(player_core, 'cv2', types.SimpleNamespace(
+        imread=sized_imread, resize=resize, INTER_AREA=3,
+        IMREAD_REDUCED_COLOR_2="R2", IMREAD_REDUCED_COLOR_4="R4",
+        IMREAD_REDUCED_COLOR_8="R8"))
+    paths = [f"frame{n:04d}.jpg" for n in range(6)]
+
+    cache = ImageCache(paths, max_cache_size=2, workers=1, target_size=(1200, 600))
+    try:
+        frames = [cache.get_frame(i) for i in range(6)]
+    finally:
+        cache.stop()
+
+    assert cache.scale == 2
+    assert all(f.shape == (1080, 2048, 3) for f in frames)
+    # dopo la stima sul primo frame il JPEG viene ridotto dal decoder
+    assert "R2" in calls
+
+
+def test_image_cache_shrinks_under_memory_pressure(monkeypatch):
+    mb = 1024 * 1024
+
+    def sized_imread(path, *args):
+        return types.SimpleNamespace(path=path, nbytes=16 * mb)
+
+    monkeypatch.setattr(player_core, 'cv2', types.SimpleNamespace(imread=sized_imread))
+    monkeypatch.setattr(player_core, 'MEMORY_CHECK_INTERVAL', 0.0)
+    free = {"available": 8192 * mb}
+    monkeypatch.setattr(player_core, 'available_memory',
+                        lambda: (free["available"], 8192 * mb))
+    paths = [f"frame{n:04d}" for n in range(100)]
+
+    cache = ImageCache(paths, workers=2, max_bytes=512 * mb)
+    try:
+        cache.get_frame(0)
+        # budget 512 MB, frame da 16 MB: read-ahead sul 75% del budget
+        assert len(list(cache._window())) == 24
+
+        free["available"] = 100 * mb
+        deadline = time.monotonic() + 2
+        while cache.stats()["budget"] > player_core.MIN_CACHE_BYTES and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stats = cache.stats()
+    finally:
+        cache.stop()
+
+    assert stats["budget"] == player_core.MIN_CACHE_BYTES
+    assert stats["bytes"] <= player_core.MIN_CACHE_BYTES
+
+
+def test_thumbnail_uses_reduced_decode_and_small_cache(monkeypatch):
+    calls = []
+
+    def imread(path, *args):
+        calls.append((path, args))
+        return path
+
+    monkeypatch.setattr(player_core, 'cv2', types.SimpleNamespace(
+        imread=imread, IMREAD_REDUCED_COLOR_4='R4'))
+    monkeypatch.setattr(player_core, 'THUMB_CACHE_FRAMES', 2)
+    paths = [f"frame{n:04d}.jpg" for n in range(10)]
+    cache = ImageCache(paths, max_cache_size=1, start_index=0, workers=1)
+    try:
+        assert cache.get_frame(0) == paths[0]
+        calls.clear()
+        assert cache.thumbnail(0) == paths[0]          # già in cache piena
+        assert cache.thumbnail(7) == paths[7]
+        assert calls == [(paths[7], ('R4',))]
+        cache.thumbnail(7)
+        assert len(calls) == 1                         # servita dalla LRU
+        cache.thumbnail(8)
+        cache.thumbnail(9)
+        assert list(cache._thumbs) == [8, 9]
+    finally:
+        cache.stop()
+
+
+def test_reverse_stride_window_skips_hidden_frames(monkeypatch):
+    decoded = []
+
+    def imread(path, *args):
+        decoded.append(int(path[5:]))
+        return path
+
+    monkeypatch.setattr(player_core, 'cv2', types.SimpleNamespace(imread=imread))
+    paths = [f"frame{n:04d}" for n in range(100)]
+    cache = ImageCache(paths, max_cache_size=5, start_index=90, workers=3)
+    try:
+        cache.set_direction(-4)
+        cache.seek(90)
+        assert list(cache._window()) == [90, 86, 82, 78, 74]
+        assert cache.get_frame(74) == paths[74]
+        time.sleep(0.05)
+        assert all(n % 4 == 2 for n in decoded if n < 90)
+    finally:
+        cache.stop()
+
+
+def test_warm_heads_use_spare_workers_and_budget(monkeypatch):
+    np = pytest.importorskip("numpy")
+
+    monkeypatch.setattr(player_core, 'cv2', types.SimpleNamespace(
+        imread=lambda path, *a: np.zeros((10, 10, 3), np.uint8)))
+    paths = [f"frame{n:04d}" for n in range(200)]
+    frame = 300
+    # budget: 16 frame, di cui 4 fuori dalla finestra di read-ahead
+    cache = ImageCache(paths, start_index=0, workers=2, max_bytes=16 * frame)
+    try:
+        cache.get_frame(0)
+        cache.warm([100, 101, 150, 151, 152, 180])
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline and not {100, 101, 150, 151} <= set(cache._frames):
+            time.sleep(0.01)
+        assert {100, 101, 150, 151} <= set(cache._frames)
+        time.sleep(0.05)
+        assert 180 not in cache._frames                 # oltre la quota
+        assert cache._bytes <= cache.budget
+        # la finestra sfratta prima i frame già visti, poi quelli scaldati
+        assert cache.get_frame(1) is not None
+        assert {100, 101, 150, 151} <= set(cache._frames)
+    finally:
+        cache.stop()
@@ -35,3 +35,30 @@ def test_parse_shot_list():
     assert shots[1].shot_id == 's2'
     # shot1 length is 3 frames -> shot2 starts at 3
     assert shots[1].absolute_start == 3
+
+
+def test_parse_shot_list_builds_timelines():
+    csv_path = os.path.join(os.path.dirname(__file__), 'data', 'mixed_reparto.csv')
+    shots, _ = parse_shot_list(csv_path)
+    anim = shots.timelines['animazione']
+
+    assert len(anim) == 4
+    assert anim.shot_at(3) == (shots[2], 1)
+    assert anim.shot_by_id('s3') is shots[2]
+    assert anim.range_of(shots[2]) == (2, 3)
+    assert anim.range_of(shots[1]) is None          # shot di render
+    assert len(shots.timelines['render']) == 2
+
+
+def test_parse_shot_list_per_department_offsets():
+    csv_path = os.path.join(os.path.dirname(__file__), 'data', 'mixed_reparto.csv')
+    shots, _ = parse_shot_list(csv_path)
+    by_id = {(s.shot_id, s.reparto): s for s in shots}
+
+    # render intercalato: l'animazione non ne conta i frame
+    assert by_id[('s1', 'animazione')].absolute_start == 0
+    assert by_id[('s3', 'animazione')].absolute_start == 2
+    assert by_id[('s2', 'render')].absolute_start == 0
+    for timeline in shots.timelines.values():
+        assert [timeline.range_of(s)[0] for s in timeline.shots] == \
+            [s.absolute_start for s in timeline.shots]
@@ -0,0 +1,91 @@
+import csv
+import json
+import os
+import sys
+import types
+
+# Ensure project root is on sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+sys.modules.setdefault('cv2', types.ModuleType('cv2'))
+pygame_stub = types.ModuleType('pygame')
+pygame_stub.mixer = types.SimpleNamespace(get_init=lambda: False, music=types.SimpleNamespace())
+sys.modules.setdefault('pygame', pygame_stub)
+
+import player_core
+from player_core import Shot
+from perf_stats import LatencyRing, PerfStats
+
+
+def test_ring_keeps_last_samples_and_percentiles():
+    ring = LatencyRing(size=100)
+    for ms in range(1, 201):                # i primi 100 escono dall'anello
+        ring.add(float(ms))
+    summary = ring.summary()
+    assert summary["count"] == 200 and summary["max"] == 200.0
+    assert summary["p50"] == 151.0
+    assert summary["p95"] == 196.0
+    assert summary["p99"] == 200.0
+
+
+def test_export_json_and_csv(tmp_path):
+    perf = PerfStats(ring_size=16)
+    perf.record("decode", 0.004)
+    perf.record("decode", 0.006)
+    perf.set("cache_frames", 12)
+    perf.add("seeks")
+
+    perf.export(str(tmp_path / "perf.json"))
+    data = json.loads((tmp_path / "perf.json").read_text())
+    assert data["stages"]["decode"]["count"] == 2
+    assert abs(data["stages"]["decode"]["max"] - 6.0) < 1e-9
+    assert data["counters"] == {"cache_frames": 12, "seeks": 1}
+
+    perf.export(str(tmp_path / "perf.csv"))
+    with open(tmp_path / "perf.csv", newline="") as f:
+        rows = {row["name"]: row for row in csv.DictReader(f)}
+    assert rows["decode"]["kind"] == "stage_ms" and rows["decode"]["count"] == "2"
+    assert rows["seeks"]["kind"] == "counter" and rows["seeks"]["value"] == "1"
+
+
+class Store:
+    def __init__(self):
+        self.requested = []
+
+    def seek(self, index):
+        pass
+
+    def set_bounds(self, lo, hi, wrap=False):
+        pass
+
+    def get_frame(self, index, timeout=1.0):
+        return index
+
+    def stats(self):
+        return {"frames": 7, "ahead": 5}
+
+    def stop(self):
+        pass
+
+
+def test_playback_fills_stages_and_counters():
+    import queue
+    shots = [Shot("A", "anim", "/x/a.####.jpg", 1, 30)]
+    q = queue.Queue()
+    q.put(("seek", 10))
+    perf = PerfStats()
+    shown = []
+    sink = types.SimpleNamespace(present=shown.append, dropped=0)
+    player_core.play_with_cache(shots, sink, fps=100, frame_store=Store(),
+                                command_q=q, perf=perf)
+    snap = perf.snapshot()
+    # orologio reale: una macchina carica può saltare qualche frame, ma
+    # ogni frame mostrato ha i suoi campioni e nessuno va perso
+    assert snap["stages"]["queue_wait"]["count"] == len(shown)
+    assert snap["stages"]["sleep_error"]["count"] == len(shown)
+    assert len(shown) + snap["counters"]["dropped"] == 20
+    assert snap["stages"]["seek"]["count"] == 1
+    assert snap["counters"]["seeks"] == 1
+    assert snap["counters"]["cache_ahead"] == 5
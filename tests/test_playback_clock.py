@@ -0,0 +1,238 @@
+import os
+import sys
+import time
+import types
+
+# Ensure project root is on sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+sys.modules.setdefault('cv2', types.ModuleType('cv2'))
+pygame_stub = types.ModuleType('pygame')
+pygame_stub.mixer = types.SimpleNamespace(get_init=lambda: False, music=types.SimpleNamespace())
+sys.modules.setdefault('pygame', pygame_stub)
+
+import player_core
+from player_core import PlaybackClock, Shot
+
+
+class SlowStore:
+    """Frame store finto: alcuni frame costano più di un intervallo di frame."""
+
+    def __init__(self, slow=()):
+        self.slow = set(slow)
+        self.requested = []
+
+    def seek(self, index):
+        pass
+
+    def set_bounds(self, lo, hi, wrap=False):
+        pass
+
+    def get_frame(self, index, timeout=1.0):
+        self.requested.append(index)
+        if index in self.slow:
+            self.slow.discard(index)
+            time.sleep(0.12)
+        return index
+
+    def stats(self):
+        return {}
+
+    def stop(self):
+        pass
+
+
+class Sink:
+    def __init__(self):
+        self.frames = []
+
+    def present(self, frame):
+        self.frames.append(frame)
+
+
+def test_clock_pause_freezes_position():
+    clock = PlaybackClock(25)
+    clock.start(10)
+    clock.pause()
+    pos = clock.position()
+    time.sleep(0.05)
+    assert clock.position() == pos
+    clock.resume()
+    assert abs(clock.position() - pos) < 1
+
+
+def test_clock_follows_audio():
+    audio = {"sec": 2.0}
+    clock = PlaybackClock(25, audio_position=lambda: audio["sec"])
+    clock.start(100)
+    clock.sync_audio()            # 50 frame di scarto: aggancio immediato
+    assert abs(clock.position() - 150) < 1
+    assert clock.stats()["av_samples"] == 1
+    audio["sec"] += 0.08          # 2 frame avanti: correzione graduale
+    before = clock.position()
+    clock.sync_audio()
+    assert before < clock.position() < before + 2
+
+
+def test_late_frames_are_dropped_not_accumulated(monkeypatch):
+    shots = [Shot("A", "anim", "/x/a.####.jpg", 1, 40)]
+    store = SlowStore(slow={5})
+    sink = Sink()
+    stats = {}
+    monkeypatch.setattr(player_core, 'PlaybackClock', _capture(stats))
+    t0 = time.perf_counter()
+    player_core.play_with_cache(shots, sink, fps=50, frame_store=store)
+    elapsed = time.perf_counter() - t0
+    clock = stats["clock"]
+    assert clock.dropped >= 3
+    assert len(sink.frames) + clock.dropped == 40
+    assert sink.frames == sorted(sink.frames)
+    # il ritardo del frame lento non si somma alla durata totale
+    assert elapsed < 40 / 50 + 0.1
+
+
+def _capture(box):
+    class Captured(PlaybackClock):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            box["clock"] = self
+    return Captured
+
+
+def test_seek_burst_collapses_and_shows_frame_while_paused():
+    import queue
+    shots = [Shot("A", "anim", "/x/a.####.jpg", 1, 200)]
+    store = SlowStore()
+    sink = Sink()
+    seeks = []
+    store.seek = seeks.append
+    q = queue.Queue()
+    q.put(("pause", True))
+    for target in (10, 50, 120):
+        q.put(("seek", target))
+    done = []
+
+    import threading
+    t = threading.Thread(target=lambda: done.append(
+        player_core.play_with_cache(shots, sink, fps=25, frame_store=store, command_q=q)))
+    t.start()
+    time.sleep(0.2)
+    # in pausa: un solo spostamento della cache e il frame di destinazione a schermo
+    assert seeks == [0, 120]
+    assert sink.frames[-1] == 120
+    q.put(("stop", None))
+    t.join(timeout=1.0)
+    assert not t.is_alive()
+
+
+def test_scrub_shows_latest_thumbnail_then_full_frame_on_release():
+    import queue
+    import threading
+    shots = [Shot("A", "anim", "/x/a.####.jpg", 1, 200)]
+    store = SlowStore()
+    store.thumbnail = lambda index: ("thumb", index)
+    sink = Sink()
+    q = queue.Queue()
+    for target in (10, 20, 30):
+        q.put(("scrub", target))
+    t = threading.Thread(target=player_core.play_with_cache,
+                         args=(shots, sink), kwargs=dict(fps=25, frame_store=store, command_q=q))
+    t.start()
+    time.sleep(0.2)
+    assert ("thumb", 30) in sink.frames
+    assert ("thumb", 10) not in sink.frames and ("thumb", 20) not in sink.frames
+    q.put(("scrub_end", 42))
+    time.sleep(0.2)
+    # al rilascio: frame pieno e riproduzione ripartita da lì
+    assert sink.frames[sink.frames.index(("thumb", 30)) + 1] == 42
+    assert sink.frames[-1] > 42
+    q.put(("stop", None))
+    t.join(timeout=1.0)
+    assert not t.is_alive()
+
+
+def test_reverse_rate_and_frame_step():
+    import queue
+    import threading
+    shots = [Shot("A", "anim", "/x/a.####.jpg", 1, 200)]
+    store = SlowStore()
+    sink = Sink()
+    q = queue.Queue()
+    q.put(("seek", 100))
+    q.put(("rate", -2))
+    t = threading.Thread(target=player_core.play_with_cache,
+                         args=(shots, sink), kwargs=dict(fps=50, frame_store=store, command_q=q))
+    t.start()
+    time.sleep(0.2)
+    q.put(("rate", 0))                  # K: pausa
+    time.sleep(0.05)
+    played = sink.frames[:]
+    assert played[0] == 100 and len(played) > 3
+    # reverse a 2x: un frame mostrato ogni due
+    assert all(b - a == -2 for a, b in zip(played, played[1:]))
+    q.put(("step", 1))
+    q.put(("step", 1))
+    time.sleep(0.05)
+    assert sink.frames[-1] == played[-1] + 2
+    q.put(("stop", None))
+    t.join(timeout=1.0)
+    assert not t.is_alive()
+
+
+def test_neighbour_and_requested_shot_heads_are_warmed():
+    import queue
+    import threading
+    shots = [Shot("A", "anim", "/x/a.####.jpg", 1, 20),
+             Shot("B", "anim", "/x/b.####.jpg", 1, 20),
+             Shot("C", "anim", "/x/c.####.jpg", 1, 20),
+             Shot("D", "anim", "/x/d.####.jpg", 1, 3)]
+    store = SlowStore()
+    warmed = []
+    store.warm = warmed.append
+    q = queue.Queue()
+    q.put(("pause", True))
+    q.put(("warm", 60))
+    t = threading.Thread(target=player_core.play_with_cache,
+                         args=(shots, Sink()), kwargs=dict(fps=25, frame_store=store, command_q=q))
+    t.start()
+    time.sleep(0.1)
+    q.put(("stop", None))
+    t.join(timeout=1.0)
+    # prima lo shot richiesto (D, corto), poi il successivo e il secondo successivo
+    assert warmed[-1] == [60, 61, 62] + list(range(20, 28)) + list(range(40, 48))
+
+
+def test_missing_frames_hold_last_picture_in_sync(monkeypatch):
+    shots = [Shot("A", "anim", "/x/a.####.jpg", 1, 20)]
+    store = SlowStore()
+    gap = {5, 6, 7}
+    original = store.get_frame
+    store.get_frame = lambda index, timeout=1.0: None if index in gap else original(index)
+    scan = types.SimpleNamespace(missing=sorted(gap), is_missing=gap.__contains__)
+    sink = Sink()
+    stats = {}
+    monkeypatch.setattr(player_core, 'PlaybackClock', _capture(stats))
+    t0 = time.perf_counter()
+    player_core.play_with_cache(shots, sink, fps=50, frame_store=store, frame_scan=scan)
+    clock = stats["clock"]
+    assert clock.missing == 3 and clock.repeated == 0
+    assert sink.frames == [n for n in range(20) if n not in gap]
+    # i buchi occupano il loro tempo: la durata resta quella dei 20 frame
+    assert time.perf_counter() - t0 >= 19 / 50
+
+
+def test_cut_latency_is_recorded_per_boundary(monkeypatch):
+    shots = [Shot("A", "anim", "/x/a.####.jpg", 1, 10),
+             Shot("B", "anim", "/x/b.####.jpg", 1, 10),
+             Shot("C", "anim", "/x/c.####.jpg", 1, 10)]
+    store = SlowStore(slow={20})            # la testa di C arriva in ritardo
+    stats = {}
+    monkeypatch.setattr(player_core, 'PlaybackClock', _capture(stats))
+    player_core.play_with_cache(shots, Sink(), fps=50, frame_store=store)
+    clock = stats["clock"]
+    assert [shot_id for shot_id, _ in clock.cuts] == ["B", "C"]
+    assert clock.cuts[0][1] < 20 <= clock.cuts[1][1]
+    summary = clock.stats()
+    assert summary["cuts"] == 2 and summary["cut_late"] == 1
@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+import types
+import threading
+import importlib.machinery
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+np = pytest.importorskip("numpy")
+# i processi figli importano player_core da zero: serve il vero OpenCV
+if importlib.machinery.PathFinder.find_spec("cv2") is None:
+    pytest.skip("OpenCV non installato", allow_module_level=True)
+
+sys.modules.setdefault('cv2', types.ModuleType('cv2'))
+pygame_stub = types.ModuleType('pygame')
+pygame_stub.mixer = types.SimpleNamespace(get_init=lambda: False, music=types.SimpleNamespace())
+sys.modules.setdefault('pygame', pygame_stub)
+
+import player_core
+from player_core import ImageCache
+from frame_pool import FramePool
+from process_decoder import ProcessDecoder
+
+
+def write_ppm(path, value, width=8, height=6):
+    # PPM scritto a mano: il padre non ha bisogno di cv2
+    with open(path, "wb") as f:
+        f.write(b"P6 %d %d 255\n" % (width, height))
+        f.write(bytes([value]) * (width * height * 3))
+    return str(path)
+
+
+def test_process_decoder_delivers_in_order_through_slots(tmp_path):
+    paths = [write_ppm(tmp_path / f"f{n:04d}.ppm", n * 5) for n in range(12)]
+    paths[4] = str(tmp_path / "missing.ppm")
+
+    with ProcessDecoder(processes=2) as decoder:
+        cache = ImageCache(paths, workers=1, pool=FramePool(), decoder=decoder)
+        try:
+            got = []
+            while len(got) < len(paths) - 1:
+                img = cache.get_image()
+                if img is None:
+                    continue                # spawn dei processi: timeout, si riprova
+                got.append(int(img[0, 0, 0]))
+            stats = cache.stats()
+        finally:
+            cache.stop()
+
+    assert cache.workers == 2
+    assert got == [n * 5 for n in range(12) if n != 4]
+    # solo i frame partiti prima di misurare il primo tornano serializzati
+    assert 1 <= stats["proc_fallbacks"] <= cache.workers
+    assert stats["proc_decoded"] + stats["proc_fallbacks"] == 11
+    assert 1 <= stats["proc_slots"] <= decoder.slot_count
+
+
+def test_process_decoder_grows_slots_for_larger_frames(tmp_path):
+    small = write_ppm(tmp_path / "small.ppm", 10)
+    large = write_ppm(tmp_path / "large.ppm", 20, width=16, height=12)
+
+    with ProcessDecoder(processes=1, slots=1) as decoder:
+        assert decoder.read(small)[0, 0, 0] == 10
+        assert decoder.read(small).shape == (6, 8, 3)
+        img = decoder.read(large)
+        assert img.shape == (12, 16, 3) and img[0, 0, 0] == 20
+        assert decoder.read(large)[0, 0, 0] == 20
+        assert decoder.stats() == {"proc_decoded": 2, "proc_fallbacks": 2, "proc_slots": 1}
+    assert decoder.stats()["proc_slots"] == 0
+
+
+def test_closed_decoder_reads_in_process_and_wakes_waiters(tmp_path, monkeypatch):
+    path = write_ppm(tmp_path / "f.ppm", 10)
+    # dopo close() si decodifica nel processo corrente
+    monkeypatch.setattr(player_core, 'read_frame',
+                        lambda p, scale=1, pool=None: np.full((6, 8, 3), 99, np.uint8))
+    decoder = ProcessDecoder(processes=1, slots=1)
+    assert decoder.read(path)[0, 0, 0] == 10        # misura lo slot
+    slot = decoder._acquire_slot()                  # l'unico slot è occupato
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(decoder.read(path)))
+    waiter.start()
+    time.sleep(0.1)
+    assert waiter.is_alive()
+
+    decoder.close()
+    waiter.join(2.0)
+    assert not waiter.is_alive()
+    assert got[0][0, 0, 0] == 99
+    decoder._release_slot(slot)
+    assert decoder.read(path)[0, 0, 0] == 99
+    assert decoder.stats()["proc_slots"] == 0
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.delenv("MAGA_DECODE_PROCESSES", raising=False)
+    assert ProcessDecoder.from_env() is None
+    monkeypatch.setenv("MAGA_DECODE_PROCESSES", "3")
+    assert ProcessDecoder.from_env().processes == 3
@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+import pytest
+
+# Ensure project root is on sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+np = pytest.importorskip("numpy")
+
+from proxy_cache import ProxyCache
+
+
+def write_source(path, payload):
+    with open(path, "w") as f:
+        f.write(payload)
+
+
+def test_proxy_cache_roundtrip_and_invalidation(tmp_path):
+    source = tmp_path / "frame0001.exr"
+    write_source(source, "v1")
+    cache = ProxyCache(str(tmp_path / "proxy"), fmt="raw")
+
+    img = np.arange(4 * 6 * 3, dtype=np.uint8).reshape(4, 6, 3)
+    assert cache.get(str(source), 2) is None
+    cache.put(str(source), 2, img)
+    assert np.array_equal(cache.get(str(source), 2), img)
+    assert cache.get(str(source), 4) is None          # altra scala, altra chiave
+
+    # il frame originale cambia: la copia ridotta non vale più
+    write_source(source, "version 2")
+    os.utime(source, (time.time() + 10, time.time() + 10))
+    assert cache.get(str(source), 2) is None
+    cache.put(str(source), 2, img + 1)
+    assert cache.stats()["files"] == 1
+
+    reopened = ProxyCache(str(tmp_path / "proxy"), fmt="raw")
+    assert np.array_equal(reopened.get(str(source), 2), img + 1)
+
+
+def test_proxy_cache_lru_eviction(tmp_path):
+    img = np.zeros((10, 10, 3), dtype=np.uint8)
+    sources = []
+    for n in range(5):
+        path = tmp_path / f"frame{n:04d}.png"
+        write_source(path, str(n))
+        sources.append(str(path))
+
+    # spazio per circa tre frame .npy
+    cache = ProxyCache(str(tmp_path / "proxy"), max_bytes=3 * 450, fmt="raw")
+    for path in sources[:3]:
+        cache.put(path, 2, img)
+    cache.get(sources[0], 2)                          # il primo torna recente
+    cache.put(sources[3], 2, img)
+    cache.put(sources[4], 2, img)
+
+    assert cache.get(sources[0], 2) is not None
+    assert cache.get(sources[1], 2) is None
+    assert cache.stats()["bytes"] <= 3 * 450
+
+
+def test_proxy_cache_reads_persist_recency_only_on_flush(tmp_path):
+    img = np.zeros((10, 10, 3), dtype=np.uint8)
+    sources = []
+    for n in range(3):
+        path = tmp_path / f"frame{n:04d}.png"
+        write_source(path, str(n))
+        sources.append(str(path))
+    root = tmp_path / "proxy"
+    cache = ProxyCache(str(root), fmt="raw")
+    for path in sources:
+        cache.put(path, 2, img)
+    for n, name in enumerate(sorted(os.listdir(root))):
+        os.utime(root / name, (1000 + n, 1000 + n))
+    mtimes = {name: os.path.getmtime(root / name) for name in os.listdir(root)}
+
+    cache.get(sources[0], 2)
+    # nessuna scrittura di metadati per lettura
+    assert {name: os.path.getmtime(root / name) for name in os.listdir(root)} == mtimes
+
+    cache.flush()
+    touched = [name for name in os.listdir(root) if os.path.getmtime(root / name) != mtimes[name]]
+    assert len(touched) == 1
+    # riaperta: il proxy letto è il più recente, quindi l'ultimo sfrattato
+    reopened = ProxyCache(str(root), fmt="raw")
+    assert list(reopened._files)[-1] == touched[0]
+
+
+def test_proxy_cache_is_opt_in(tmp_path, monkeypatch):
+    monkeypatch.delenv("MAGA_PROXY_CACHE", raising=False)
+    assert ProxyCache.from_env() is None
+    monkeypatch.setenv("MAGA_PROXY_CACHE", "off")
+    assert ProxyCache.from_env() is None
+    monkeypatch.setenv("MAGA_PROXY_CACHE", str(tmp_path / "proxy"))
+    monkeypatch.setenv("MAGA_PROXY_FORMAT", "raw")
+    cache = ProxyCache.from_env()
+    assert cache.root == str(tmp_path / "proxy") and cache.fmt == "raw"
+
+
+def test_background_scan_keeps_frames_written_meanwhile(tmp_path):
+    img = np.zeros((10, 10, 3), dtype=np.uint8)
+    sources = []
+    for n in range(3):
+        path = tmp_path / f"frame{n:04d}.png"
+        write_source(path, str(n))
+        sources.append(str(path))
+    root = str(tmp_path / "proxy")
+    cache = ProxyCache(root, fmt="raw")
+    for path in sources[:2]:
+        cache.put(path, 2, img)
+
+    reopened = ProxyCache(root, fmt="raw", background=True)
+    reopened.put(sources[2], 2, img)            # può arrivare prima o dopo la scansione
+    reopened.scan_thread.join(timeout=5)
+    assert reopened.stats()["files"] == 3
+    assert reopened.stats()["bytes"] == cache.stats()["bytes"] * 3 // 2
+    assert all(reopened.get(path, 2) is not None for path in sources)
+    # il frame appena scritto resta il più recente
+    assert list(reopened._files)[-1] == reopened._name(sources[2], 2)[1]
@@ -0,0 +1,74 @@
+import os
+import sys
+import types
+import pytest
+
+# Ensure project root is on sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+pytest.importorskip("PyQt5.QtWidgets")
+
+# Stub pygame if missing
+if 'pygame' not in sys.modules:
+    pygame_stub = types.ModuleType('pygame')
+    pygame_stub.mixer = types.SimpleNamespace(get_init=lambda: False, music=types.SimpleNamespace())
+    sys.modules['pygame'] = pygame_stub
+
+from PyQt5.QtCore import Qt
+from shot_list_model import ShotListModel, RepartoFilterModel, CsvLoader
+
+
+def write_csv(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("shot_id,reparto,frame_path,start_frame,end_frame\n")
+        f.write("audio,,path/audio.wav,,\n")
+        for n in range(count):
+            reparto = "render" if n % 4 == 0 else "animazione"
+            f.write(f"s{n},{reparto},path/s{n}/f####.png,1,10\n")
+
+
+def test_loader_streams_batches_into_model(qtbot, tmp_path):
+    csv_path = tmp_path / "episode.csv"
+    write_csv(csv_path, 1000)
+
+    model = ShotListModel()
+    proxy = RepartoFilterModel("animazione")
+    proxy.setSourceModel(model)
+    batches = []
+    loader = CsvLoader(str(csv_path), batch_size=128)
+    loader.batch.connect(lambda batch: (batches.append(len(batch)), model.append_shots(batch)))
+    with qtbot.waitSignal(loader.finished, timeout=5000) as blocker:
+        loader.start()
+    shots, audio = blocker.args
+
+    assert batches[0] == 128 and sum(batches) == 1000
+    assert audio == "path/audio.wav"
+    assert model.rowCount() == 1000
+    assert proxy.rowCount() == 750
+    # le righe filtrate sono la timeline del reparto, nello stesso ordine
+    timeline = shots.timelines["animazione"]
+    assert [proxy.index(r, 0).data(Qt.UserRole).shot_id for r in range(3)] == \
+        [s.shot_id for s in timeline.shots[:3]]
+    assert proxy.index(0, 0).data() == "s1 (1–10)"
+
+    proxy.set_reparto("render")
+    assert proxy.rowCount() == 250
+
+
+def test_gui_load_csv_is_asynchronous(qtbot, tmp_path):
+    from gui import PlayerGUI
+
+    csv_path = tmp_path / "episode.csv"
+    write_csv(csv_path, 300)
+
+    gui = PlayerGUI()
+    qtbot.addWidget(gui)
+    gui.load_csv(str(csv_path))
+    qtbot.waitUntil(lambda: gui.csv_loader is None, timeout=5000)
+
+    assert gui.audio_path == "path/audio.wav"
+    assert len(gui.loaded_shots) == 300
+    assert gui.shot_list.model().rowCount() == 225
+    assert gui.timeline_slider.maximum() == 225 * 10 - 1
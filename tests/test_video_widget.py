@@ -0,0 +1,68 @@
+import os
+import sys
+import threading
+import pytest
+
+# Ensure project root is on sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+pytest.importorskip("PyQt5")
+np = pytest.importorskip("numpy")
+
+from video_widget import VideoWidget
+
+
+def test_video_widget_keeps_only_latest_frame(qtbot):
+    widget = VideoWidget("vuoto")
+    qtbot.addWidget(widget)
+    widget.resize(320, 180)
+
+    old = np.zeros((90, 160, 3), dtype=np.uint8)
+    new = np.full((90, 160, 3), 255, dtype=np.uint8)
+    # consegna dal thread di playback: la GUI non disegna finché non torna al loop
+    producer = threading.Thread(target=lambda: (widget.present(old), widget.present(new)))
+    producer.start()
+    producer.join()
+
+    qtbot.waitUntil(lambda: widget._image is not None)
+    assert widget.dropped == 1
+    assert widget._frame[0] is new
+    assert widget._image.width() == 160
+    assert widget._image.pixelColor(0, 0).red() == 255
+
+
+def test_video_widget_overlay_and_timings(qtbot):
+    from perf_stats import PerfStats
+    widget = VideoWidget("vuoto")
+    qtbot.addWidget(widget)
+    widget.resize(320, 180)
+    widget.perf = PerfStats()
+    widget.set_overlay(["decode 1.0", "paint 2.0"])
+    widget.present(np.zeros((90, 160, 3), dtype=np.uint8))
+    qtbot.waitUntil(lambda: widget._image is not None)
+    widget.grab()                           # forza un paintEvent
+    stages = widget.perf.snapshot()["stages"]
+    assert stages["convert"]["count"] == 1
+    assert stages["paint"]["count"] >= 1
+    widget.set_overlay(None)
+    assert widget.overlay is None
+
+
+def test_video_widget_holds_pooled_frame_until_replaced(qtbot):
+    from frame_pool import FramePool
+    pool = FramePool()
+    widget = VideoWidget("vuoto")
+    qtbot.addWidget(widget)
+    widget.pool = pool
+
+    shown = pool.acquire((90, 160, 3))
+    widget.present(shown)
+    qtbot.waitUntil(lambda: widget._image is not None)
+    pool.release(shown)                     # sfrattato dalla cache mentre è a schermo
+    assert pool.acquire((90, 160, 3)) is not shown
+
+    widget.present(np.zeros((90, 160, 3), dtype=np.uint8))
+    qtbot.waitUntil(lambda: widget._frame[0] is not shown)
+    assert pool.acquire((90, 160, 3)) is shown
@@ -0,0 +1,37 @@
+# timeline_slider.py
+
+from PyQt5.QtWidgets import QSlider
+from PyQt5.QtGui import QPainter, QColor
+
+
+class TimelineSlider(QSlider):
+    """
+    Slider della timeline con i buchi (frame mancanti su disco) segnati
+    sopra il groove. set_gaps() riceve intervalli [start, end] già nelle
+    coordinate dello slider (0 … maximum()).
+    """
+
+    GAP_COLOR = "#c0392b"
+
+    def __init__(self, orientation, parent=None):
+        super().__init__(orientation, parent)
+        self.gaps = []
+
+    def set_gaps(self, gaps):
+        self.gaps = list(gaps)
+        self.update()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.gaps:
+            return
+        frames = self.maximum() - self.minimum() + 1
+        width = self.width()
+        painter = QPainter(self)
+        color = QColor(self.GAP_COLOR)
+        top, height = self.height() // 2 - 3, 6
+        for start, end in self.gaps:
+            x0 = int((start - self.minimum()) * width / frames)
+            x1 = int((end - self.minimum() + 1) * width / frames)
+            painter.fillRect(x0, top, max(1, x1 - x0), height, color)
+        painter.end()
@@ -0,0 +1,128 @@
+# video_widget.py
+
+import time
+import threading
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtGui import QImage, QPainter, QColor, QFont
+from PyQt5.QtCore import Qt, QRect, pyqtSignal
+
+
+def _drop(entry):
+    if entry is not None and entry[1] is not None:
+        entry[1].drop(entry[0])
+
+
+class VideoWidget(QWidget):
+    """
+    Area video del player.
+    Il thread di playback consegna i frame BGR con present(); il widget li
+    disegna nel thread GUI dentro paintEvent.
+    • mailbox a slot singolo: se la GUI resta indietro il frame non ancora
+      disegnato viene sostituito dal nuovo (contato in `dropped`)
+    • zero-copy: il QImage punta direttamente al buffer numpy (Format_BGR888)
+    • lo scaling avviene una sola volta, alla dimensione del widget, senza
+      QPixmap intermedi
+    • il buffer resta referenziato finché il frame è a schermo; con un
+      `pool` (frame_pool.FramePool, impostato dal playback) il widget lo
+      prende con hold() in present() e lo lascia con drop() quando il
+      frame successivo lo sostituisce o viene scartato
+    • `perf` (perf_stats.PerfStats, opzionale): tempi di conversione in
+      QImage ("convert") e di disegno ("paint"); set_overlay() mostra sopra
+      il video le righe di testo passate (None lo nasconde)
+    """
+
+    frame_ready = pyqtSignal()
+
+    def __init__(self, placeholder="", parent=None):
+        super().__init__(parent)
+        self.placeholder = placeholder
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._pending = None       # (frame, pool) ricevuto e non ancora preso
+        self._notified = False     # frame_ready già emesso per _pending
+        self._frame = None         # (frame, pool) che tiene in vita _image
+        self.pool = None           # FramePool dei frame in arrivo
+        self._image = None
+        self.perf = None
+        self.overlay = None        # righe dell'overlay statistiche
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self.frame_ready.connect(self._take_frame)
+
+    def present(self, frame):
+        """Thread-safe: pubblica `frame` (ndarray HxWx3 BGR uint8)."""
+        pool = self.pool
+        if pool is not None:
+            pool.hold(frame)
+        with self._lock:
+            replaced, self._pending = self._pending, (frame, pool)
+            if replaced is not None:
+                self.dropped += 1
+            notify = not self._notified
+            self._notified = True
+        _drop(replaced)
+        if notify:
+            self.frame_ready.emit()    # queued verso il thread GUI
+
+    def set_overlay(self, lines):
+        self.overlay = list(lines) if lines else None
+        self.update()
+
+    def clear(self):
+        with self._lock:
+            pending, self._pending = self._pending, None
+        _drop(pending)
+        shown, self._frame, self._image = self._frame, None, None
+        _drop(shown)
+        self.update()
+
+    def _take_frame(self):
+        with self._lock:
+            pending, self._pending = self._pending, None
+            self._notified = False
+        if pending is None:
+            return
+        t0 = time.perf_counter()
+        frame = pending[0]
+        height, width = frame.shape[:2]
+        shown, self._frame = self._frame, pending
+        self._image = QImage(frame.data, width, height, frame.strides[0],
+                             QImage.Format_BGR888)
+        _drop(shown)                   # il frame precedente non è più a schermo
+        if self.perf is not None:
+            self.perf.record("convert", time.perf_counter() - t0)
+        self.update()
+
+    def _target_rect(self, width, height):
+        scale = min(self.width() / width, self.height() / height)
+        w, h = int(width * scale), int(height * scale)
+        return QRect((self.width() - w) // 2, (self.height() - h) // 2, w, h)
+
+    def _paint_overlay(self, painter):
+        font = QFont("Monospace", 9)
+        font.setStyleHint(QFont.TypeWriter)
+        painter.setFont(font)
+        metrics = painter.fontMetrics()
+        line_height = metrics.height()
+        width = max(metrics.horizontalAdvance(line) for line in self.overlay) + 16
+        painter.fillRect(8, 8, width, line_height * len(self.overlay) + 12,
+                         QColor(0, 0, 0, 170))
+        painter.setPen(QColor("#e0e0e0"))
+        for n, line in enumerate(self.overlay):
+            painter.drawText(16, 14 + metrics.ascent() + n * line_height, line)
+
+    def paintEvent(self, event):
+        t0 = time.perf_counter()
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#1e1e1e"))
+        if self._image is None:
+            painter.setPen(QColor("#aaaaaa"))
+            painter.drawText(self.rect(), Qt.AlignCenter, self.placeholder)
+        else:
+            painter.setRenderHint(QPainter.SmoothPixmapTransform)
+            painter.drawImage(self._target_rect(self._image.width(), self._image.height()),
+                              self._image)
+        if self.overlay:
+            self._paint_overlay(painter)
+        painter.end()
+        if self.perf is not None and self._image is not None:
+            self.perf.record("paint", time.perf_counter() - t0)